@@ -1,11 +1,19 @@
 import { ClientEvent } from "@digital-mind/shared";
 import { retrieve, type RetrievedChunk } from "./services/retrieval";
 import { streamLLM } from "./services/llm";
-import { getTTSClient } from "./services/tts";
-import { SpeechChunker } from "./services/text-chunker";
+import { getTTSClient, pcmToWav } from "./services/tts";
+import { SpeechChunker, type SpeechChunk } from "./services/text-chunker";
 
 type State = "IDLE" | "LISTENING" | "PROCESSING" | "SPEAKING";
 
+// Later speech chunks are batched into one TTS request once this many are
+// waiting, or after this long without the batch filling
+const TTS_BATCH_SIZE = 3;
+const TTS_BATCH_DELAY_MS = 150;
+// Streamed PCM is forwarded to the browser in WAV pieces of at least this
+// much audio, so network fragments don't become separate tiny buffers
+const TTS_STREAM_MIN_PIECE_MS = 200;
+
 interface ConnectionData {
   state: State;
   abortController?: AbortController;
@@ -72,6 +80,13 @@ async function handleUserText(
   let llmFirstTokenMs = 0;
   let ttsFirstChunkMs: number | null = null;
   const ttsStartTime = Date.now();
+  // Server-side TTS stage times, summed over all chunks
+  const ttsServerMs: Record<string, number> = {};
+  const addServerTiming = (timings: Record<string, number>) => {
+    for (const [stage, ms] of Object.entries(timings)) {
+      ttsServerMs[stage] = Math.round(((ttsServerMs[stage] || 0) + ms) * 100) / 100;
+    }
+  };
 
   // Track TTS tasks
   const ttsQueue: Promise<void>[] = [];
@@ -111,43 +126,145 @@ async function handleUserText(
     // Store audio results in order
     const audioResults: (string | null)[] = [];
     let nextChunkToSend = 0;
+    // The first speech chunk can go out as several pieces, so the client
+    // sees its own running index
+    let sentAudioChunks = 0;
+
+    const sendAudio = (audio: string) => {
+      ws.send(
+        JSON.stringify({
+          type: "agent.audio_chunk",
+          audio,
+          chunk_index: sentAudioChunks++,
+          is_last: false,
+        })
+      );
+    };
 
-    // Helper to process speech chunk through TTS
-    const processSpeechChunk = async (text: string, chunkIndex: number) => {
+    // Record a chunk's audio (null if it failed) and send any chunks that
+    // are ready in order
+    const deliverAudio = (chunkIndex: number, audio: string | null) => {
       if (data.abortController?.signal.aborted) return;
 
-      try {
-        const audio = await ttsClient.synthesize(text);
+      if (audio && ttsFirstChunkMs === null) {
+        ttsFirstChunkMs = Date.now() - ttsStartTime;
+      }
 
-        if (data.abortController?.signal.aborted) return;
+      // Store result at correct index
+      audioResults[chunkIndex] = audio;
+
+      while (audioResults[nextChunkToSend] !== undefined) {
+        const audioToSend = audioResults[nextChunkToSend];
+        if (audioToSend) sendAudio(audioToSend);
+        nextChunkToSend++;
+      }
+    };
 
+    // The first chunk sets time-to-first-audio, so it is streamed: its PCM
+    // is forwarded as WAV pieces while the server is still decoding it.
+    // Nothing plays before it, so the pieces can go out as they arrive
+    const streamFirstChunk = async (chunk: SpeechChunk) => {
+      const signal = data.abortController?.signal;
+      if (signal?.aborted) return;
+
+      let pending: Uint8Array[] = [];
+      let pendingBytes = 0;
+      let sampleRate = 24000;
+      let streamed = false;
+      const sendPending = () => {
+        if (pendingBytes === 0 || signal?.aborted) return;
         if (ttsFirstChunkMs === null) {
           ttsFirstChunkMs = Date.now() - ttsStartTime;
         }
+        const wav = pcmToWav(Buffer.concat(pending), sampleRate);
+        sendAudio(Buffer.from(wav).toString("base64"));
+        streamed = true;
+        pending = [];
+        pendingBytes = 0;
+      };
 
-        // Store result at correct index
-        audioResults[chunkIndex] = audio;
-
-        // Send any chunks that are ready in order
-        while (audioResults[nextChunkToSend] !== undefined) {
-          const audioToSend = audioResults[nextChunkToSend];
-          if (audioToSend) {
-            ws.send(
-              JSON.stringify({
-                type: "agent.audio_chunk",
-                audio: audioToSend,
-                chunk_index: nextChunkToSend,
-                is_last: false,
-              })
-            );
+      try {
+        for await (const frame of ttsClient.synthesizeStream(
+          chunk.text,
+          undefined,
+          chunk.filler,
+          signal
+        )) {
+          sampleRate = frame.sampleRate;
+          pending.push(frame.pcm);
+          pendingBytes += frame.pcm.length;
+          if (pendingBytes >= (sampleRate * 2 * TTS_STREAM_MIN_PIECE_MS) / 1000) {
+            sendPending();
           }
-          nextChunkToSend++;
         }
+        sendPending();
+      } catch (error) {
+        if ((error as Error).name === "AbortError") return;
+        console.error("[TTS] Stream error:", error);
+      }
+
+      if (!streamed) {
+        // Nothing came through the stream; fall back to one whole chunk
+        try {
+          deliverAudio(0, await ttsClient.synthesize(chunk.text, addServerTiming, chunk.filler));
+          return;
+        } catch (error) {
+          console.error("[TTS] Error:", error);
+        }
+      }
+      // Its audio is out (or failed), so later chunks can follow
+      deliverAudio(0, null);
+    };
+
+    // Later chunks are played after it anyway, so they're collected into
+    // small batches that share voice setup on the server. A batch goes out
+    // as soon as it fills or shortly after its first chunk arrives, so
+    // synthesis keeps pace with the LLM instead of waiting for its answer
+    let laterChunks: SpeechChunk[] = [];
+    let laterFirstIndex = 0;
+    let laterTimer: ReturnType<typeof setTimeout> | null = null;
+
+    const flushLaterChunks = () => {
+      if (laterTimer) {
+        clearTimeout(laterTimer);
+        laterTimer = null;
+      }
+      if (laterChunks.length === 0) return;
+      ttsQueue.push(processLaterChunks(laterChunks, laterFirstIndex));
+      laterChunks = [];
+    };
+
+    const queueLaterChunk = (chunk: SpeechChunk, chunkIndex: number) => {
+      if (laterChunks.length === 0) {
+        laterFirstIndex = chunkIndex;
+        laterTimer = setTimeout(flushLaterChunks, TTS_BATCH_DELAY_MS);
+      }
+      laterChunks.push(chunk);
+      if (laterChunks.length >= TTS_BATCH_SIZE) flushLaterChunks();
+    };
+
+    const processLaterChunks = async (chunks: SpeechChunk[], firstIndex: number) => {
+      if (data.abortController?.signal.aborted) return;
+
+      const delivered = new Set<number>();
+      try {
+        await ttsClient.synthesizeMany(
+          chunks,
+          (index, audio) => {
+            delivered.add(index);
+            deliverAudio(firstIndex + index, audio);
+          },
+          addServerTiming,
+          data.abortController?.signal
+        );
       } catch (error) {
+        if ((error as Error).name === "AbortError") return;
         console.error("[TTS] Error:", error);
-        // Mark as failed so we don't block subsequent chunks
-        audioResults[chunkIndex] = null;
       }
+      // Mark anything the response didn't cover as failed
+      chunks.forEach((_, index) => {
+        if (!delivered.has(index)) deliverAudio(firstIndex + index, null);
+      });
     };
 
     // 2. Stream LLM response + TTS
@@ -181,9 +298,12 @@ async function handleUserText(
       // Check for speakable chunk
       const speechChunk = chunker.addToken(token);
       if (speechChunk) {
-        // Start TTS in parallel with assigned index
         const chunkIndex = audioChunkIndex++;
-        ttsQueue.push(processSpeechChunk(speechChunk, chunkIndex));
+        if (chunkIndex === 0) {
+          ttsQueue.push(streamFirstChunk(speechChunk));
+        } else {
+          queueLaterChunk(speechChunk, chunkIndex);
+        }
       }
     }
 
@@ -193,8 +313,13 @@ async function handleUserText(
     const finalChunk = chunker.flush();
     if (finalChunk) {
       const chunkIndex = audioChunkIndex++;
-      ttsQueue.push(processSpeechChunk(finalChunk, chunkIndex));
+      if (chunkIndex === 0) {
+        ttsQueue.push(streamFirstChunk(finalChunk));
+      } else {
+        queueLaterChunk(finalChunk, chunkIndex);
+      }
     }
+    flushLaterChunks();
 
     // Signal text is complete (so UI can stop showing streaming indicator)
     ws.send(
@@ -212,7 +337,7 @@ async function handleUserText(
       JSON.stringify({
         type: "agent.audio_chunk",
         audio: "",
-        chunk_index: audioChunkIndex,
+        chunk_index: sentAudioChunks,
         is_last: true,
       })
     );
@@ -229,6 +354,7 @@ async function handleUserText(
           llm_total_ms: llmTotalMs,
           tts_first_chunk_ms: ttsFirstChunkMs || 0,
           tts_total_ms: Date.now() - ttsStartTime,
+          tts_server_ms: ttsServerMs,
           total_ms: Date.now() - startTime,
         },
       })
@@ -268,43 +394,9 @@ async function handleRequestTTS(
   // Use chunker without "Um," fillers for read-aloud of prepared text
   const chunker = new SpeechChunker(false);
 
-  let audioChunkIndex = 0;
-  const audioResults: (string | null)[] = [];
-  let nextChunkToSend = 0;
-
-  const processSpeechChunk = async (text: string, chunkIndex: number) => {
-    if (data.abortController?.signal.aborted) return;
-
-    try {
-      const audio = await ttsClient.synthesize(text);
-      if (data.abortController?.signal.aborted) return;
-
-      audioResults[chunkIndex] = audio;
-
-      while (audioResults[nextChunkToSend] !== undefined) {
-        const audioToSend = audioResults[nextChunkToSend];
-        if (audioToSend) {
-          ws.send(
-            JSON.stringify({
-              type: "agent.audio_chunk",
-              audio: audioToSend,
-              chunk_index: nextChunkToSend,
-              is_last: false,
-            })
-          );
-        }
-        nextChunkToSend++;
-      }
-    } catch (error) {
-      console.error("[TTS] Error:", error);
-      audioResults[chunkIndex] = null;
-    }
-  };
-
   try {
     // Split content into speakable chunks
-    const ttsQueue: Promise<void>[] = [];
-    const chunks: string[] = [];
+    const chunks: SpeechChunk[] = [];
 
     // First, collect all chunks
     for (const char of content) {
@@ -319,20 +411,40 @@ async function handleRequestTTS(
       chunks.push(finalChunk);
     }
 
-    // Process chunks - natural speech flow without artificial pauses
-    for (const chunk of chunks) {
-      const chunkIndex = audioChunkIndex++;
-      ttsQueue.push(processSpeechChunk(chunk, chunkIndex));
+    // All chunks at once (synthesizeMany splits long documents into
+    // service-sized requests); the service returns them in order as each
+    // is ready - natural speech flow without artificial pauses
+    if (chunks.length > 0) {
+      try {
+        await ttsClient.synthesizeMany(
+          chunks,
+          (index, audio) => {
+            if (data.abortController?.signal.aborted || !audio) return;
+            ws.send(
+              JSON.stringify({
+                type: "agent.audio_chunk",
+                audio,
+                chunk_index: index,
+                is_last: false,
+              })
+            );
+          },
+          undefined,
+          data.abortController.signal
+        );
+      } catch (error) {
+        if ((error as Error).name !== "AbortError") {
+          console.error("[TTS] Error:", error);
+        }
+      }
     }
 
-    await Promise.all(ttsQueue);
-
     // Send final audio marker
     ws.send(
       JSON.stringify({
         type: "agent.audio_chunk",
         audio: "",
-        chunk_index: audioChunkIndex,
+        chunk_index: chunks.length,
         is_last: true,
       })
     );
@@ -1,4 +1,5 @@
 import { handleConnection } from "./connection";
+import { getTTSClient } from "./services/tts";
 
 const port = parseInt(process.env.PORT || "3002", 10);
 
@@ -15,6 +16,10 @@ const server = Bun.serve({
     open(ws) {
       console.log("Client connected");
       (ws as any).data = { state: "IDLE" };
+      // Warm the voice while the user is still typing
+      getTTSClient()
+        .prefetchVoice()
+        .catch((error) => console.warn("[TTS] Voice prefetch failed:", error));
     },
     message(ws, message) {
       handleConnection(ws as any, message);
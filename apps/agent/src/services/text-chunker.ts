@@ -3,20 +3,27 @@
  * Goal: Get first audio chunk ASAP while maintaining natural speech.
  */
 
-// Varied filler words for natural pauses
+// Varied filler words for natural pauses. The TTS service pre-renders each
+// one per voice (IDs match services/tts/tts_core/fillers.py) and splices the
+// clip on, so the filler text is never synthesized with the chunk
 const FILLERS = [
-  "Um,",
-  "Uh,",
-  "Hmm,",
-  "So,",
-  "Well,",
-  "Like,",
-  "Yeah,",
-  "I mean,",
-  "You know,",
-  "Basically,",
+  "um",
+  "uh",
+  "hmm",
+  "so",
+  "well",
+  "like",
+  "yeah",
+  "i_mean",
+  "you_know",
+  "basically",
 ];
 
+export interface SpeechChunk {
+  text: string;
+  filler?: string; // filler ID to play before the text
+}
+
 export class SpeechChunker {
   private buffer = "";
   private minChunkLength = 80; // Shorter chunks = more responsive
@@ -34,7 +41,7 @@ export class SpeechChunker {
   }
 
   /**
-   * Get a random filler word, avoiding repeating the last one used.
+   * Get a random filler ID, avoiding repeating the last one used.
    */
   private getRandomFiller(): string {
     let index: number;
@@ -49,23 +56,23 @@ export class SpeechChunker {
    * Add filler at the beginning of non-first chunks to fill the pause
    * from the previous chunk finishing.
    */
-  private maybeAddFiller(chunk: string): string {
+  private maybeAddFiller(chunk: string): SpeechChunk {
     if (this.isFirstChunk) {
       this.isFirstChunk = false;
-      return chunk;
+      return { text: chunk };
     }
     // Add a varied filler at the start to fill the gap after previous chunk
     // Only for streaming responses, not read-aloud
     if (this.useFiller) {
-      return this.getRandomFiller() + " " + chunk;
+      return { text: chunk, filler: this.getRandomFiller() };
     }
-    return chunk;
+    return { text: chunk };
   }
 
   /**
    * Add tokens and get any complete chunks.
    */
-  addToken(token: string): string | null {
+  addToken(token: string): SpeechChunk | null {
     this.buffer += token;
 
     // Check for sentence boundary (. ! ?)
@@ -103,12 +110,12 @@ export class SpeechChunker {
   /**
    * Flush remaining buffer at end of response.
    */
-  flush(): string | null {
+  flush(): SpeechChunk | null {
     if (this.buffer.trim()) {
       const chunk = this.buffer.trim();
       this.buffer = "";
       // Don't add filler to final chunk - it sounds unnatural
-      return chunk;
+      return { text: chunk };
     }
     return null;
   }
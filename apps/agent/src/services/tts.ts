@@ -2,152 +2,335 @@
  * TTS Client for Modal XTTS service
  */
 
+import type { SpeechChunk } from "./text-chunker";
+
+// Most chunks the service accepts in one /tts/many request (its
+// TTS_MAX_MANY_CHUNKS); longer lists are sent as consecutive requests
+const MAX_MANY_CHUNKS = 64;
+
 interface TTSResponse {
   audio: string; // base64 encoded WAV
   format: string;
+  capped?: boolean; // output ran past its runaway limit and was trimmed
+  trimmed_ms?: number; // silence removed by server-side post-processing
+}
+
+/** One NDJSON line from /tts/many. */
+interface TTSManyResult {
+  index: number;
+  audio?: string; // base64, absent when the chunk failed
+  format?: string;
+  timings?: Record<string, number>;
+  capped?: boolean;
+  trimmed_ms?: number;
+  error?: string;
+}
+
+/**
+ * Parse a Server-Timing header ("inference;dur=412.5, queue_wait;dur=3")
+ * into milliseconds per stage.
+ */
+export function parseServerTiming(header: string | null): Record<string, number> {
+  const timings: Record<string, number> = {};
+  if (!header) return timings;
+
+  for (const entry of header.split(",")) {
+    const [name, ...params] = entry.trim().split(";");
+    const dur = params.find((p) => p.trim().startsWith("dur="));
+    if (name && dur) {
+      timings[name] = parseFloat(dur.trim().slice(4));
+    }
+  }
+  return timings;
+}
+
+export interface TTSStreamTiming {
+  firstByteMs: number;
+  totalMs: number;
+  bytes: number;
+}
+
+/**
+ * Wrap raw 16-bit mono PCM in a WAV header so the browser can decode it.
+ */
+export function pcmToWav(pcm: Uint8Array, sampleRate = 24000): Uint8Array {
+  const wav = new Uint8Array(44 + pcm.length);
+  const view = new DataView(wav.buffer);
+  const writeString = (offset: number, value: string) => {
+    for (let i = 0; i < value.length; i++) {
+      view.setUint8(offset + i, value.charCodeAt(i));
+    }
+  };
+
+  writeString(0, "RIFF");
+  view.setUint32(4, 36 + pcm.length, true);
+  writeString(8, "WAVE");
+  writeString(12, "fmt ");
+  view.setUint32(16, 16, true); // fmt chunk size
+  view.setUint16(20, 1, true); // PCM
+  view.setUint16(22, 1, true); // mono
+  view.setUint32(24, sampleRate, true);
+  view.setUint32(28, sampleRate * 2, true); // byte rate
+  view.setUint16(32, 2, true); // block align
+  view.setUint16(34, 16, true); // bits per sample
+  writeString(36, "data");
+  view.setUint32(40, pcm.length, true);
+  wav.set(pcm, 44);
+
+  return wav;
 }
 
 export class TTSClient {
-  private baseUrl: string;
+  private synthesizeUrl: string;
+  private streamUrl: string;
+  private manyUrl: string;
+  private prefetchUrl: string;
   private voiceId: string;
+  private format: string;
 
   constructor() {
-    // Modal endpoint URL for the tts_endpoint function
-    this.baseUrl =
+    // Base URL of the TTS service's HTTP API: the TTSService.web app on
+    // Modal, or a local `python -m tts_core.server`
+    const baseUrl = (
       process.env.MODAL_TTS_URL ||
-      "https://austinjian07--digital-mind-tts-tts-endpoint.modal.run";
+      "https://austinjian07--digital-mind-tts-ttsservice-web.modal.run"
+    ).replace(/\/+$/, "");
+    this.synthesizeUrl = `${baseUrl}/tts`;
+    this.streamUrl = `${baseUrl}/tts/stream`;
+    this.manyUrl = `${baseUrl}/tts/many`;
+    this.prefetchUrl = `${baseUrl}/voices/prefetch`;
     this.voiceId = process.env.VOICE_ID || "austin";
+    // wav | opus | mp3 - all decodable by the browser's decodeAudioData
+    this.format = process.env.TTS_FORMAT || "wav";
   }
 
   /**
-   * Tech terms to natural pronunciation
+   * Ask the service to load this voice onto the GPU ahead of the first
+   * synthesis, e.g. when a session opens.
    */
-  private readonly techTerms: [RegExp, string][] = [
-    // Frameworks with .js - match variations
-    [/Next\.?js/gi, "Next JS"],
-    [/Node\.?js/gi, "Node JS"],
-    [/React\.?js/gi, "React"],
-    [/Vue\.?js/gi, "View JS"],
-    [/Express\.?js/gi, "Express"],
-    [/Three\.?js/gi, "Three JS"],
-    // Acronyms - use word boundaries
-    [/\bAPIs?\b/gi, "A P I"],
-    [/\bUI\b/g, "U I"],
-    [/\bUX\b/g, "U X"],
-    [/\bCSS\b/g, "C S S"],
-    [/\bHTML\b/g, "H T M L"],
-    [/\bAWS\b/g, "A W S"],
-    [/\bGCP\b/g, "G C P"],
-    [/\bCLI\b/g, "C L I"],
-    [/\bSDK\b/g, "S D K"],
-    [/\bIDE\b/g, "I D E"],
-    [/\bNPM\b/g, "N P M"],
-    [/\bURL\b/g, "U R L"],
-    [/\bJSON\b/gi, "jay-son"],
-    [/\bYAML\b/gi, "yammel"],
-    [/\bOAuth\b/gi, "oh-auth"],
-    [/\bJWT\b/g, "J W T"],
-    [/\bREST\b/g, "rest"],
-    [/\bGraphQL\b/gi, "graph Q L"],
-    [/\bLLM\b/g, "L L M"],
-    [/\bGPT\b/g, "G P T"],
-    [/\bRAG\b/g, "rag"],
-    [/\bSQL\b/gi, "sequel"],
-    [/\bNoSQL\b/gi, "no sequel"],
-    // Compound words
-    [/TypeScript/gi, "Type Script"],
-    [/JavaScript/gi, "Java Script"],
-    [/GitHub/gi, "Git Hub"],
-    [/GitLab/gi, "Git Lab"],
-    [/VS\s?Code/gi, "V S Code"],
-    [/PostgreSQL/gi, "postgres"],
-    [/MongoDB/gi, "mongo D B"],
-    [/Firebase/gi, "fire base"],
-    [/Tailwind/gi, "tailwind"],
-    [/Kubernetes/gi, "kubernetes"],
-    [/\bk8s\b/gi, "kubernetes"],
-    [/DevOps/gi, "dev ops"],
-    [/WebSocket/gi, "web socket"],
-    [/localhost/gi, "local host"],
-    [/OpenAI/gi, "open A I"],
-    [/Supabase/gi, "soopa base"],
-    [/Vercel/gi, "ver-sell"],
-    [/Hono/gi, "hoh-no"],
-    // Hyphenated words
-    [/\bgo-to\b/gi, "go to"],
-  ];
+  async prefetchVoice(): Promise<void> {
+    const response = await fetch(this.prefetchUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ voice_id: this.voiceId }),
+    });
+    if (!response.ok) {
+      throw new Error(`TTS prefetch error: ${response.status} - ${await response.text()}`);
+    }
+  }
 
   /**
-   * Convert number abbreviations to spoken form
+   * Synthesize text to audio.
+   * Returns base64-encoded audio in the configured format (WAV by default).
+   * onServerTiming receives the service's per-stage breakdown in ms, plus
+   * trimmed_audio (ms of silence removed) when post-processing is on.
+   * filler names a pre-rendered clip the service plays before the text.
    */
-  private expandNumberAbbreviations(text: string): string {
-    return text
-      // Handle decimals with k/m/b (e.g., 1.5k, 2.5M)
-      .replace(/(\d+(?:\.\d+)?)\s*[kK]\b/g, "$1 thousand")
-      .replace(/(\d+(?:\.\d+)?)\s*[mM]\b/g, "$1 million")
-      .replace(/(\d+(?:\.\d+)?)\s*[bB]\b/g, "$1 billion")
-      .replace(/(\d+(?:\.\d+)?)\s*[tT]\b/g, "$1 trillion");
+  async synthesize(
+    text: string,
+    onServerTiming?: (timings: Record<string, number>) => void,
+    filler?: string
+  ): Promise<string> {
+    // Pronunciation and cleanup happen server-side (tts_core/normalizer.py)
+    const startTime = Date.now();
+    console.log(`[TTS] Synthesizing: "${text.slice(0, 50)}..."`);
+
+    const response = await fetch(this.synthesizeUrl, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        // Raw audio avoids base64 inflation on the Modal hop
+        Accept: "audio/*, application/json;q=0.5",
+      },
+      body: JSON.stringify({
+        text,
+        voice_id: this.voiceId,
+        format: this.format,
+        filler,
+      }),
+    });
+
+    if (!response.ok) {
+      const error = await response.text();
+      throw new Error(`TTS error: ${response.status} - ${error}`);
+    }
+
+    const timings = parseServerTiming(response.headers.get("server-timing"));
+    // Reported alongside the stage times so callers can total it per answer
+    const trimmedMs = parseFloat(response.headers.get("x-tts-trimmed-ms") || "0");
+    if (trimmedMs) timings.trimmed_audio = trimmedMs;
+    onServerTiming?.(timings);
+    if (response.headers.get("x-tts-capped") === "1") {
+      console.warn(`[TTS] Generation capped (runaway output trimmed): "${text.slice(0, 50)}..."`);
+    }
+
+    // Older deployments only speak JSON/base64
+    if (response.headers.get("content-type")?.includes("application/json")) {
+      const data = (await response.json()) as TTSResponse;
+      console.log(
+        `[TTS] Generated ${data.audio.length} bytes in ${Date.now() - startTime}ms`
+      );
+      return data.audio;
+    }
+
+    const audio = Buffer.from(await response.arrayBuffer());
+    console.log(
+      `[TTS] Generated ${audio.length} bytes in ${Date.now() - startTime}ms`
+    );
+
+    return audio.toString("base64");
   }
 
   /**
-   * Clean text for TTS - remove problematic characters and fix pronunciation
+   * Synthesize an ordered list of chunks, MAX_MANY_CHUNKS per request.
+   * The service shares voice setup across each request and schedules its
+   * chunks together; onChunk gets each chunk's base64 audio (null if it
+   * failed) in index order as it is ready. onServerTiming is called once
+   * per chunk.
    */
-  private cleanText(text: string): string {
-    let cleaned = text;
+  async synthesizeMany(
+    chunks: SpeechChunk[],
+    onChunk: (index: number, audio: string | null) => void,
+    onServerTiming?: (timings: Record<string, number>) => void,
+    signal?: AbortSignal
+  ): Promise<void> {
+    for (let start = 0; start < chunks.length; start += MAX_MANY_CHUNKS) {
+      await this.synthesizeManyRequest(
+        chunks.slice(start, start + MAX_MANY_CHUNKS),
+        (index, audio) => onChunk(start + index, audio),
+        onServerTiming,
+        signal
+      );
+    }
+  }
 
-    // Expand number abbreviations first
-    cleaned = this.expandNumberAbbreviations(cleaned);
+  private async synthesizeManyRequest(
+    chunks: SpeechChunk[],
+    onChunk: (index: number, audio: string | null) => void,
+    onServerTiming?: (timings: Record<string, number>) => void,
+    signal?: AbortSignal
+  ): Promise<void> {
+    const startTime = Date.now();
+    console.log(`[TTS] Synthesizing ${chunks.length} chunks in one request`);
 
-    // Replace tech terms with pronunciations
-    for (const [pattern, pronunciation] of this.techTerms) {
-      cleaned = cleaned.replace(pattern, pronunciation);
+    const response = await fetch(this.manyUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        texts: chunks.map((c) => c.text),
+        fillers: chunks.map((c) => c.filler ?? null),
+        voice_id: this.voiceId,
+        format: this.format,
+      }),
+      signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const error = await response.text();
+      throw new Error(`TTS error: ${response.status} - ${error}`);
     }
 
-    return cleaned
-      .replace(/\.{2,}/g, ".") // Replace multiple dots with single
-      .replace(/…/g, ".") // Replace ellipsis character
-      .replace(/[*_~`#]/g, "") // Remove markdown characters
-      .replace(/[\u{1F300}-\u{1F9FF}]/gu, "") // Remove emojis
-      .replace(/[\u{2600}-\u{26FF}]/gu, "") // Remove misc symbols
-      .replace(/[\u{2700}-\u{27BF}]/gu, "") // Remove dingbats
-      .replace(/[—–]/g, ", ") // Replace em/en dash with comma
-      .replace(/[""'']/g, "'") // Normalize quotes
-      .replace(/[^\x00-\x7F]/g, "") // Remove any remaining non-ASCII
-      .replace(/\s+/g, " ") // Normalize whitespace
-      .trim();
+    const decoder = new TextDecoder();
+    let buffered = "";
+    const handleLine = (line: string) => {
+      if (!line.trim()) return;
+      const result = JSON.parse(line) as TTSManyResult;
+      if (result.error !== undefined) {
+        console.error(`[TTS] Chunk ${result.index} failed: ${result.error}`);
+        onChunk(result.index, null);
+        return;
+      }
+      if (result.timings) {
+        onServerTiming?.(
+          result.trimmed_ms
+            ? { ...result.timings, trimmed_audio: result.trimmed_ms }
+            : result.timings
+        );
+      }
+      if (result.capped) {
+        console.warn(`[TTS] Generation capped (runaway output trimmed): chunk ${result.index}`);
+      }
+      onChunk(result.index, result.audio || null);
+    };
+
+    for await (const part of response.body as unknown as AsyncIterable<Uint8Array>) {
+      buffered += decoder.decode(part, { stream: true });
+      let newline: number;
+      while ((newline = buffered.indexOf("\n")) !== -1) {
+        handleLine(buffered.slice(0, newline));
+        buffered = buffered.slice(newline + 1);
+      }
+    }
+    handleLine(buffered + decoder.decode());
+
+    console.log(`[TTS] Generated ${chunks.length} chunks in ${Date.now() - startTime}ms`);
   }
 
   /**
-   * Synthesize text to audio.
-   * Returns base64-encoded WAV audio.
+   * Synthesize text as a stream of raw 16-bit PCM frames.
+   * Frames are yielded as soon as the server decodes them, so callers can
+   * forward audio before the whole sentence is finished. Each frame comes
+   * with the stream's sample rate (X-Sample-Rate) for pcmToWav.
    */
-  async synthesize(text: string): Promise<string> {
-    const cleanedText = this.cleanText(text);
+  async *synthesizeStream(
+    text: string,
+    onTiming?: (timing: TTSStreamTiming) => void,
+    filler?: string,
+    signal?: AbortSignal
+  ): AsyncGenerator<{ pcm: Uint8Array; sampleRate: number }> {
     const startTime = Date.now();
-    console.log(`[TTS] Synthesizing: "${cleanedText.slice(0, 50)}..."`);
+    console.log(`[TTS] Streaming: "${text.slice(0, 50)}..."`);
 
-    const response = await fetch(this.baseUrl, {
+    const response = await fetch(this.streamUrl, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
       body: JSON.stringify({
-        text: cleanedText,
+        text,
         voice_id: this.voiceId,
+        filler,
       }),
+      signal,
     });
 
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       const error = await response.text();
       throw new Error(`TTS error: ${response.status} - ${error}`);
     }
 
-    const data = (await response.json()) as TTSResponse;
+    const sampleRate = parseInt(response.headers.get("x-sample-rate") || "24000", 10);
+    let firstByteMs: number | null = null;
+    let bytes = 0;
+    // Carry an odd trailing byte so every yielded frame is whole samples
+    let carry: Uint8Array | null = null;
+
+    for await (const part of response.body as unknown as AsyncIterable<Uint8Array>) {
+      let frame = part;
+      if (carry) {
+        frame = new Uint8Array(carry.length + part.length);
+        frame.set(carry);
+        frame.set(part, carry.length);
+        carry = null;
+      }
+      if (frame.length % 2 === 1) {
+        carry = frame.slice(frame.length - 1);
+        frame = frame.subarray(0, frame.length - 1);
+      }
+      if (frame.length === 0) continue;
+
+      if (firstByteMs === null) {
+        firstByteMs = Date.now() - startTime;
+      }
+      bytes += frame.length;
+      yield { pcm: frame, sampleRate };
+    }
+
+    const totalMs = Date.now() - startTime;
     console.log(
-      `[TTS] Generated ${data.audio.length} bytes in ${Date.now() - startTime}ms`
+      `[TTS] Streamed ${bytes} bytes: first byte ${firstByteMs ?? totalMs}ms, total ${totalMs}ms`
     );
-
-    return data.audio;
+    onTiming?.({ firstByteMs: firstByteMs ?? totalMs, totalMs, bytes });
   }
 }
 
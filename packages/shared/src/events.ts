@@ -92,6 +92,8 @@ export const AgentDoneEvent = z.object({
     llm_total_ms: z.number(),
     tts_first_chunk_ms: z.number().optional(),
     tts_total_ms: z.number().optional(),
+    // Server-side TTS stage breakdown (ms, summed over chunks)
+    tts_server_ms: z.record(z.number()).optional(),
     total_ms: z.number(),
   }),
 });
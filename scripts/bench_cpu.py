@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark XTTS CPU inference modes against the fp32 baseline.
+Usage: python scripts/bench_cpu.py [--store voice-data/store] [--variants fp32,int8,bf16,int8+bf16]
+                                   [--threads 8] [--seed 0] [--out bench_cpu.json]
+
+Loads the XTTS checkpoint once, then for every variant prepares a copy of
+the model the way TTSService does (tts_core.device) and synthesizes a fixed
+text set with a fixed seed. Conditioning uses the store's best clips and
+the service's settings (tts_core.config). Reports realtime factor (audio seconds per wall
+second) and drift from the fp32 output of the same text: duration ratio and
+speaker-embedding cosine similarity, both measured with the fp32 model.
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "tts"))
+
+from tts_core.clip_quality import select_clips  # noqa: E402
+from tts_core.clip_store import ClipStore  # noqa: E402
+from tts_core.config import CONDITIONING_BUDGET_S, CONDITIONING_PARAMS, INFERENCE_PARAMS  # noqa: E402
+from tts_core.device import configure_threads, inference_mode, prepare_model  # noqa: E402
+from tts_core.latents import compute_latents  # noqa: E402
+
+SAMPLE_RATE = 24000
+DEFAULT_MODEL_DIR = os.path.expanduser(
+    "~/.local/share/tts/tts_models--multilingual--multi-dataset--xtts_v2"
+)
+
+# Roughly the spread of SpeechChunker chunk lengths
+TEXTS = [
+    "Yeah, that works.",
+    "So the short answer is that it depends on how much traffic you expect.",
+    "I spent most of last summer rebuilding the ingestion pipeline, which honestly "
+    "taught me more about backpressure than any course I've taken.",
+    "The trick is to keep the hot path small: cache what you can, batch what you "
+    "can't, and measure everything before you decide what to optimize next.",
+]
+
+def load_model(model_dir: str):
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import Xtts
+
+    config = XttsConfig()
+    config.load_json(f"{model_dir}/config.json")
+    model = Xtts.init_from_config(config)
+    model.load_checkpoint(config, checkpoint_dir=model_dir)
+    return prepare_model(model, "cpu")
+
+
+def conditioning_latents(model, store_dir: str):
+    """Latents from the store's best clips, picked the way TTSService picks them."""
+    with ClipStore(store_dir) as store:
+        scored = [{**e, "score": e["quality"]["score"]} for e in store.entries() if "quality" in e]
+        chosen = select_clips(scored, CONDITIONING_BUDGET_S) or scored[:1]
+        if not chosen:
+            raise SystemExit(f"No scored clips in {store_dir}")
+        print(f"Conditioning on {len(chosen)} clips from {store_dir}")
+        return compute_latents(
+            model,
+            [(store.samples(c["path"]), store.sample_rate(c["path"])) for c in chosen],
+            **CONDITIONING_PARAMS,
+        )
+
+
+def synthesize(model, latents, text: str, seed: int, dtype: str) -> tuple:
+    import torch
+
+    torch.manual_seed(seed)
+    start = time.perf_counter()
+    with inference_mode("cpu", dtype):
+        out = model.inference(
+            text=text,
+            language="en",
+            gpt_cond_latent=latents[0],
+            speaker_embedding=latents[1],
+            enable_text_splitting=False,
+            **INFERENCE_PARAMS,
+        )
+    elapsed = time.perf_counter() - start
+    return torch.as_tensor(out["wav"]).float().flatten(), elapsed
+
+
+def speaker_similarity(model, a, b) -> float:
+    import torch.nn.functional as F
+
+    emb_a = model.get_speaker_embedding(a.unsqueeze(0), SAMPLE_RATE).flatten()
+    emb_b = model.get_speaker_embedding(b.unsqueeze(0), SAMPLE_RATE).flatten()
+    return float(F.cosine_similarity(emb_a, emb_b, dim=0))
+
+
+def run_variant(base, reference, latents, variant: str, seed: int) -> dict:
+    quantize = "int8" if "int8" in variant else "none"
+    dtype = "bf16" if "bf16" in variant else "fp32"
+    model = base if quantize == "none" else prepare_model(copy.deepcopy(base), "cpu", quantize)
+
+    # One untimed pass so lazy init and allocator growth aren't measured
+    synthesize(model, latents, TEXTS[0], seed, dtype)
+
+    rows = []
+    for i, text in enumerate(TEXTS):
+        wav, elapsed = synthesize(model, latents, text, seed, dtype)
+        audio_s = len(wav) / SAMPLE_RATE
+        row = {"text": i, "audio_s": round(audio_s, 2), "wall_s": round(elapsed, 3),
+               "realtime_factor": round(audio_s / elapsed, 3)}
+        if reference is not None:
+            ref = reference[i]
+            row["duration_ratio"] = round(len(wav) / len(ref), 3)
+            with inference_mode("cpu"):
+                row["speaker_similarity"] = round(speaker_similarity(base, ref, wav), 4)
+        rows.append((row, wav))
+
+    audio = sum(r["audio_s"] for r, _ in rows)
+    wall = sum(r["wall_s"] for r, _ in rows)
+    summary = {"variant": variant, "realtime_factor": round(audio / wall, 3),
+               "per_text": [r for r, _ in rows]}
+    if reference is not None:
+        summary["min_speaker_similarity"] = min(r["speaker_similarity"] for r, _ in rows)
+        summary["max_duration_drift"] = max(abs(r["duration_ratio"] - 1) for r, _ in rows)
+    return summary, [wav for _, wav in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default="voice-data/store", help="clip store to condition on")
+    parser.add_argument("--variants", default="fp32,int8,bf16,int8+bf16", help="comma-separated variants")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = torch default)")
+    parser.add_argument("--interop-threads", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_cpu.json", help="where to write JSON results")
+    args = parser.parse_args()
+
+    os.environ.setdefault("COQUI_TOS_AGREED", "1")
+    configure_threads(args.threads, args.interop_threads)
+
+    import torch
+
+    print(f"Loading XTTS from {args.model_dir} ({torch.get_num_threads()} threads)...")
+    base = load_model(args.model_dir)
+    latents = conditioning_latents(base, args.store)
+
+    # fp32 always runs first: it is the reference every other variant is scored against
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    variants = ["fp32"] + [v for v in variants if v != "fp32"]
+
+    results, reference = [], None
+    for variant in variants:
+        summary, wavs = run_variant(base, reference, latents, variant, args.seed)
+        if variant == "fp32":
+            reference = wavs
+        results.append(summary)
+
+        line = f"{variant:>10}  RTF {summary['realtime_factor']:6.2f}x"
+        if "min_speaker_similarity" in summary:
+            line += (f"  speaker sim >= {summary['min_speaker_similarity']:.3f}"
+                     f"  duration drift <= {summary['max_duration_drift']:.1%}")
+        print(line)
+
+    report = {
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count(),
+                    "threads": torch.get_num_threads(), "torch": torch.__version__},
+        "seed": args.seed,
+        "texts": TEXTS,
+        "results": results,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark TTS output encodings: encode cost vs bytes saved.
+Usage: python scripts/bench_encoding.py [seconds_of_audio]
+
+Uses a synthetic speech-like signal (voiced harmonics under a syllable-rate
+envelope with short pauses) at the service's 24kHz output rate.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "tts"))
+
+from tts_core.audio import render_pcm16  # noqa: E402
+from tts_core.encoding import encode_compressed  # noqa: E402
+
+SAMPLE_RATE = 24000
+
+
+def synthetic_speech(seconds: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+
+    # Pitch wanders around 120Hz like a speaking voice
+    pitch = 120 + 20 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+
+    # ~4 syllables/sec, with a pause every couple of seconds
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    envelope *= (np.sin(2 * np.pi * 0.4 * t) > -0.8)
+
+    wav = 0.3 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    return (np.clip(wav, -1, 1) * 32767).astype(np.int16)
+
+
+def bench(label: str, fn, seconds: float, repeats: int = 3) -> dict:
+    fn()  # warm-up (codec init)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    elapsed = (time.perf_counter() - start) / repeats
+    return {
+        "label": label,
+        "encode_ms_per_audio_s": elapsed * 1000 / seconds,
+        "bytes_per_audio_s": len(out) / seconds,
+    }
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    pcm = synthetic_speech(seconds)
+
+    cases = [("wav", lambda: bytes(render_pcm16(pcm, SAMPLE_RATE)))]
+    for fmt, bitrates in (("opus", (16_000, 24_000, 32_000, 48_000)), ("mp3", (32_000, 64_000, 96_000))):
+        for br in bitrates:
+            cases.append((f"{fmt}@{br // 1000}k", lambda f=fmt, b=br: encode_compressed(pcm, SAMPLE_RATE, f, b)))
+
+    results = [bench(label, fn, seconds) for label, fn in cases]
+    wav_rate = results[0]["bytes_per_audio_s"]
+
+    print(f"{seconds:.0f}s of synthetic speech @ {SAMPLE_RATE}Hz\n")
+    print(f"  {'format':<10} {'encode ms/s':>12} {'bytes/s':>10} {'saved/s':>10} {'ratio':>7}")
+    for r in results:
+        saved = wav_rate - r["bytes_per_audio_s"]
+        print(
+            f"  {r['label']:<10} {r['encode_ms_per_audio_s']:>12.2f} "
+            f"{r['bytes_per_audio_s']:>10.0f} {saved:>10.0f} "
+            f"{wav_rate / r['bytes_per_audio_s']:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
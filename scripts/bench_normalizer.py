@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Compare the single-pass TTS text normalizer with the old regex chain.
+Usage: python scripts/bench_normalizer.py [--sizes 50,500,2000,5000] [--chunks 2000]
+
+The chain is a port of the agent's former TTSClient.cleanText: four number
+regexes, one regex per lexicon entry, then a dozen cleanup replaces. Both
+run over the same SpeechChunker-sized chunks while the lexicon is padded
+with synthetic entries up to each size. Reports microseconds per chunk and,
+for the real lexicon, how many chunks the two disagree on.
+"""
+
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "tts"))
+
+from tts_core.lexicon import LEXICON  # noqa: E402
+from tts_core.normalizer import Normalizer  # noqa: E402
+
+SENTENCES = [
+    "So I built the dashboard with Next.js and TypeScript, deployed on Vercel.",
+    "The API handles about 1.5k requests a second — mostly JSON over REST.",
+    "Honestly the UI was the hard part… getting the CSS right took forever.",
+    "We moved from MongoDB to PostgreSQL because the SQL queries got *way* simpler.",
+    "I use VS Code with a bunch of GitHub Copilot stuff, and k8s for deploys 🚀",
+    "It's a go-to pattern: WebSocket for live updates, OAuth with a JWT for auth.",
+]
+
+
+class RegexChain:
+    """The per-entry regex chain the agent used to run on every chunk."""
+
+    def __init__(self, lexicon):
+        self.numbers = [
+            (re.compile(rf"(\d+(?:\.\d+)?)\s*[{s}{s.upper()}]\b"), rf"\1 {word}")
+            for s, word in (("k", "thousand"), ("m", "million"), ("b", "billion"), ("t", "trillion"))
+        ]
+        self.terms = []
+        for forms, spoken, match_case in lexicon:
+            alternation = "|".join(re.escape(f) for f in sorted(forms, key=len, reverse=True))
+            flags = 0 if match_case else re.IGNORECASE
+            self.terms.append((re.compile(rf"\b(?:{alternation})\b", flags), spoken))
+        self.cleanup = [
+            (re.compile(r"\.{2,}"), "."),
+            (re.compile("…"), "."),
+            (re.compile(r"[*_~`#]"), ""),
+            (re.compile("[\U0001F300-\U0001F9FF]"), ""),
+            (re.compile("[☀-⛿]"), ""),
+            (re.compile("[✀-➿]"), ""),
+            (re.compile("[—–]"), ", "),
+            (re.compile("[\"“”‘’]"), "'"),
+            (re.compile(r"[^\x00-\x7F]"), ""),
+            (re.compile(r"\s+"), " "),
+        ]
+
+    def normalize(self, text: str) -> str:
+        for pattern, repl in self.numbers:
+            text = pattern.sub(repl, text)
+        for pattern, spoken in self.terms:
+            text = pattern.sub(spoken, text)
+        for pattern, repl in self.cleanup:
+            text = pattern.sub(repl, text)
+        return text.strip()
+
+
+def padded_lexicon(size: int, rng: random.Random):
+    """The real lexicon plus made-up product names up to `size` entries."""
+    lexicon = list(LEXICON)
+    seen = {f.lower() for forms, _, _ in lexicon for f in forms}
+    while len(lexicon) < size:
+        word = "".join(rng.choice(string.ascii_letters) for _ in range(rng.randint(4, 12)))
+        if word.lower() in seen:
+            continue
+        seen.add(word.lower())
+        lexicon.append(((word,), " ".join(word.lower()), rng.random() < 0.3))
+    return lexicon
+
+
+def make_chunks(n: int, rng: random.Random) -> list[str]:
+    return [" ".join(rng.sample(SENTENCES, rng.randint(1, 2))) for _ in range(n)]
+
+
+def per_chunk_us(normalize, chunks) -> float:
+    start = time.perf_counter()
+    for chunk in chunks:
+        normalize(chunk)
+    return (time.perf_counter() - start) / len(chunks) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,500,2000,5000", help="comma-separated lexicon sizes")
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks normalized per measurement")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    chunks = make_chunks(args.chunks, rng)
+
+    chain, single = RegexChain(LEXICON), Normalizer(LEXICON)
+    differ = [c for c in chunks[:200] if chain.normalize(c) != single.normalize(c)]
+    print(f"Real lexicon ({len(LEXICON)} entries): {len(differ)}/200 chunks normalize differently")
+    for chunk in sorted(set(differ))[:3]:
+        print(f"  in:     {chunk}\n  chain:  {chain.normalize(chunk)}\n  single: {single.normalize(chunk)}")
+
+    print(f"\n{'entries':>8} {'chain us':>10} {'single us':>10} {'speedup':>8} {'compile ms':>11}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        lexicon = padded_lexicon(size, rng)
+        chain = RegexChain(lexicon)
+        start = time.perf_counter()
+        single = Normalizer(lexicon)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        chain_us = per_chunk_us(chain.normalize, chunks)
+        single_us = per_chunk_us(single.normalize, chunks)
+        print(f"{size:>8} {chain_us:>10.1f} {single_us:>10.1f} {chain_us / single_us:>7.1f}x {compile_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Benchmark the offline voice-data pipeline against synthetic recordings.
+Usage: python scripts/bench_pipeline.py [--lengths 1m,10m,1h,5h] [--out bench.json] [--compare old.json]
+
+For each length a speech-plus-silence WAV is generated, then every stage of
+process_voice.py (convert_to_wav, split_audio, transcribe_clips with the
+stand-in backend, save_manifest) and the standalone split_audio.py runs in
+its own fresh process. Reports wall time, peak RSS, realtime factor (audio
+seconds per wall second) and clips/sec per stage, and writes JSON that
+--compare can diff against an earlier run.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+SAMPLE_RATE = 24000
+
+
+def parse_length(value: str) -> float:
+    """'90', '90s', '10m', '1.5h' -> seconds."""
+    units = {"s": 1, "m": 60, "h": 3600}
+    value = value.strip().lower()
+    if value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def generate_recording(path: Path, seconds: float, seed: int = 0):
+    """Write utterances of 2-9s separated by 0.6-1.2s pauses, block by block."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    written = 0
+
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+
+        while written < total:
+            n = int(rng.uniform(2, 9) * SAMPLE_RATE)
+            t = np.arange(n) / SAMPLE_RATE
+            pitch = rng.uniform(100, 160) + 15 * np.sin(2 * np.pi * 0.5 * t)
+            phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+            voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+            envelope = 0.4 + 0.6 * np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+            speech = 0.25 * voiced * envelope
+
+            pause = int(rng.uniform(0.6, 1.2) * SAMPLE_RATE)
+            noise = 0.002 * rng.standard_normal(pause)
+
+            block = np.concatenate([speech, noise])[: total - written]
+            w.writeframes((np.clip(block, -1, 1) * 32767).astype("<i2").tobytes())
+            written += len(block)
+
+
+def _run_stage(stage: str, workdir: str, queue):
+    """Child-process entry point: run one stage and report its cost."""
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    os.chdir(workdir)
+    work = Path(workdir)
+
+    import process_voice
+
+    process_voice.VOICE_DATA = work / "voice-data"
+    process_voice.STORE_DIR = work / "voice-data" / "store"
+
+    def load_clips():
+        return process_voice.open_store().entries()
+
+    start = time.perf_counter()
+    clips = None
+
+    if stage == "convert_to_wav":
+        process_voice.convert_to_wav(str(work / "input.wav"))
+    elif stage == "split_audio":
+        clips = process_voice.split_audio(str(work / "input.wav"))
+        process_voice.save_manifest(clips, quiet=True)
+    elif stage == "transcribe_clips":
+        clips = process_voice.transcribe_clips(load_clips(), backend="stand-in", workers=8)
+    elif stage == "save_manifest":
+        clips = load_clips()
+        start = time.perf_counter()
+        process_voice.save_manifest(clips, quiet=True)
+    elif stage == "split_audio.py":
+        processed = work / "voice-data" / "processed"
+        processed.mkdir(parents=True, exist_ok=True)
+        shutil.copy(work / "input.wav", processed / "input.wav")
+        # The script parses sys.argv; don't hand it this benchmark's arguments
+        sys.argv = ["split_audio.py"]
+        start = time.perf_counter()
+        runpy.run_path(str(SCRIPTS_DIR / "split_audio.py"), run_name="__main__")
+        clips = load_clips()
+
+    wall = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+    queue.put({"wall_s": wall, "peak_rss_mb": rss_mb, "clips": len(clips) if clips is not None else None})
+
+
+def run_stage(stage: str, workdir: Path, audio_seconds: float) -> dict:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_stage, args=(stage, str(workdir), queue))
+
+    # Stage output is noisy; keep the benchmark table readable
+    with open(os.devnull, "w") as devnull:
+        stdout = os.dup(1)
+        os.dup2(devnull.fileno(), 1)
+        try:
+            proc.start()
+            proc.join()
+        finally:
+            os.dup2(stdout, 1)
+            os.close(stdout)
+
+    if proc.exitcode != 0 or queue.empty():
+        return {"stage": stage, "error": f"exit code {proc.exitcode}"}
+
+    r = queue.get()
+    return {
+        "stage": stage,
+        "wall_s": round(r["wall_s"], 3),
+        "peak_rss_mb": round(r["peak_rss_mb"], 1),
+        "realtime_factor": round(audio_seconds / r["wall_s"], 1) if r["wall_s"] else None,
+        "clips": r["clips"],
+        "clips_per_s": round(r["clips"] / r["wall_s"], 1) if r["clips"] and r["wall_s"] else None,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPTS_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(old: dict, new: dict):
+    key = lambda r: (r["audio_s"], r["stage"])
+    previous = {key(r): r for r in old["results"] if "wall_s" in r}
+
+    print(f"\nvs {old['meta'].get('git_rev')} ({old['meta'].get('timestamp')}):")
+    for r in new["results"]:
+        before = previous.get(key(r))
+        if not before or "wall_s" not in r:
+            continue
+        change = (r["wall_s"] - before["wall_s"]) / before["wall_s"] * 100 if before["wall_s"] else 0
+        print(
+            f"  {r['audio_s']:>7.0f}s {r['stage']:<18} {before['wall_s']:>8.2f}s -> {r['wall_s']:>8.2f}s "
+            f"({change:+.0f}%), rss {before['peak_rss_mb']:.0f} -> {r['peak_rss_mb']:.0f} MB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", default="1m,10m", help="comma-separated lengths, e.g. 1m,10m,1h,5h")
+    parser.add_argument("--out", default="bench_pipeline.json", help="where to write JSON results")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    stages = ["convert_to_wav", "split_audio", "transcribe_clips", "save_manifest", "split_audio.py"]
+    if not shutil.which("ffmpeg"):
+        print("ffmpeg not found - skipping convert_to_wav")
+        stages.remove("convert_to_wav")
+
+    results = []
+    for length in args.lengths.split(","):
+        seconds = parse_length(length)
+        with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as tmp:
+            workdir = Path(tmp)
+            generate_recording(workdir / "input.wav", seconds)
+            print(f"\n{seconds:.0f}s recording")
+
+            for stage in stages:
+                r = {"audio_s": seconds, **run_stage(stage, workdir, seconds)}
+                results.append(r)
+                if "error" in r:
+                    print(f"  {stage:<18} failed ({r['error']})")
+                    continue
+                clips = f"{r['clips_per_s']:>8} clips/s" if r["clips_per_s"] else ""
+                print(
+                    f"  {stage:<18} {r['wall_s']:>8.2f}s  {r['peak_rss_mb']:>7.0f} MB  "
+                    f"{r['realtime_factor']:>8}x realtime {clips}"
+                )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_rev": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Convert between the packed clip store and the loose clip layout.
+Usage: python scripts/clip_store.py import [--clips DIR] [--manifest PATH] [--store DIR]
+       python scripts/clip_store.py export [--clips DIR] [--manifest PATH] [--store DIR]
+       python scripts/clip_store.py compact [--store DIR]
+       python scripts/clip_store.py migrate --voices DIR
+
+import packs voice-data/clips/*.wav (in manifest.json order, with its
+transcripts and fields) into voice-data/store; export writes every stored
+clip back out as a WAV plus a manifest.json. compact rewrites the store's
+data file without the audio of replaced or removed clips. migrate packs the
+loose clip WAVs of every voice directory under --voices into that voice's
+own store, once, before the service reads the clips from it.
+"""
+
+import argparse
+from pathlib import Path
+
+from voice_audio import ClipStore, migrate_layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["import", "export", "compact", "migrate"])
+    parser.add_argument("--clips", default="voice-data/clips", help="loose clip directory")
+    parser.add_argument("--manifest", default="voice-data/manifest.json", help="manifest.json path")
+    parser.add_argument("--store", default="voice-data/store", help="clip store directory")
+    parser.add_argument("--voices", help="voices directory (migrate)")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        if not args.voices:
+            parser.error("migrate requires --voices")
+        for voice_id, count in migrate_layout(args.voices).items():
+            print(f"✅ {voice_id}: packed {count} clips")
+        return
+
+    with ClipStore(Path(args.store)) as store:
+        if args.command == "import":
+            count = store.import_layout(args.clips, args.manifest)
+            print(f"✅ Imported {count} clips into {args.store} ({len(store)} total)")
+        elif args.command == "export":
+            count = store.export_layout(args.clips, args.manifest)
+            print(f"✅ Exported {count} clips to {args.clips}")
+            print(f"   Manifest: {args.manifest}")
+        else:
+            reclaimed = store.compact(min_dead_ratio=0.0)
+            print(f"✅ Reclaimed {reclaimed / (1 << 20):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
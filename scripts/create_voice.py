@@ -6,26 +6,24 @@ Create voice profile on Modal TTS service.
 import modal
 from pathlib import Path
 
-CLIPS_DIR = Path("voice-data/clips")
-VOICE_ID = "austin"
+from voice_audio import ClipStore
+from voice_upload import upload_voice
 
-print(f"Loading clips from {CLIPS_DIR}...")
+STORE_DIR = Path("voice-data/store")
+VOICE_ID = "austin"
 
-# Get all wav clips
-clip_files = sorted(CLIPS_DIR.glob("*.wav"))[:10]  # Use up to 10 clips
-print(f"Found {len(clip_files)} clips, using {len(clip_files)}")
+print(f"Loading clips from {STORE_DIR}...")
 
-# Read clip bytes
-clips = []
-for clip_path in clip_files:
-    print(f"  Loading {clip_path.name}...")
-    clips.append(clip_path.read_bytes())
+store = ClipStore(STORE_DIR)
+entries = store.entries()
+names = [e["path"] for e in entries[:10]]  # Use up to 10 clips
+print(f"Found {len(entries)} clips, using {len(names)}")
 
 print(f"\nCreating voice profile '{VOICE_ID}' on Modal...")
 
-# Call Modal function using Function.from_name
+# Clips stream up in chunks; ones already on the volume are skipped
 TTSService = modal.Cls.from_name("digital-mind-tts", "TTSService")
-result = TTSService().create_voice.remote(VOICE_ID, clips)
+result = upload_voice(TTSService(), VOICE_ID, store, names)
 
 print(f"✅ Voice profile created: {result}")
 
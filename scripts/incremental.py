@@ -0,0 +1,62 @@
+"""
+Content-hash bookkeeping for incremental voice-data runs.
+
+Each clip in the store (voice_audio.ClipStore) records where it came from:
+
+    source          input name (file stem)
+    source_sha256   hash of the input file the clip was cut from
+    params          splitting parameters used
+    sha256          hash of the clip itself
+    uploaded_sha256 hash of the clip last uploaded to the voice volume
+
+A source is reprocessed only when its hash or params differ from what the
+store recorded. Clip audio only changes through the store, so its clips
+need no re-hashing.
+"""
+
+import hashlib
+
+from voice_audio import SAMPLE_RATE, wav_sha256
+
+
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_is_current(store, source: str, source_sha256: str, params: dict) -> bool:
+    """True if the clip store already holds up-to-date clips for this source."""
+    entries = [e for e in store.entries() if e.get("source") == source]
+    if not entries:
+        return False
+
+    return all(e.get("source_sha256") == source_sha256 and e.get("params") == params for e in entries)
+
+
+def replace_source(store, source: str, new_entries: list):
+    """Swap a source's clips in the store for freshly split ones.
+
+    new_entries carry their samples under "audio". Transcripts carry over to
+    new clips whose audio hash matches an old clip, so unchanged audio is
+    never re-transcribed, and unchanged audio is not written again.
+    """
+    old = [e for e in store.entries() if e.get("source") == source]
+    texts = {e["sha256"]: e.get("text", "") for e in old if e.get("sha256")}
+    uploaded = {(e["path"], e.get("sha256")): e.get("uploaded_sha256") for e in old}
+    new_paths = {e["path"] for e in new_entries}
+
+    for entry in new_entries:
+        entry["sha256"] = wav_sha256(entry["audio"], SAMPLE_RATE)
+        if not entry.get("text") and texts.get(entry["sha256"]):
+            entry["text"] = texts[entry["sha256"]]
+        # Same name and same audio means the volume copy is still current
+        if uploaded.get((entry["path"], entry["sha256"])):
+            entry["uploaded_sha256"] = uploaded[(entry["path"], entry["sha256"])]
+
+    with store.transaction():
+        store.remove(e["path"] for e in old if e["path"] not in new_paths)
+        for entry in new_entries:
+            store.add(entry["path"], entry["audio"], SAMPLE_RATE, **entry)
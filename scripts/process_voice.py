@@ -1,30 +1,48 @@
 #!/usr/bin/env python3
 """
 All-in-one voice processing script.
-Usage: python scripts/process_voice.py path/to/your/audio.mp3
+Usage: python scripts/process_voice.py [--full] path/to/your/audio.mp3 [more.mp3 ...]
 
 This will:
 1. Convert to WAV
 2. Split into clips (3-12 seconds each)
 3. Transcribe each clip
-4. Upload to Modal and create voice profile
+4. Upload to Modal and create voice profile (resumable; clips already on the
+   volume are skipped)
+
+Clips are kept in a packed clip store (voice-data/store: one PCM file plus
+a SQLite index, see tts_core.clip_store). By default runs are incremental:
+recordings already in the store with the same content hash and settings are
+skipped, new recordings are added to the corpus, and only new or changed
+clips are transcribed and uploaded. --full wipes the clips and rebuilds the
+voice from the given file alone.
 """
 
+import argparse
 import sys
 import os
-import json
 import subprocess
 from pathlib import Path
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).parent.parent
 VOICE_DATA = PROJECT_ROOT / "voice-data"
-CLIPS_DIR = VOICE_DATA / "clips"
+STORE_DIR = VOICE_DATA / "store"
 
 
-def convert_to_wav(input_path: str) -> str:
+# Splitting settings; recorded per clip so changing them reprocesses sources
+SPLIT_PARAMS = {
+    "sample_rate": 24000,
+    "noise_db": -30,
+    "min_silence": 0.5,
+    "min_duration": 3.0,
+    "max_duration": 12.0,
+}
+
+
+def convert_to_wav(input_path: str, output_name: str = "input") -> str:
     """Convert audio to WAV format."""
-    output_path = VOICE_DATA / "processed" / "input.wav"
+    output_path = VOICE_DATA / "processed" / f"{output_name}.wav"
     output_path.parent.mkdir(exist_ok=True)
 
     print(f"Converting {input_path} to WAV...")
@@ -38,42 +56,30 @@ def convert_to_wav(input_path: str) -> str:
     return str(output_path)
 
 
-def split_audio(wav_path: str, min_duration: float = 3.0, max_duration: float = 12.0):
-    """Split audio into clips using silence detection."""
+def open_store():
+    from voice_audio import ClipStore
+
+    return ClipStore(STORE_DIR)
+
+
+def split_audio(wav_path: str, min_duration: float = 3.0, max_duration: float = 12.0, prefix: str = "clip"):
+    """Split audio into clips using silence detection.
+
+    Clips carry their samples (views of the decoded recording) under
+    "audio"; save_manifest or incremental.replace_source packs them.
+    """
+    from voice_audio import SAMPLE_RATE, clip_quality, detect_silence, load_pcm, slice_seconds
+
     print(f"Splitting audio into {min_duration}-{max_duration}s clips...")
 
-    # Clear clips directory
-    for f in CLIPS_DIR.glob("*.wav"):
-        f.unlink()
-
-    # Use ffmpeg silence detection
-    result = subprocess.run([
-        "ffmpeg", "-i", wav_path,
-        "-af", "silencedetect=noise=-30dB:d=0.5",
-        "-f", "null", "-"
-    ], capture_output=True, text=True)
-
-    # Parse silence timestamps
-    import re
-    silence_starts = []
-    silence_ends = []
-
-    for line in result.stderr.split('\n'):
-        if 'silence_start' in line:
-            match = re.search(r'silence_start: ([\d.]+)', line)
-            if match:
-                silence_starts.append(float(match.group(1)))
-        elif 'silence_end' in line:
-            match = re.search(r'silence_end: ([\d.]+)', line)
-            if match:
-                silence_ends.append(float(match.group(1)))
-
-    # Get total duration
-    probe = subprocess.run([
-        "ffprobe", "-v", "error", "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1", wav_path
-    ], capture_output=True, text=True)
-    total_duration = float(probe.stdout.strip())
+    # Decode once; every stage below works on this array
+    samples = load_pcm(wav_path, SAMPLE_RATE)
+    total_duration = len(samples) / SAMPLE_RATE
+
+    # Same threshold as ffmpeg silencedetect=noise=-30dB:d=0.5
+    silences = detect_silence(samples, SAMPLE_RATE, noise_db=-30, min_duration=0.5)
+    silence_starts = [start for start, _ in silences]
+    silence_ends = [end for _, end in silences]
 
     # Create segments
     segments = []
@@ -99,93 +105,88 @@ def split_audio(wav_path: str, min_duration: float = 3.0, max_duration: float =
     if total_duration - current_start >= min_duration:
         segments.append((current_start, min(current_start + max_duration, total_duration)))
 
-    # Export clips
+    # Cut clips
     clips = []
     for i, (start, end) in enumerate(segments):
-        output_path = CLIPS_DIR / f"clip_{i:03d}.wav"
+        name = f"{prefix}_{i:03d}.wav"
         duration = end - start
 
-        subprocess.run([
-            "ffmpeg", "-y", "-i", wav_path,
-            "-ss", str(start), "-t", str(duration),
-            "-ar", "24000", "-ac", "1",
-            str(output_path)
-        ], check=True, capture_output=True)
+        clip_samples = slice_seconds(samples, SAMPLE_RATE, start, end)
 
         clips.append({
-            "path": output_path.name,
+            "path": name,
             "duration": round(duration, 2),
             "start": round(start, 2),
-            "end": round(end, 2)
+            "end": round(end, 2),
+            "quality": clip_quality(clip_samples, SAMPLE_RATE),
+            "audio": clip_samples,
         })
-        print(f"  Created {output_path.name} ({duration:.1f}s)")
+        print(f"  Created {name} ({duration:.1f}s)")
 
     print(f"Created {len(clips)} clips")
     return clips
 
 
-def transcribe_clips(clips: list) -> list:
-    """Transcribe clips using OpenAI Whisper API."""
-    from openai import OpenAI
-
-    client = OpenAI()
-    print("Transcribing clips...")
-
-    for clip in clips:
-        clip_path = CLIPS_DIR / clip["path"]
+def transcribe_clips(clips: list, backend: str | None = None, workers: int | None = None) -> list:
+    """Transcribe clips (OpenAI Whisper API unless TRANSCRIBE_BACKEND says otherwise).
 
-        with open(clip_path, "rb") as f:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=f,
-                response_format="text"
-            )
+    Audio is read from the clip store, and finished transcripts are written
+    to their rows as they come in, so a crash loses at most a few
+    transcriptions; scripts/transcribe_clips.py resumes from the store.
+    """
+    from transcription import get_transcriber, transcribe_all
 
-        clip["text"] = transcript.strip()
-        print(f"  {clip['path']}: \"{clip['text'][:50]}...\"")
+    workers = workers or int(os.environ.get("TRANSCRIBE_WORKERS", "4"))
+    store = open_store()
+    stats = transcribe_all(
+        clips,
+        store,
+        get_transcriber(backend),
+        workers=workers,
+        checkpoint=lambda finished: store.update_many({c["path"]: {"text": c["text"]} for c in finished}),
+    )
+    print(f"Transcribed {stats['transcribed']} clips ({stats['failed']} failed)")
 
     return clips
 
 
-def save_manifest(clips: list):
-    """Save manifest.json."""
-    manifest_path = VOICE_DATA / "manifest.json"
+def save_manifest(clips: list, quiet: bool = False):
+    """Make the clip store hold exactly these clips (one SQLite transaction).
 
-    manifest = [
-        {"path": c["path"], "duration": c["duration"], "text": c["text"]}
-        for c in clips
-    ]
+    Clips still carrying "audio" are packed into the store's data file
+    unless it already holds that audio; the rest only update index rows.
+    """
+    from voice_audio import SAMPLE_RATE
 
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
+    store = open_store()
+    store.save(clips, SAMPLE_RATE)
+    # Reclaim audio of replaced clips once it outweighs the live audio
+    store.compact()
 
-    print(f"Saved manifest with {len(clips)} clips")
+    if not quiet:
+        print(f"Saved {len(clips)} clips to {STORE_DIR}")
 
 
 def upload_to_modal(voice_id: str = "austin"):
-    """Upload clips to Modal and create voice profile."""
+    """Upload clips to Modal and (re)build the voice profile.
+
+    Clips go up in bounded chunks, only those the volume doesn't already
+    hold are sent, and conditioning runs as a background job on the service.
+    """
     import modal
+    from voice_upload import upload_voice
 
     print(f"Uploading to Modal as voice '{voice_id}'...")
 
-    # Load clips
-    manifest_path = VOICE_DATA / "manifest.json"
-    with open(manifest_path) as f:
-        manifest = json.load(f)
-
-    # Read audio files
-    audio_clips = []
-    for entry in manifest:
-        clip_path = CLIPS_DIR / entry["path"]
-        with open(clip_path, "rb") as f:
-            audio_clips.append(f.read())
+    store = open_store()
 
-    # Upload to Modal
     TTSService = modal.Cls.from_name("digital-mind-tts", "TTSService")
     service = TTSService()
 
-    result = service.create_voice.remote(voice_id, audio_clips)
-    print(f"Voice profile created: {result}")
+    job = upload_voice(service, voice_id, store)
+    print(f"Voice profile ready: {job['clips']} clips conditioned in {job['seconds']}s")
+
+    store.update_many({e["path"]: {"uploaded_sha256": e["sha256"]} for e in store.entries()})
 
     # Test synthesis
     print("Testing synthesis...")
@@ -202,29 +203,72 @@ def upload_to_modal(voice_id: str = "austin"):
     print(f"Play it with: afplay {test_path}")
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python scripts/process_voice.py <audio_file>")
-        print("       python scripts/process_voice.py path/to/recording.mp3")
-        sys.exit(1)
+def process_incremental(input_paths: list[str]) -> list:
+    """Add or refresh recordings in the clip store, skipping unchanged ones."""
+    from incremental import file_sha256, replace_source, source_is_current
 
-    input_path = sys.argv[1]
+    store = open_store()
 
-    if not os.path.exists(input_path):
-        print(f"Error: File not found: {input_path}")
-        sys.exit(1)
+    for input_path in input_paths:
+        source = Path(input_path).stem
+        source_sha256 = file_sha256(input_path)
+
+        if source_is_current(store, source, source_sha256, SPLIT_PARAMS):
+            print(f"Skipping {input_path} (unchanged)")
+            continue
+
+        wav_path = convert_to_wav(input_path, output_name=source)
+        clips = split_audio(
+            wav_path,
+            SPLIT_PARAMS["min_duration"],
+            SPLIT_PARAMS["max_duration"],
+            prefix=f"{source}_clip",
+        )
+        for clip in clips:
+            clip.update({
+                "source": source,
+                "source_sha256": source_sha256,
+                "params": SPLIT_PARAMS,
+            })
 
-    # Ensure clips directory exists
-    CLIPS_DIR.mkdir(exist_ok=True)
+        replace_source(store, source, clips)
+
+    return store.entries()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", metavar="audio_file", help="recording(s) to add to the voice")
+    parser.add_argument("--full", action="store_true",
+                        help="wipe the clips and rebuild the voice from a single recording")
+    parsed = parser.parse_args()
+    args, full = parsed.inputs, parsed.full
+
+    if full and len(args) > 1:
+        parser.error("--full rebuilds from a single recording; pass one audio file "
+                     "or drop --full to add several incrementally")
+
+    for input_path in args:
+        if not os.path.exists(input_path):
+            print(f"Error: File not found: {input_path}")
+            sys.exit(1)
 
     # Process pipeline
-    wav_path = convert_to_wav(input_path)
-    clips = split_audio(wav_path)
+    if full:
+        wav_path = convert_to_wav(args[0])
+        clips = split_audio(wav_path)
+    else:
+        clips = process_incremental(args)
 
     if not clips:
         print("Error: No clips created. Check your audio file.")
         sys.exit(1)
 
+    # Save before transcribing so the clips are in the store to read and checkpoint
+    from voice_audio import mark_conditioning
+
+    clips = mark_conditioning(clips)
+    save_manifest(clips)
     clips = transcribe_clips(clips)
     save_manifest(clips)
     upload_to_modal()
@@ -1,60 +1,52 @@
 #!/usr/bin/env python3
 """
 Split processed audio files into 3-12 second clips for voice cloning.
-Uses ffmpeg directly (no pydub dependency).
+Each file is decoded once into a memory-mapped array; silence detection
+works on that array and clips are packed from it straight into the clip
+store (no per-clip ffmpeg processes or files).
+
+Usage: python scripts/split_audio.py [--full]
+
+Runs are incremental: files whose content hash and split settings match the
+store keep their clips and transcripts. --full wipes and re-splits all.
+scripts/clip_store.py exports the store to loose clips and a manifest.
 """
 
-import os
-import json
-import subprocess
+import argparse
 from pathlib import Path
 
+from incremental import file_sha256, replace_source, source_is_current
+from voice_audio import SAMPLE_RATE, ClipStore, clip_quality, load_pcm, mark_conditioning, slice_seconds
+from voice_audio import detect_silence as detect_silence_rms
+
 INPUT_DIR = Path("voice-data/processed")
-OUTPUT_DIR = Path("voice-data/clips")
-OUTPUT_DIR.mkdir(exist_ok=True)
-
-# Clear existing clips (except .gitkeep)
-for f in OUTPUT_DIR.glob("*.wav"):
-    f.unlink()
-
-def get_duration(filepath):
-    """Get audio duration using ffprobe."""
-    result = subprocess.run([
-        "ffprobe", "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "csv=p=0",
-        str(filepath)
-    ], capture_output=True, text=True)
-    return float(result.stdout.strip())
-
-def detect_silence(filepath):
-    """Detect silence regions using ffmpeg silencedetect."""
-    result = subprocess.run([
-        "ffmpeg", "-i", str(filepath),
-        "-af", "silencedetect=noise=-40dB:d=0.4",
-        "-f", "null", "-"
-    ], capture_output=True, text=True)
-
-    # Parse silence_start and silence_end from stderr
-    lines = result.stderr.split("\n")
-    silences = []
-    current_start = None
-
-    for line in lines:
-        if "silence_start:" in line:
-            current_start = float(line.split("silence_start:")[1].strip().split()[0])
-        elif "silence_end:" in line and current_start is not None:
-            end = float(line.split("silence_end:")[1].strip().split()[0])
-            silences.append((current_start, end))
-            current_start = None
-
-    return silences
+STORE_DIR = Path("voice-data/store")
+
+SPLIT_PARAMS = {"sample_rate": SAMPLE_RATE, "noise_db": -40, "min_silence": 0.4, "min_duration": 3, "max_duration": 12}
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--full", action="store_true", help="wipe the store and re-split every file")
+full = parser.parse_args().full
+
+store = ClipStore(STORE_DIR)
+
+if full:
+    # Clear existing clips
+    store.clear()
+
+def detect_silence(samples):
+    """Detect silence regions (same -40dB / 0.4s thresholds as silencedetect)."""
+    return detect_silence_rms(
+        samples, SAMPLE_RATE,
+        noise_db=SPLIT_PARAMS["noise_db"], min_duration=SPLIT_PARAMS["min_silence"],
+    )
 
 def split_on_silence(filepath, output_prefix, min_dur=3, max_dur=12):
-    """Split audio file on silence points."""
+    """Split audio file on silence points; clips carry their samples under "audio"."""
     clips = []
-    duration = get_duration(filepath)
-    silences = detect_silence(filepath)
+    samples = load_pcm(filepath, SAMPLE_RATE)
+    duration = len(samples) / SAMPLE_RATE
+    silences = detect_silence(samples)
 
     # Find split points (midpoint of each silence region)
     split_points = [0]
@@ -94,19 +86,14 @@ def split_on_silence(filepath, output_prefix, min_dur=3, max_dur=12):
         # Only save clips of appropriate length
         if clip_dur >= min_dur and clip_dur <= max_dur:
             clip_name = f"{output_prefix}_clip_{clip_count:03d}.wav"
-            output_path = OUTPUT_DIR / clip_name
-
-            subprocess.run([
-                "ffmpeg", "-y", "-i", str(filepath),
-                "-ss", str(start), "-t", str(clip_dur),
-                "-c", "copy",
-                str(output_path)
-            ], capture_output=True)
+            clip_samples = slice_seconds(samples, SAMPLE_RATE, start, end)
 
             clips.append({
                 "path": clip_name,
                 "duration": round(clip_dur, 2),
-                "text": ""
+                "text": "",
+                "quality": clip_quality(clip_samples, SAMPLE_RATE),
+                "audio": clip_samples,
             })
             clip_count += 1
 
@@ -116,21 +103,45 @@ def split_on_silence(filepath, output_prefix, min_dur=3, max_dur=12):
 
 print("Splitting audio into clips...")
 
-manifest = []
+sources = sorted(INPUT_DIR.glob("*.wav"))
+created = 0
+
+for audio_file in sources:
+    source_sha256 = file_sha256(audio_file)
+
+    if not full and source_is_current(store, audio_file.stem, source_sha256, SPLIT_PARAMS):
+        print(f"\nSkipping: {audio_file.name} (unchanged)")
+        continue
 
-for audio_file in sorted(INPUT_DIR.glob("*.wav")):
     print(f"\nProcessing: {audio_file.name}")
 
-    clips = split_on_silence(audio_file, audio_file.stem)
-    manifest.extend(clips)
+    clips = split_on_silence(
+        audio_file, audio_file.stem, SPLIT_PARAMS["min_duration"], SPLIT_PARAMS["max_duration"]
+    )
+    for clip in clips:
+        clip.update({
+            "source": audio_file.stem,
+            "source_sha256": source_sha256,
+            "params": SPLIT_PARAMS,
+        })
+    replace_source(store, audio_file.stem, clips)
+    created += len(clips)
 
     print(f"  Created {len(clips)} clips")
 
-# Save manifest
-manifest_path = Path("voice-data/manifest.json")
-with open(manifest_path, "w") as f:
-    json.dump(manifest, f, indent=2)
+# Forget recordings that were removed from the processed directory
+current = {f.stem for f in sources}
+for source in {e.get("source") for e in store.entries()} - current:
+    if source is not None:
+        replace_source(store, source, [])
+        print(f"\nRemoved clips for deleted recording: {source}")
+
+# Score-based pick of the clips the TTS service will condition on
+clips = mark_conditioning(store.entries())
+store.update_many({c["path"]: {"conditioning": c["conditioning"]} for c in clips if "conditioning" in c})
+
+# Reclaim audio of replaced clips once it outweighs the live audio
+store.compact()
 
-print(f"\n✅ Created {len(manifest)} clips total")
-print(f"   Output: {OUTPUT_DIR}")
-print(f"   Manifest: {manifest_path}")
+print(f"\n✅ Created {created} clips ({len(clips)} total)")
+print(f"   Store: {STORE_DIR}")
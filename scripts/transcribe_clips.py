@@ -1,64 +1,37 @@
 #!/usr/bin/env python3
 """
-Transcribe audio clips using OpenAI Whisper API.
-Requires: OPENAI_API_KEY environment variable
+Transcribe audio clips in the clip store.
+Usage: python scripts/transcribe_clips.py [backend] [workers]
+
+Backends: whisper-api (default, needs OPENAI_API_KEY), local-whisper
+(offline faster-whisper), stand-in (no network). Clips that already have
+text are skipped and each finished transcript is checkpointed to its row in
+the store, so the script can be re-run after a crash.
 """
 
 import os
-import json
+import sys
 from pathlib import Path
 
-try:
-    from openai import OpenAI
-except ImportError:
-    print("Installing openai...")
-    os.system("pip install openai --break-system-packages")
-    from openai import OpenAI
-
-CLIPS_DIR = Path("voice-data/clips")
-MANIFEST_PATH = Path("voice-data/manifest.json")
-
-# Load manifest
-with open(MANIFEST_PATH) as f:
-    manifest = json.load(f)
-
-# Initialize OpenAI client
-client = OpenAI()
-
-print(f"Transcribing {len(manifest)} clips...")
-
-for i, item in enumerate(manifest):
-    clip_path = CLIPS_DIR / item["path"]
-
-    if not clip_path.exists():
-        print(f"  [{i+1}/{len(manifest)}] SKIP - {item['path']} not found")
-        continue
-
-    if item.get("text"):
-        print(f"  [{i+1}/{len(manifest)}] SKIP - {item['path']} already transcribed")
-        continue
-
-    print(f"  [{i+1}/{len(manifest)}] Transcribing {item['path']}...", end=" ", flush=True)
+from transcription import get_transcriber, transcribe_all
+from voice_audio import ClipStore
 
-    try:
-        with open(clip_path, "rb") as audio_file:
-            result = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text"
-            )
+STORE_DIR = Path("voice-data/store")
 
-        item["text"] = result.strip()
-        print(f"✓ ({len(item['text'])} chars)")
+backend = sys.argv[1] if len(sys.argv) > 1 else None
+workers = int(sys.argv[2]) if len(sys.argv) > 2 else int(os.environ.get("TRANSCRIBE_WORKERS", "4"))
 
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        item["text"] = ""
+store = ClipStore(STORE_DIR)
+clips = store.entries()
 
-# Save updated manifest
-with open(MANIFEST_PATH, "w") as f:
-    json.dump(manifest, f, indent=2)
+stats = transcribe_all(
+    clips,
+    store,
+    get_transcriber(backend),
+    workers=workers,
+    checkpoint=lambda finished: store.update_many({c["path"]: {"text": c["text"]} for c in finished}),
+)
 
-transcribed = sum(1 for item in manifest if item.get("text"))
-print(f"\n✅ Transcribed {transcribed}/{len(manifest)} clips")
-print(f"   Manifest updated: {MANIFEST_PATH}")
+transcribed = sum(1 for clip in clips if clip.get("text"))
+print(f"\n✅ Transcribed {transcribed}/{len(clips)} clips ({stats['failed']} failed this run)")
+print(f"   Store updated: {STORE_DIR}")
@@ -0,0 +1,177 @@
+"""
+Clip transcription for the voice-data scripts.
+
+Backends share one tiny interface (transcribe(name, wav) -> text, with the
+clip's WAV bytes read from the clip store), so the OpenAI Whisper API can be
+swapped for an offline model or a no-network stand-in. transcribe_all()
+runs a bounded worker pool with retry/backoff and checkpoints progress so
+an interrupted run picks up where it left off.
+"""
+
+import io
+import os
+import random
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class Transcriber(ABC):
+    """Backend interface."""
+
+    name = "base"
+
+    @abstractmethod
+    def transcribe(self, name: str, wav: bytes) -> str:
+        """Transcript of one clip, given its file name and WAV bytes."""
+
+
+class WhisperAPITranscriber(Transcriber):
+    """OpenAI Whisper API (needs OPENAI_API_KEY)."""
+
+    name = "whisper-api"
+
+    def __init__(self, model: str = "whisper-1"):
+        from openai import OpenAI
+
+        self.client = OpenAI()
+        self.model = model
+
+    def transcribe(self, name: str, wav: bytes) -> str:
+        result = self.client.audio.transcriptions.create(
+            model=self.model,
+            file=(name, wav),
+            response_format="text"
+        )
+        return result.strip()
+
+
+class LocalWhisperTranscriber(Transcriber):
+    """Offline faster-whisper model (pip install faster-whisper)."""
+
+    name = "local-whisper"
+
+    def __init__(self, model: str = "base.en"):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model, device="auto", compute_type="int8")
+        # The model is not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    def transcribe(self, name: str, wav: bytes) -> str:
+        with self._lock:
+            segments, _ = self.model.transcribe(io.BytesIO(wav), language="en")
+            return " ".join(s.text.strip() for s in segments).strip()
+
+
+class StandInTranscriber(Transcriber):
+    """No-network stand-in for tests and benchmarks.
+
+    Returns a deterministic placeholder and optionally sleeps to mimic a
+    remote call (latency scales with clip duration).
+    """
+
+    name = "stand-in"
+
+    def __init__(self, latency_per_second: float = 0.0):
+        self.latency_per_second = latency_per_second
+
+    def transcribe(self, name: str, wav: bytes) -> str:
+        with wave.open(io.BytesIO(wav), "rb") as w:
+            duration = w.getnframes() / w.getframerate()
+        if self.latency_per_second:
+            time.sleep(duration * self.latency_per_second)
+        return f"stand-in transcript for {name} ({duration:.2f}s)"
+
+
+BACKENDS = {
+    WhisperAPITranscriber.name: WhisperAPITranscriber,
+    LocalWhisperTranscriber.name: LocalWhisperTranscriber,
+    StandInTranscriber.name: StandInTranscriber,
+}
+
+
+def get_transcriber(name: str | None = None) -> Transcriber:
+    """Build a backend by name (defaults to $TRANSCRIBE_BACKEND or the Whisper API)."""
+    name = name or os.environ.get("TRANSCRIBE_BACKEND", WhisperAPITranscriber.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+def _with_retries(fn, retries: int, backoff: float):
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if attempt == retries:
+                raise
+            # Exponential backoff with jitter so workers don't retry in lockstep
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def transcribe_all(
+    items: list,
+    store,
+    transcriber: Transcriber,
+    workers: int = 4,
+    retries: int = 3,
+    backoff: float = 1.0,
+    checkpoint=None,
+    checkpoint_every: int = 10,
+) -> dict:
+    """Fill in item["text"] for every item that doesn't have one yet.
+
+    Audio comes from the clip store (any object with wav_bytes(name) and
+    `in`). checkpoint(finished) is called with the items finished since the
+    last call, every checkpoint_every clips and once at the end, so callers
+    can persist just those rows. Failed clips keep an empty text so a rerun
+    retries them.
+    """
+    todo = []
+    missing = 0
+    for item in items:
+        if item.get("text"):
+            continue
+        if item["path"] not in store:
+            print(f"  SKIP - {item['path']} not found")
+            missing += 1
+            continue
+        todo.append(item)
+
+    skipped = len(items) - len(todo) - missing
+    print(f"Transcribing {len(todo)} clips with {transcriber.name} "
+          f"({workers} workers, {skipped} already done)...")
+
+    # Workers only return text; items are updated (and checkpointed) on this thread
+    done = failed = 0
+    finished = []
+
+    def run(item):
+        wav = store.wav_bytes(item["path"])
+        return _with_retries(lambda: transcriber.transcribe(item["path"], wav), retries, backoff)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, item): item for item in todo}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                item["text"] = future.result()
+                print(f"  [{done + failed + 1}/{len(todo)}] {item['path']}: \"{item['text'][:50]}...\"")
+                done += 1
+            except Exception as e:
+                item["text"] = ""
+                print(f"  [{done + failed + 1}/{len(todo)}] ✗ {item['path']}: {e}")
+                failed += 1
+            finished.append(item)
+
+            if checkpoint and len(finished) >= checkpoint_every:
+                checkpoint(finished)
+                finished = []
+
+    if checkpoint:
+        checkpoint(finished)
+
+    return {"transcribed": done, "failed": failed, "skipped": skipped, "missing": missing}
@@ -0,0 +1,147 @@
+"""
+In-process audio helpers for the voice-data scripts.
+
+Audio is decoded once into an int16 array (memory-mapped straight from the
+file for 16-bit PCM WAVs), silence is found with vectorized frame RMS, and
+clips are slices of that array packed into a ClipStore - no per-clip ffmpeg
+processes or files.
+"""
+
+import struct
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Clip scoring and the packed clip store are shared with the TTS service
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "tts"))
+
+from tts_core.clip_quality import select_clips  # noqa: E402
+from tts_core.clip_store import ClipStore, clip_quality, migrate_layout, wav_sha256  # noqa: E402,F401
+
+SAMPLE_RATE = 24000  # XTTS native
+
+# Matches the service's default TTS_CONDITIONING_BUDGET_S
+CONDITIONING_BUDGET_S = 30.0
+
+
+def _wav_data_offset(path) -> tuple[int, int, int] | None:
+    """(data offset, data bytes, sample rate) for mono 16-bit PCM WAVs, else None."""
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(size - 16 + (size & 1), 1)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    return None
+                audio_format, channels, rate, _, _, bits = fmt
+                if audio_format != 1 or channels != 1 or bits != 16:
+                    return None
+                # ffmpeg writes 0xFFFFFFFF sizes when streaming; trust the file length
+                remaining = Path(path).stat().st_size - f.tell()
+                return f.tell(), min(size, remaining) & ~1, rate
+            else:
+                f.seek(size + (size & 1), 1)
+
+
+def load_pcm(path, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode audio to mono int16 at sample_rate.
+
+    Mono 16-bit WAVs already at the target rate are memory-mapped in place.
+    Anything else is decoded by a single ffmpeg pass into a temp file that
+    is then memory-mapped.
+    """
+    info = _wav_data_offset(path)
+    if info is not None and info[2] == sample_rate:
+        offset, size, _ = info
+        return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(size // 2,))
+
+    raw = tempfile.NamedTemporaryFile(suffix=".pcm", delete=False)
+    raw.close()
+    subprocess.run([
+        "ffmpeg", "-y", "-i", str(path),
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate), "-ac", "1",
+        raw.name
+    ], check=True, capture_output=True)
+
+    # The mapping keeps the data alive; the directory entry can go now
+    samples = np.memmap(raw.name, dtype="<i2", mode="r")
+    Path(raw.name).unlink()
+    return samples
+
+
+def frame_rms_db(samples: np.ndarray, sample_rate: int, frame_ms: float = 10.0,
+                 block_frames: int = 65536) -> np.ndarray:
+    """RMS level of each frame in dBFS, computed block by block to bound memory."""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(samples) // frame_len
+    levels = np.empty(n_frames, dtype=np.float32)
+
+    for start in range(0, n_frames, block_frames):
+        stop = min(start + block_frames, n_frames)
+        block = np.asarray(samples[start * frame_len:stop * frame_len], dtype=np.float32)
+        block = block.reshape(-1, frame_len) / 32768.0
+        rms = np.sqrt(np.mean(block * block, axis=1))
+        levels[start:stop] = 20 * np.log10(np.maximum(rms, 1e-10))
+
+    return levels
+
+
+def detect_silence(samples: np.ndarray, sample_rate: int, noise_db: float,
+                   min_duration: float, frame_ms: float = 10.0) -> list[tuple[float, float]]:
+    """(start, end) seconds of every run quieter than noise_db for min_duration.
+
+    Mirrors ffmpeg's silencedetect: trailing silence is closed at end of input.
+    """
+    frame_s = frame_ms / 1000
+    quiet = frame_rms_db(samples, sample_rate, frame_ms) < noise_db
+    if not quiet.any():
+        return []
+
+    # Run boundaries: +1 where a quiet run starts, -1 one past where it ends
+    edges = np.diff(np.concatenate(([0], quiet.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    min_frames = int(round(min_duration / frame_s))
+    keep = (ends - starts) >= min_frames
+    total = len(samples) / sample_rate
+
+    return [
+        (float(s * frame_s), float(min(e * frame_s, total)))
+        for s, e in zip(starts[keep], ends[keep])
+    ]
+
+
+def slice_seconds(samples: np.ndarray, sample_rate: int, start: float, end: float) -> np.ndarray:
+    return samples[int(round(start * sample_rate)):int(round(end * sample_rate))]
+
+
+def mark_conditioning(manifest: list, budget_seconds: float = CONDITIONING_BUDGET_S) -> list:
+    """Flag the clips the service will condition on (best subset within budget)."""
+    candidates = [
+        {"index": i, "duration": e["duration"], "score": e["quality"]["score"]}
+        for i, e in enumerate(manifest) if "quality" in e
+    ]
+    chosen = {c["index"] for c in select_clips(candidates, budget_seconds)}
+
+    for i, entry in enumerate(manifest):
+        if "quality" in entry:
+            entry["conditioning"] = i in chosen
+
+    seconds = sum(manifest[i]["duration"] for i in chosen)
+    print(f"Selected {len(chosen)} conditioning clips ({seconds:.1f}s of {budget_seconds:.0f}s budget)")
+    return manifest
@@ -0,0 +1,72 @@
+"""
+Client side of the TTS service's resumable voice upload.
+
+Clips are read from the clip store, whose index already holds each clip's
+content hash, and sent as WAV bytes in bounded chunks. Clips the volume
+already holds (by content hash) are skipped, and re-running after an
+interruption resumes from the bytes that arrived. Conditioning runs on the
+service as a background job, polled until done or until timeout_s.
+"""
+
+import time
+
+CHUNK_BYTES = 4 * 1024 * 1024
+
+
+def upload_voice(service, voice_id: str, store, names: list | None = None, chunk_bytes: int = CHUNK_BYTES,
+                 wait: bool = True, poll_s: float = 2.0, timeout_s: float = 30 * 60) -> dict:
+    """Upload the store's clips (or just names) as the full clip set of voice_id.
+
+    service is a TTSService handle (modal.Cls(...)()). Returns the finished
+    job (or the queued one if wait is False). Raises TimeoutError if the job
+    hasn't finished within timeout_s; re-running resumes the upload.
+    """
+    entries = store.entries()
+    if names is not None:
+        wanted = set(names)
+        entries = [e for e in entries if e["path"] in wanted]
+
+    clips = []
+    by_hash = {}
+    for entry in entries:
+        clips.append({"name": entry["path"], "sha256": entry["sha256"], "size": store.wav_size(entry["path"])})
+        by_hash[entry["sha256"]] = entry["path"]
+
+    upload = service.start_voice_upload.remote(voice_id, clips)
+    missing = upload["missing"]
+    chunk_bytes = min(chunk_bytes, upload["max_chunk_bytes"])
+    print(
+        f"  {len(clips)} clips: {upload['deduplicated']} already on the volume, "
+        f"{len(missing)} to send"
+    )
+
+    for i, (sha256, received) in enumerate(missing.items(), 1):
+        name = by_hash[sha256]
+        wav = memoryview(store.wav_bytes(name))
+        if received:
+            print(f"  [{i}/{len(missing)}] Resuming {name} at {received}/{len(wav)} bytes")
+        else:
+            print(f"  [{i}/{len(missing)}] Sending {name} ({len(wav)} bytes)")
+        for offset in range(received, len(wav), chunk_bytes):
+            service.upload_clip_chunk.remote(upload["upload_id"], sha256, offset, bytes(wav[offset:offset + chunk_bytes]))
+
+    job = service.finish_voice_upload.remote(upload["upload_id"])
+    print(f"  Conditioning job {job['job_id']} queued")
+    if not wait:
+        return job
+
+    status = job["status"]
+    deadline = time.monotonic() + timeout_s
+    while job["status"] not in ("ready", "failed"):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Voice job {job['job_id']} still {status} after {timeout_s:.0f}s")
+        time.sleep(poll_s)
+        job = service.voice_job.remote(job["job_id"])
+        if job["status"] != status:
+            status = job["status"]
+            print(f"  Job {status}")
+
+    if job["status"] == "failed":
+        raise RuntimeError(f"Voice job failed: {job.get('error')}")
+    return job
+
@@ -1,11 +1,47 @@
 """
 Digital Mind TTS Service - XTTS v2 on Modal
 Provides voice cloning and text-to-speech synthesis.
+
+The service logic lives in tts_core (engine.py for the model, server.py for
+the HTTP API); this file only wires it into Modal. The HTTP API is served
+from the GPU container itself, so a request is a single hop.
 """
 
 import modal
-import io
-import base64
+import os
+
+# tts_core isn't in the image until the last build step (and isn't needed to
+# deploy), so the few settings used here are read directly; tts_core.config
+# reads the same variables and defaults inside the container
+MODEL_PATH = "/root/.local/share/tts/tts_models--multilingual--multi-dataset--xtts_v2"
+FAST_CHECKPOINT = f"{MODEL_PATH}/model.safetensors"
+VOICES_DIR = "/voices"
+
+# TTS_GPU="" deploys a CPU-only pool (see TTS_DEVICE/TTS_QUANTIZE in tts_core.config)
+GPU = os.environ.get("TTS_GPU", "A10G") or None
+# Concurrent requests one container accepts; cache misses among them are
+# grouped onto the GPU by the engine's micro-batcher
+MAX_CONCURRENT_INPUTS = int(os.environ.get("TTS_MAX_CONCURRENT_INPUTS", "32"))
+
+
+def _convert_checkpoint():
+    """Image build step: re-save the XTTS checkpoint as safetensors.
+
+    Stores the already-filtered state dict load_checkpoint would build, so
+    startup can memory-map it instead of unpickling the full model.pth.
+    """
+    from safetensors.torch import save_file
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import Xtts
+
+    config = XttsConfig()
+    config.load_json(f"{MODEL_PATH}/config.json")
+    model = Xtts.init_from_config(config)
+
+    state = model.get_compatible_checkpoint_state_dict(f"{MODEL_PATH}/model.pth")
+    # safetensors rejects shared storage, so give every tensor its own copy
+    save_file({k: v.contiguous().clone() for k, v in state.items()}, FAST_CHECKPOINT)
+
 
 # Define the Modal image with XTTS dependencies
 image = (
@@ -18,9 +54,13 @@ image = (
         "transformers==4.36.0",
         "numpy<2",
         "fastapi[standard]",
+        "safetensors",
+        "av",
     )
     .env({"COQUI_TOS_AGREED": "1"})
     .run_commands("python -c \"from TTS.api import TTS; TTS('tts_models/multilingual/multi-dataset/xtts_v2')\"")
+    .run_function(_convert_checkpoint)
+    .add_local_python_source("tts_core")
 )
 
 app = modal.App("digital-mind-tts", image=image)
@@ -29,200 +69,145 @@ app = modal.App("digital-mind-tts", image=image)
 voice_volume = modal.Volume.from_name("voice-profiles", create_if_missing=True)
 
 
+@app.function(volumes={VOICES_DIR: voice_volume}, timeout=3600)
+def migrate_clip_layout():
+    """One-off: pack clip WAVs left on the volume by the old per-file layout.
+
+    modal run services/tts/app.py::migrate_clip_layout
+    """
+    from tts_core.clip_store import migrate_layout
+
+    voice_volume.reload()
+    packed = migrate_layout(VOICES_DIR)
+    voice_volume.commit()
+    for voice_id, count in packed.items():
+        print(f"  {voice_id}: packed {count} clips")
+
+
 @app.cls(
-    gpu="A10G",
+    gpu=GPU,
     scaledown_window=300,
     min_containers=1,  # Keep warm
-    volumes={"/voices": voice_volume},
+    volumes={VOICES_DIR: voice_volume},
     timeout=600,
 )
+@modal.concurrent(max_inputs=MAX_CONCURRENT_INPUTS)
 class TTSService:
     @modal.enter()
     def load_model(self):
         """Load XTTS model and pre-cache voice embeddings."""
-        import os
-        import torch
-        os.environ["COQUI_TOS_AGREED"] = "1"
-
-        from TTS.tts.configs.xtts_config import XttsConfig
-        from TTS.tts.models.xtts import Xtts
-
-        print("Loading XTTS model...")
-
-        # Load model directly for more control
-        model_path = "/root/.local/share/tts/tts_models--multilingual--multi-dataset--xtts_v2"
-        config = XttsConfig()
-        config.load_json(f"{model_path}/config.json")
-
-        self.model = Xtts.init_from_config(config)
-        self.model.load_checkpoint(config, checkpoint_dir=model_path)
-        self.model.cuda()
-        self.model.eval()
-
-        # Pre-cache voice embeddings
-        self.voice_cache = {}
-        self._preload_voices()
-
-        print("Model loaded successfully!")
-
-    def _preload_voices(self):
-        """Pre-compute speaker embeddings for faster inference."""
-        import os
-
-        voices_dir = "/voices"
-        if not os.path.exists(voices_dir):
-            return
-
-        for voice_id in os.listdir(voices_dir):
-            voice_path = f"{voices_dir}/{voice_id}"
-            if os.path.isdir(voice_path):
-                # Get all wav files
-                all_wavs = sorted([f for f in os.listdir(voice_path) if f.endswith(".wav")])
-
-                # Use first 5 clips (they're saved as clip_0.wav, clip_1.wav, etc.)
-                wav_files = [f"{voice_path}/{f}" for f in all_wavs[:5]]
-
-                if wav_files:
-                    print(f"Pre-computing embeddings for voice: {voice_id}")
-                    gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(
-                        audio_path=wav_files
-                    )
-                    self.voice_cache[voice_id] = {
-                        "gpt_cond_latent": gpt_cond_latent,
-                        "speaker_embedding": speaker_embedding,
-                    }
-                    print(f"  Cached {voice_id} with {len(wav_files)} clips")
-
-    def _get_voice(self, voice_id: str):
-        """Get cached voice embeddings, computing if needed."""
-        import os
-
-        if voice_id in self.voice_cache:
-            return self.voice_cache[voice_id]
-
-        # Load from disk if not cached
-        voice_path = f"/voices/{voice_id}"
-        if not os.path.exists(voice_path):
-            raise ValueError(f"Voice '{voice_id}' not found")
-
-        # Get all wav files
-        all_wavs = sorted([f for f in os.listdir(voice_path) if f.endswith(".wav")])
-        wav_files = [f"{voice_path}/{f}" for f in all_wavs[:5]]
-
-        gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(
-            audio_path=wav_files
-        )
-        self.voice_cache[voice_id] = {
-            "gpt_cond_latent": gpt_cond_latent,
-            "speaker_embedding": speaker_embedding,
-        }
-        return self.voice_cache[voice_id]
-
-    @modal.method()
-    def create_voice(self, voice_id: str, audio_clips: list[bytes]) -> dict:
-        """Create a voice profile from audio clips."""
-        import os
-
-        voice_dir = f"/voices/{voice_id}"
-        os.makedirs(voice_dir, exist_ok=True)
+        from tts_core.engine import TTSEngine
 
-        paths = []
-        for i, clip in enumerate(audio_clips):
-            path = f"{voice_dir}/clip_{i}.wav"
-            with open(path, "wb") as f:
-                f.write(clip)
-            paths.append(path)
-
-        voice_volume.commit()
-
-        # Compute embeddings immediately
-        gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(
-            audio_path=paths[:3]
+        self.engine = TTSEngine(
+            commit_voices=voice_volume.commit,
+            reload_voices=voice_volume.reload,
         )
-        self.voice_cache[voice_id] = {
-            "gpt_cond_latent": gpt_cond_latent,
-            "speaker_embedding": speaker_embedding,
-        }
+        self.engine.load()
 
-        return {"voice_id": voice_id, "status": "created", "clips": len(paths)}
+    @modal.asgi_app()
+    def web(self):
+        """HTTP API (/tts, /tts/stream, /tts/many, /voices/..., /metrics, /health)."""
+        from tts_core.server import create_app
 
-    def _estimate_duration(self, text: str, chars_per_second: float = 7.0) -> float:
-        """Estimate expected audio duration based on text length."""
-        # Very conservative: ~7 chars/sec (slower estimate = more room)
-        base_duration = len(text) / chars_per_second
-        return base_duration * 2.5  # 150% buffer to avoid cutting off
+        return create_app(self.engine)
 
-    def _process_audio(self, wav, sample_rate: int = 24000):
-        """Process audio - just add silence padding, no trimming."""
-        import numpy as np
+    @modal.method()
+    def prefetch_voice(self, voice_id: str) -> dict:
+        """Make a voice device-resident ahead of use (e.g. when a session opens)."""
+        return self.engine.prefetch_voice(voice_id)
 
-        if hasattr(wav, 'cpu'):
-            wav = wav.cpu().numpy()
-        wav = np.array(wav)
+    @modal.method()
+    def create_voice(self, voice_id: str, audio_clips: list[bytes]) -> dict:
+        """Create a voice profile from audio clips."""
+        return self.engine.create_voice(voice_id, audio_clips)
 
-        # No trimming - just add 500ms silence padding
-        silence_samples = int(0.5 * sample_rate)
-        silence = np.zeros(silence_samples, dtype=wav.dtype)
-        wav = np.concatenate([wav, silence])
+    @modal.method()
+    def refresh_voice(self, voice_id: str) -> dict:
+        """Reload a voice after clips were added directly on the volume."""
+        return self.engine.refresh_voice(voice_id)
 
-        return wav
+    @modal.method()
+    def start_voice_upload(self, voice_id: str, clips: list[dict]) -> dict:
+        """Begin or resume a chunked upload; reports which clips still need bytes."""
+        return self.engine.start_voice_upload(voice_id, clips)
 
     @modal.method()
-    def synthesize(self, text: str, voice_id: str = "austin") -> bytes:
-        """Synthesize audio with strict settings to prevent hallucination."""
-        import torch
-        import torchaudio
-
-        voice = self._get_voice(voice_id)
-
-        # Use inference() directly with strict parameters
-        out = self.model.inference(
-            text=text,
-            language="en",
-            gpt_cond_latent=voice["gpt_cond_latent"],
-            speaker_embedding=voice["speaker_embedding"],
-            # Balance between natural sound and preventing hallucination
-            temperature=0.5,  # Moderate expressiveness
-            length_penalty=1.0,
-            repetition_penalty=5.0,  # Still prevent repetition but less strict
-            top_k=50,  # Allow more variation
-            top_p=0.8,  # More natural sampling
-            speed=1.0,  
-            enable_text_splitting=False,  # Don't split text internally
-        )
+    def upload_clip_chunk(self, upload_id: str, sha256: str, offset: int, data: bytes) -> dict:
+        """Store one chunk of a clip."""
+        return self.engine.upload_clip_chunk(upload_id, sha256, offset, data)
 
-        # Get wav and add silence padding
-        wav = out["wav"]
-        wav = self._process_audio(wav)
+    @modal.method()
+    def finish_voice_upload(self, upload_id: str) -> dict:
+        """Queue assembly and conditioning; returns a job to poll with voice_job.
 
-        # Convert to WAV
-        audio_tensor = torch.tensor(wav).unsqueeze(0)
+        The job runs as its own spawned call rather than a background
+        thread, so Modal keeps a container up until it finishes.
+        """
+        job = self.engine.queue_voice_upload(upload_id)
+        TTSService().run_voice_job.spawn(job)
+        return job
 
-        buffer = io.BytesIO()
-        torchaudio.save(buffer, audio_tensor, 24000, format="wav")
+    @modal.method()
+    def run_voice_job(self, job: dict):
+        """Assemble and condition a job queued by finish_voice_upload."""
+        self.engine.run_voice_job(job)
 
-        return buffer.getvalue()
+    @modal.method()
+    def voice_job(self, job_id: str) -> dict:
+        """Status of a background conditioning job."""
+        return self.engine.voice_job(job_id)
 
     @modal.method()
-    def health(self) -> dict:
-        return {"status": "ok", "voices": list(self.voice_cache.keys())}
+    def synthesize(
+        self,
+        text: str,
+        voice_id: str = "austin",
+        format: str = "wav",
+        bitrate: int | None = None,
+        filler: str | None = None,
+    ) -> bytes:
+        """Synthesize audio with strict settings to prevent hallucination.
+
+        format is one of wav, pcm16 (headerless int16), opus (Ogg) or mp3;
+        bitrate (bits/s) applies to the compressed formats. filler names a
+        pre-rendered clip (tts_core.fillers) to play before the text.
+        """
+        return self.engine.synthesize(text, voice_id, format, bitrate, filler)
 
+    @modal.method()
+    def synthesize_timed(
+        self,
+        text: str,
+        voice_id: str = "austin",
+        format: str = "wav",
+        bitrate: int | None = None,
+        filler: str | None = None,
+    ) -> dict:
+        """synthesize() plus the server-side stage breakdown in milliseconds."""
+        return self.engine.synthesize_timed(text, voice_id, format, bitrate, filler)
 
-# HTTP endpoint
-@app.function(image=image)
-@modal.fastapi_endpoint(method="POST")
-def tts_endpoint(request: dict):
-    """HTTP endpoint for synthesis."""
-    text = request.get("text", "")
-    voice_id = request.get("voice_id", "austin")
+    @modal.method()
+    def synthesize_many(
+        self,
+        texts: list[str],
+        voice_id: str = "austin",
+        format: str = "wav",
+        bitrate: int | None = None,
+        fillers: list[str | None] | None = None,
+    ):
+        """Ordered chunks for one voice; yields per-chunk results in index order."""
+        yield from self.engine.synthesize_many(texts, voice_id, format, bitrate, fillers)
 
-    if not text:
-        return {"error": "No text provided"}
+    @modal.method()
+    def synthesize_stream(self, text: str, voice_id: str = "austin", filler: str | None = None):
+        """Stream 16-bit mono PCM frames as XTTS decodes them."""
+        yield from self.engine.synthesize_stream(text, voice_id, filler)
 
-    service = TTSService()
-    audio_bytes = service.synthesize.remote(text, voice_id)
+    @modal.method()
+    def metrics_text(self) -> str:
+        """Service metrics in Prometheus text format."""
+        return self.engine.metrics_text()
 
-    return {
-        "audio": base64.b64encode(audio_bytes).decode(),
-        "format": "wav",
-    }
+    @modal.method()
+    def health(self) -> dict:
+        return self.engine.health()
@@ -0,0 +1,4 @@
+"""
+Framework-independent building blocks for the TTS service.
+Nothing in here imports Modal, so each piece can run on a plain CPU box.
+"""
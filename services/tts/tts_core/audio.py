@@ -0,0 +1,70 @@
+"""
+Output encoding helpers.
+
+Waveforms are converted to int16 once (on the GPU when they live there) and
+copied a single time into a preallocated output buffer. The buffer starts
+zeroed, so trailing silence padding costs nothing, and the WAV header is
+packed into the same buffer in place.
+"""
+
+import struct
+
+import numpy as np
+
+WAV_HEADER_BYTES = 44
+
+
+def to_pcm16(wav) -> np.ndarray:
+    """Float waveform in [-1, 1] (tensor or array) as an int16 array."""
+    if hasattr(wav, "cpu"):
+        import torch
+
+        return (wav.squeeze().clamp(-1.0, 1.0) * 32767).to(torch.int16).cpu().numpy()
+
+    wav = np.asarray(wav, dtype=np.float32).reshape(-1)
+    out = np.empty(wav.shape, dtype=np.int16)
+    np.multiply(np.clip(wav, -1.0, 1.0), 32767, out=out, casting="unsafe")
+    return out
+
+
+def to_float32(wav) -> np.ndarray:
+    """Waveform (tensor or array) as a flat float32 array on the host."""
+    if hasattr(wav, "cpu"):
+        return wav.detach().squeeze().float().cpu().numpy().reshape(-1)
+    return np.asarray(wav, dtype=np.float32).reshape(-1)
+
+
+def write_wav_header(buf, num_samples: int, sample_rate: int, offset: int = 0):
+    """Pack a mono 16-bit PCM WAV header into buf at offset."""
+    data_bytes = num_samples * 2
+    struct.pack_into(
+        "<4sI4s4sIHHIIHH4sI",
+        buf,
+        offset,
+        b"RIFF",
+        36 + data_bytes,
+        b"WAVE",
+        b"fmt ",
+        16,  # fmt chunk size
+        1,  # PCM
+        1,  # mono
+        sample_rate,
+        sample_rate * 2,  # byte rate
+        2,  # block align
+        16,  # bits per sample
+        b"data",
+        data_bytes,
+    )
+
+
+def render_pcm16(pcm: np.ndarray, sample_rate: int, pad_samples: int = 0, wav_header: bool = True) -> bytearray:
+    """Lay out [header][pcm][silence] in one buffer with a single copy of the samples."""
+    header = WAV_HEADER_BYTES if wav_header else 0
+    total_samples = len(pcm) + pad_samples
+
+    buf = bytearray(header + total_samples * 2)
+    if wav_header:
+        write_wav_header(buf, total_samples, sample_rate)
+
+    np.frombuffer(buf, dtype="<i2", count=len(pcm), offset=header)[:] = pcm
+    return buf
@@ -0,0 +1,195 @@
+"""
+Content-addressed cache of synthesized audio.
+
+Keys hash the normalized text, the voice (including the hash of its
+conditioning latents, so a re-created profile never serves old audio) and
+every sampling parameter. Entries live in a byte-bounded in-memory LRU and,
+optionally, as files on disk grouped per voice so a voice can be flushed in
+one step. The disk tier has its own byte budget: files are evicted least
+recently used first, by mtime, which a disk hit refreshes.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+from .voice_ids import voice_dir
+
+
+def normalize_text(text: str) -> str:
+    """XTTS lowercases and strips its input, so the cache key can too."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class AudioCache:
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        disk_dir: str | None = None,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Disk files (path -> size), least recently used first; scanned from
+        # the directory on first use so files from earlier runs count too
+        self._disk_entries: OrderedDict[str, int] | None = None
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, text: str, voice_id: str, params: dict, voice_version: str = "") -> str:
+        payload = json.dumps(
+            {
+                "text": normalize_text(text),
+                "voice_id": voice_id,
+                "voice_version": voice_version,
+                "params": params,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _disk_path(self, voice_id: str, key: str) -> str:
+        # voice_id comes from the request; voice_dir rejects anything path-like
+        return os.path.join(voice_dir(self.disk_dir, voice_id), f"{key}.bin")
+
+    def get(self, key: str, voice_id: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+
+        if self.disk_dir:
+            path = self._disk_path(voice_id, key)
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+            except FileNotFoundError:
+                pass
+            else:
+                self._touch(path)
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, voice_id, audio)
+                return audio
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, voice_id: str, audio: bytes):
+        self._remember(key, voice_id, audio)
+
+        if self.disk_dir and len(audio) <= self.disk_max_bytes:
+            path = self._disk_path(voice_id, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+            self._track(path, len(audio))
+
+    def _disk_index(self) -> OrderedDict[str, int]:
+        """Disk files by recency, built from mtimes on first call. Hold _disk_lock."""
+        if self._disk_entries is None:
+            found = []
+            for root, _, names in os.walk(self.disk_dir):
+                for name in names:
+                    if not name.endswith(".bin"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    found.append((st.st_mtime, path, st.st_size))
+            found.sort()
+            self._disk_entries = OrderedDict((path, size) for _, path, size in found)
+            self._disk_bytes = sum(self._disk_entries.values())
+        return self._disk_entries
+
+    def _track(self, path: str, size: int):
+        """Record a written file and evict the oldest files until under budget."""
+        with self._disk_lock:
+            index = self._disk_index()
+            self._disk_bytes += size - index.pop(path, 0)
+            index[path] = size
+
+            while self._disk_bytes > self.disk_max_bytes and index:
+                evicted, evicted_size = index.popitem(last=False)
+                self._disk_bytes -= evicted_size
+                try:
+                    os.remove(evicted)
+                except FileNotFoundError:
+                    pass
+
+    def _touch(self, path: str):
+        """Mark a disk hit as recently used, here and (via mtime) for the next scan."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._disk_lock:
+            if self._disk_entries is not None and path in self._disk_entries:
+                self._disk_entries.move_to_end(path)
+
+    def _remember(self, key: str, voice_id: str, audio: bytes):
+        if len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[key] = (voice_id, audio)
+            self._bytes += len(audio)
+
+            # Evict least recently used entries until back under budget
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def flush_voice(self, voice_id: str) -> int:
+        """Drop every cached entry for a voice. Returns entries removed from memory."""
+        with self._lock:
+            stale = [k for k, (v, _) in self._entries.items() if v == voice_id]
+            for k in stale:
+                self._bytes -= len(self._entries.pop(k)[1])
+
+        if self.disk_dir:
+            directory = voice_dir(self.disk_dir, voice_id)
+            with self._disk_lock:
+                shutil.rmtree(directory, ignore_errors=True)
+                if self._disk_entries is not None:
+                    prefix = directory + os.sep
+                    for path in [p for p in self._disk_entries if p.startswith(prefix)]:
+                        self._disk_bytes -= self._disk_entries.pop(path)
+
+        return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "disk_bytes": self._disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
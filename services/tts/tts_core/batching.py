@@ -0,0 +1,180 @@
+"""
+Dynamic micro-batching for synthesis requests.
+
+Concurrent callers submit (voice_id, text) pairs along with the voice entry
+they resolved for voice_id, so voice loading never runs on the worker. A
+single worker thread waits a short window for more work, groups requests
+that share a voice entry and have similar text lengths, and hands each
+group to one batched inference call. Every caller gets back only its own
+result.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+@dataclass
+class _Request:
+    voice_id: str
+    text: str
+    voice: Any
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+    finished_at: float | None = None
+    batch_size: int = 0
+
+
+class MicroBatcher:
+    """Collects concurrent requests into padded batches.
+
+    run_batch(voice, texts) must return one result per text, in order.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[Any, list[str]], list[Any]],
+        max_batch_size: int = 4,
+        max_wait_ms: float = 15.0,
+        length_tolerance: float = 0.5,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Texts join a batch if their length is within this fraction of the
+        # oldest request's length (keeps padding waste small)
+        self.length_tolerance = length_tolerance
+
+        self._pending: list[_Request] = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.batches_run = 0
+        self.requests_run = 0
+        self.compute_seconds = 0.0
+
+        self._worker = threading.Thread(target=self._loop, name="tts-batcher", daemon=True)
+        self._worker.start()
+
+    def _enqueue(self, request: _Request) -> _Request:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Batcher is closed")
+            self._pending.append(request)
+            self._cond.notify()
+        return request
+
+    def submit(self, voice_id: str, text: str, voice: Any) -> Future:
+        """Queue a request and return a future for its result."""
+        return self._enqueue(_Request(voice_id, text, voice)).future
+
+    def infer(self, voice_id: str, text: str, voice: Any, timeout: float | None = None) -> Any:
+        """Submit a request and block until its result is ready."""
+        return self.submit(voice_id, text, voice).result(timeout=timeout)
+
+    def infer_with_stats(
+        self, voice_id: str, text: str, voice: Any, timeout: float | None = None
+    ) -> tuple[Any, dict]:
+        """Like infer(), also returning queue wait and the size of the batch it ran in."""
+        request = self._enqueue(_Request(voice_id, text, voice))
+        result = request.future.result(timeout=timeout)
+        return result, {
+            "queue_wait_s": request.started_at - request.enqueued_at,
+            "compute_s": request.finished_at - request.started_at,
+            "batch_size": request.batch_size,
+        }
+
+    def close(self):
+        """Stop accepting work; already queued requests still run."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = len(self._pending)
+        mean = self.requests_run / self.batches_run if self.batches_run else 0.0
+        return {
+            "batches": self.batches_run,
+            "requests": self.requests_run,
+            "mean_batch_size": round(mean, 2),
+            "compute_seconds": round(self.compute_seconds, 3),
+            "queued": queued,
+        }
+
+    def _compatible(self, lead: _Request) -> list[_Request]:
+        """Pending requests that can share a batch with the lead request."""
+        lead_len = max(len(lead.text), 1)
+        group = [
+            r for r in self._pending
+            if r.voice_id == lead.voice_id
+            # A voice refreshed mid-window resolves to a new entry; don't mix them
+            and r.voice is lead.voice
+            and abs(len(r.text) - lead_len) <= self.length_tolerance * lead_len
+        ]
+        # Closest lengths first so a full batch pads as little as possible
+        group.sort(key=lambda r: (r is not lead, abs(len(r.text) - lead_len)))
+        return group[: self.max_batch_size]
+
+    def _next_batch(self) -> list[_Request] | None:
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+            lead = self._pending[0]
+            deadline = lead.enqueued_at + self.max_wait
+            group = self._compatible(lead)
+
+            # Wait out the window unless the batch is already full
+            while len(group) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                group = self._compatible(lead)
+
+            for r in group:
+                self._pending.remove(r)
+            return group
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            # Skip callers that gave up while queued
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.monotonic()
+            for r in batch:
+                r.started_at = started
+                r.batch_size = len(batch)
+
+            try:
+                results = self.run_batch(batch[0].voice, [r.text for r in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"run_batch returned {len(results)} results for {len(batch)} texts"
+                    )
+            except Exception as e:
+                for r in batch:
+                    r.finished_at = time.monotonic()
+                    r.future.set_exception(e)
+            else:
+                finished = time.monotonic()
+                for r, result in zip(batch, results):
+                    r.finished_at = finished
+                    r.future.set_result(result)
+
+            self.batches_run += 1
+            self.requests_run += len(batch)
+            self.compute_seconds += time.monotonic() - started
@@ -0,0 +1,123 @@
+"""
+Clip quality scoring and conditioning-set selection.
+
+Every clip gets cheap vectorized features (SNR estimate, clipping ratio,
+speech ratio, duration) folded into a 0-1 score. select_clips() then picks
+the subset with the most quality-weighted audio that fits a total-seconds
+budget, so conditioning cost stays bounded no matter how big the corpus is.
+Used both by the voice-data scripts and by the TTS service (scores are kept
+in the clip store index, see tts_core.clip_store).
+"""
+
+import numpy as np
+
+FRAME_MS = 20
+CLIP_LEVEL = 0.99  # |sample| at or above this fraction of full scale counts as clipped
+IDEAL_DURATION = (4.0, 10.0)
+
+
+def _as_float(samples) -> np.ndarray:
+    samples = np.asarray(samples)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+
+def clip_features(samples, sample_rate: int) -> dict:
+    """Vectorized quality features for one mono clip."""
+    x = _as_float(samples).reshape(-1)
+    duration = len(x) / sample_rate
+
+    frame_len = max(1, int(sample_rate * FRAME_MS / 1000))
+    n_frames = len(x) // frame_len
+    if n_frames == 0:
+        return {"duration": round(duration, 2), "snr_db": 0.0, "clipping_ratio": 0.0, "speech_ratio": 0.0}
+
+    frames = x[: n_frames * frame_len].reshape(n_frames, frame_len)
+    level_db = 10 * np.log10(np.maximum(np.mean(frames * frames, axis=1), 1e-12))
+
+    # Quiet frames estimate the noise floor, loud frames the speech level
+    noise_db, speech_db = np.percentile(level_db, [10, 90])
+    speech = level_db > max(min(noise_db + 10, speech_db - 3), -45)
+
+    return {
+        "duration": round(duration, 2),
+        "snr_db": round(float(speech_db - noise_db), 1),
+        "clipping_ratio": round(float(np.mean(np.abs(x) >= CLIP_LEVEL)), 5),
+        "speech_ratio": round(float(np.mean(speech)), 3),
+    }
+
+
+def clip_score(features: dict) -> float:
+    """Fold features into a 0-1 score (higher is better for conditioning)."""
+    snr = np.clip((features["snr_db"] - 10) / 30, 0, 1)  # 10dB -> 0, 40dB -> 1
+    clipping = np.clip(1 - features["clipping_ratio"] * 200, 0, 1)  # 0.5% clipped -> 0
+    speech = np.clip((features["speech_ratio"] - 0.3) / 0.5, 0, 1)  # 30% -> 0, 80% -> 1
+
+    lo, hi = IDEAL_DURATION
+    d = features["duration"]
+    duration = 1.0 if lo <= d <= hi else max(0.0, 1 - (lo - d if d < lo else d - hi) / lo)
+
+    return round(float(0.4 * snr + 0.25 * clipping + 0.25 * speech + 0.1 * duration), 4)
+
+
+def score_clip(samples, sample_rate: int) -> dict:
+    """Features plus score, ready to store with a clip."""
+    features = clip_features(samples, sample_rate)
+    features["score"] = clip_score(features)
+    return features
+
+
+def select_clips(clips: list[dict], budget_seconds: float, resolution: float = 0.25,
+                 min_score: float = 0.0) -> list[dict]:
+    """Best subset of scored clips whose durations fit the budget.
+
+    Each clip needs "duration" and "score". Maximizes sum(score * duration)
+    with a 0/1 knapsack at `resolution` seconds; the result keeps input order.
+    """
+    candidates = [c for c in clips if c["score"] >= min_score and c["duration"] > 0]
+    capacity = int(budget_seconds / resolution)
+    if not candidates or capacity <= 0:
+        return []
+
+    weights = [max(1, int(np.ceil(c["duration"] / resolution))) for c in candidates]
+    values = [c["score"] * c["duration"] for c in candidates]
+
+    best = np.zeros(capacity + 1)
+    taken = np.zeros((len(candidates), capacity + 1), dtype=bool)
+    for i, (w, v) in enumerate(zip(weights, values)):
+        if w > capacity:
+            continue
+        with_item = best[: capacity + 1 - w] + v
+        improved = with_item > best[w:]
+        taken[i, w:] = improved
+        best[w:] = np.where(improved, with_item, best[w:])
+
+    chosen = set()
+    c = capacity
+    for i in range(len(candidates) - 1, -1, -1):
+        if taken[i, c]:
+            chosen.add(i)
+            c -= weights[i]
+
+    return [clip for i, clip in enumerate(candidates) if i in chosen]
+
+
+def load_clip(path) -> tuple[np.ndarray, int]:
+    """Read a clip as float32 mono; 16-bit WAVs avoid any audio library."""
+    import wave
+
+    try:
+        with wave.open(str(path), "rb") as w:
+            if w.getsampwidth() == 2:
+                data = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+                data = data.reshape(-1, w.getnchannels()).mean(axis=1)
+                return data.astype(np.float32) / 32768.0, w.getframerate()
+    except wave.Error:
+        pass
+
+    import torchaudio
+
+    wav, sr = torchaudio.load(str(path))
+    return wav.mean(dim=0).numpy(), sr
+
@@ -0,0 +1,470 @@
+"""
+Packed clip store: one contiguous PCM file per voice plus a SQLite index.
+
+Voice data used to be hundreds of small clip WAVs next to a manifest.json
+that every stage loaded and rewrote whole. A ClipStore keeps the audio of
+all clips back to back as mono int16 in one append-only file, and one row
+per clip in clips.db:
+
+    name          clip name ("clip_000.wav"), the manifest "path"
+    position      manifest order
+    offset        first sample in the data file
+    samples       length in samples (at sample_rate)
+    duration, text, sha256, score, quality (JSON), conditioning
+    meta (JSON)   everything else a manifest entry carries (source,
+                  source_sha256, params, uploaded_sha256, start, end, ...)
+
+The data file is memory-mapped, so samples(name) is a zero-copy view and a
+clip is only paged in when it is used. sha256 is the hash of the clip as a
+44-byte-header WAV (what wav_bytes returns and export_layout writes), so it
+matches the hash of the equivalent loose clip file.
+
+Updating a transcript or a flag is a single-row UPDATE. Replacing or
+removing a clip leaves its old audio in the data file until compact()
+rewrites the live clips into a new data file; the index names the current
+data file, so a crash on either side of the swap leaves a consistent store.
+
+import_layout() and export_layout() convert from and to the loose layout
+(clips directory plus manifest.json); migrate_layout() packs every voice on
+a volume once.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from .audio import WAV_HEADER_BYTES, to_pcm16, write_wav_header
+from .clip_quality import load_clip, score_clip
+
+INDEX_FILE = "clips.db"
+
+# Row columns; every other manifest field lives in the meta JSON
+_COLUMNS = ("duration", "text", "sha256", "quality", "conditioning")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    sample_rate INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    score REAL,
+    quality TEXT,
+    conditioning INTEGER,
+    meta TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS clips_sha256 ON clips (sha256);
+CREATE TABLE IF NOT EXISTS store (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def wav_header(num_samples: int, sample_rate: int) -> bytes:
+    header = bytearray(WAV_HEADER_BYTES)
+    write_wav_header(header, num_samples, sample_rate)
+    return bytes(header)
+
+
+def wav_sha256(samples: np.ndarray, sample_rate: int) -> str:
+    """Hash of the clip as a mono 16-bit WAV, without building the file."""
+    pcm = np.ascontiguousarray(samples, dtype="<i2")
+    h = hashlib.sha256(wav_header(len(pcm), sample_rate))
+    h.update(memoryview(pcm).cast("B"))
+    return h.hexdigest()
+
+
+def read_wav(source) -> tuple[np.ndarray, int]:
+    """Clip file (path or bytes) as mono int16 samples and its sample rate."""
+    import io
+    import wave
+
+    try:
+        with wave.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else str(source), "rb") as w:
+            if w.getsampwidth() == 2 and w.getnchannels() == 1:
+                return np.frombuffer(w.readframes(w.getnframes()), dtype="<i2"), w.getframerate()
+    except wave.Error:
+        pass
+
+    if isinstance(source, (bytes, bytearray)):
+        import tempfile
+
+        # load_clip's fallback decoder wants a path
+        with tempfile.NamedTemporaryFile(suffix=".wav") as f:
+            f.write(source)
+            f.flush()
+            samples, sample_rate = load_clip(f.name)
+    else:
+        samples, sample_rate = load_clip(source)
+    return to_pcm16(samples), sample_rate
+
+
+def clip_quality(samples: np.ndarray, sample_rate: int) -> dict:
+    """Quality features and score for a clip entry's "quality" field."""
+    quality = score_clip(samples, sample_rate)
+    quality.pop("duration")
+    return quality
+
+
+class ClipStore:
+    def __init__(self, directory):
+        self.directory = str(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Transcription workers read clips from several threads
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            os.path.join(self.directory, INDEX_FILE), timeout=30, check_same_thread=False
+        )
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+        self._depth = 0
+        self._map = None
+        self._map_file = None
+
+    def close(self):
+        with self._lock:
+            self._map = None
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Transactions
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one commit (nested blocks join the outer one)."""
+        with self._lock:
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if not self._depth:
+                    self._db.rollback()
+                raise
+            self._depth -= 1
+            if not self._depth:
+                self._db.commit()
+
+    # Data file
+
+    def _data_file(self) -> str:
+        row = self._db.execute("SELECT value FROM store WHERE key = 'data_file'").fetchone()
+        return row[0] if row else "clips-0.pcm"
+
+    def _data_path(self) -> str:
+        return os.path.join(self.directory, self._data_file())
+
+    def _append(self, samples: np.ndarray) -> int:
+        """Append samples to the data file; returns their offset in samples."""
+        pcm = np.ascontiguousarray(samples, dtype="<i2")
+        with open(self._data_path(), "ab") as f:
+            end = f.tell()
+            if end % 2:
+                # A torn append left half a sample; realign past it
+                f.write(b"\0")
+                end += 1
+            f.write(memoryview(pcm).cast("B"))
+        return end // 2
+
+    def _pcm(self, offset: int, samples: int) -> np.ndarray:
+        """Zero-copy view of the data file; remapped when it has grown or changed."""
+        data_file = self._data_file()
+        if self._map is None or self._map_file != data_file or offset + samples > len(self._map):
+            path = os.path.join(self.directory, data_file)
+            size = os.path.getsize(path) // 2 if os.path.exists(path) else 0
+            if offset + samples > size:
+                raise ValueError(f"Clip store {self.directory} is missing audio (data file truncated)")
+            self._map = np.memmap(path, dtype="<i2", mode="r", shape=(size,)) if size else np.zeros(0, "<i2")
+            self._map_file = data_file
+        return self._map[offset:offset + samples]
+
+    # Reading
+
+    def _entry(self, row) -> dict:
+        entry = {"path": row["name"], "duration": row["duration"], "text": row["text"], "sha256": row["sha256"]}
+        if row["quality"] is not None:
+            entry["quality"] = json.loads(row["quality"])
+        if row["conditioning"] is not None:
+            entry["conditioning"] = bool(row["conditioning"])
+        entry.update(json.loads(row["meta"]))
+        return entry
+
+    def entries(self) -> list[dict]:
+        """Every clip as a manifest entry, in manifest order."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM clips ORDER BY position").fetchall()
+        return [self._entry(row) for row in rows]
+
+    def get(self, name: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM clips WHERE name = ?", (name,)).fetchone()
+        return self._entry(row) if row else None
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM clips WHERE name = ?", (name,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM clips").fetchone()[0]
+
+    def _locate(self, name: str):
+        row = self._db.execute(
+            "SELECT offset, samples, sample_rate FROM clips WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Clip '{name}' not found")
+        return row
+
+    def sample_rate(self, name: str) -> int:
+        with self._lock:
+            return self._locate(name)["sample_rate"]
+
+    def samples(self, name: str) -> np.ndarray:
+        """A clip's int16 samples as a read-only view of the mapped data file."""
+        with self._lock:
+            offset, samples, _ = self._locate(name)
+            return self._pcm(offset, samples)
+
+    def wav_size(self, name: str) -> int:
+        with self._lock:
+            return WAV_HEADER_BYTES + self._locate(name)["samples"] * 2
+
+    def wav_bytes(self, name: str) -> bytes:
+        """The clip as a mono 16-bit WAV file; hashes to the row's sha256."""
+        with self._lock:
+            offset, samples, sample_rate = self._locate(name)
+            pcm = self._pcm(offset, samples)
+        return wav_header(samples, sample_rate) + memoryview(np.ascontiguousarray(pcm)).cast("B")
+
+    def hashes(self) -> dict[str, str]:
+        """sha256 -> name of a clip with that content."""
+        with self._lock:
+            rows = self._db.execute("SELECT sha256, name FROM clips ORDER BY position").fetchall()
+        hashes = {}
+        for sha256, name in rows:
+            hashes.setdefault(sha256, name)
+        return hashes
+
+    # Writing
+
+    def _next_position(self) -> int:
+        return self._db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM clips").fetchone()[0]
+
+    def add(self, name: str, samples: np.ndarray, sample_rate: int, sha256: str | None = None, **fields):
+        """Add or replace a clip; it moves to the end of the manifest order.
+
+        fields are manifest entry fields (duration, text, quality, ...);
+        duration, quality and sha256 are computed when not given. Audio is
+        only appended when it differs from what the row already holds.
+        """
+        samples = np.asarray(samples)
+        fields.pop("path", None)
+        fields.pop("audio", None)
+        sha256 = sha256 or wav_sha256(samples, sample_rate)
+        quality = fields.pop("quality", None) or clip_quality(samples, sample_rate)
+        duration = fields.pop("duration", None) or round(len(samples) / sample_rate, 2)
+        text = fields.pop("text", "") or ""
+        conditioning = fields.pop("conditioning", None)
+
+        with self.transaction():
+            old = self._db.execute(
+                "SELECT offset, samples, sample_rate, sha256 FROM clips WHERE name = ?", (name,)
+            ).fetchone()
+            if old and old["sha256"] == sha256 and old["sample_rate"] == sample_rate and old["samples"] == len(samples):
+                offset = old["offset"]
+            else:
+                offset = self._append(samples)
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name, self._next_position(), offset, len(samples), sample_rate, duration, sha256,
+                    text, quality.get("score"), json.dumps(quality),
+                    None if conditioning is None else int(conditioning), json.dumps(fields),
+                ),
+            )
+
+    def update(self, name: str, **fields):
+        """Change index fields of one clip (its audio stays where it is)."""
+        self.update_many({name: fields})
+
+    def update_many(self, updates: dict[str, dict]):
+        """name -> fields to change, in one transaction."""
+        with self.transaction():
+            for name, fields in updates.items():
+                row = self._db.execute("SELECT meta FROM clips WHERE name = ?", (name,)).fetchone()
+                if row is None:
+                    raise ValueError(f"Clip '{name}' not found")
+
+                sets, values = [], []
+                meta = json.loads(row["meta"])
+                for key, value in fields.items():
+                    if key == "quality":
+                        sets += ["quality = ?", "score = ?"]
+                        values += [json.dumps(value), value.get("score")]
+                    elif key == "conditioning":
+                        sets.append("conditioning = ?")
+                        values.append(None if value is None else int(value))
+                    elif key in _COLUMNS:
+                        sets.append(f"{key} = ?")
+                        values.append(value)
+                    elif key not in ("path", "audio"):
+                        meta[key] = value
+                sets.append("meta = ?")
+                values.append(json.dumps(meta))
+
+                self._db.execute(f"UPDATE clips SET {', '.join(sets)} WHERE name = ?", (*values, name))
+
+    def remove(self, names):
+        with self.transaction():
+            self._db.executemany("DELETE FROM clips WHERE name = ?", [(n,) for n in names])
+
+    def retain(self, names):
+        """Remove every clip not in names."""
+        keep = set(names)
+        with self._lock:
+            current = [r[0] for r in self._db.execute("SELECT name FROM clips").fetchall()]
+        self.remove([n for n in current if n not in keep])
+
+    def save(self, entries: list[dict], sample_rate: int = 24000):
+        """Make the store hold exactly these manifest entries, in this order.
+
+        Entries carrying an "audio" array (new clips at sample_rate) have it
+        appended; the rest only update index fields of clips already stored.
+        """
+        with self.transaction():
+            self.retain(e["path"] for e in entries)
+            for entry in entries:
+                if "audio" in entry:
+                    self.add(entry["path"], entry["audio"], sample_rate, **entry)
+                else:
+                    self.update(entry["path"], **entry)
+            self._db.executemany(
+                "UPDATE clips SET position = ? WHERE name = ?",
+                [(i, e["path"]) for i, e in enumerate(entries)],
+            )
+
+    def clear(self):
+        """Drop every clip and start a new, empty data file."""
+        with self.transaction():
+            self._db.execute("DELETE FROM clips")
+        self.compact(min_dead_ratio=0.0)
+
+    def compact(self, min_dead_ratio: float = 0.5) -> int:
+        """Rewrite live clips into a new data file once enough of it is dead.
+
+        Returns the bytes reclaimed. The index switches to the new file in
+        the same transaction that rewrites offsets; the old file is removed
+        after that commit.
+        """
+        with self._lock:
+            old_path = self._data_path()
+            size = os.path.getsize(old_path) if os.path.exists(old_path) else 0
+            live = self._db.execute("SELECT COALESCE(SUM(samples), 0) FROM clips").fetchone()[0] * 2
+            if size <= live or (size - live) / size < min_dead_ratio:
+                return 0
+
+            generation = int(self._data_file().rsplit("-", 1)[1].split(".")[0]) + 1
+            data_file = f"clips-{generation}.pcm"
+            rows = self._db.execute("SELECT name, offset, samples FROM clips ORDER BY position").fetchall()
+
+            offsets, offset = [], 0
+            with open(os.path.join(self.directory, data_file), "wb") as f:
+                for name, old_offset, samples in rows:
+                    f.write(memoryview(np.ascontiguousarray(self._pcm(old_offset, samples))).cast("B"))
+                    offsets.append((offset, name))
+                    offset += samples
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self.transaction():
+                self._db.executemany("UPDATE clips SET offset = ? WHERE name = ?", offsets)
+                self._db.execute("INSERT OR REPLACE INTO store VALUES ('data_file', ?)", (data_file,))
+
+            self._map = None
+            if os.path.exists(old_path):
+                os.remove(old_path)
+            return size - live
+
+    # Loose layout
+
+    def import_layout(self, clips_dir, manifest_path=None, remove_files: bool = False) -> int:
+        """Pack clip WAVs from clips_dir into the store; returns how many.
+
+        With a manifest the clips and fields it lists are imported in its
+        order; without one every *.wav in clips_dir is (replacing clips of
+        the same name). remove_files deletes the WAVs once they are packed.
+        """
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                entries = json.load(f)
+        else:
+            names = sorted(f for f in os.listdir(clips_dir) if f.endswith(".wav")) if os.path.isdir(clips_dir) else []
+            entries = [{"path": name} for name in names]
+
+        imported = []
+        with self.transaction():
+            for entry in entries:
+                path = os.path.join(str(clips_dir), entry["path"])
+                if not os.path.exists(path):
+                    print(f"  SKIP - {entry['path']} not found")
+                    continue
+                samples, sample_rate = read_wav(path)
+                fields = {k: v for k, v in entry.items() if k != "sha256"}
+                self.add(entry["path"], samples, sample_rate, **fields)
+                imported.append(path)
+
+        if remove_files:
+            for path in imported:
+                os.remove(path)
+        return len(imported)
+
+    def export_layout(self, clips_dir, manifest_path=None) -> int:
+        """Write every clip as a WAV in clips_dir (and the manifest); returns how many."""
+        os.makedirs(str(clips_dir), exist_ok=True)
+        entries = self.entries()
+        for entry in entries:
+            path = os.path.join(str(clips_dir), entry["path"])
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(self.wav_bytes(entry["path"]))
+            os.replace(f"{path}.tmp", path)
+
+        if manifest_path:
+            tmp_path = f"{manifest_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, manifest_path)
+        return len(entries)
+
+
+def migrate_layout(root) -> dict[str, int]:
+    """Pack the loose clip WAVs of every voice under root into its clip store.
+
+    One-off migration from the per-file layout, deleting each WAV once it
+    is packed; returns clips packed per voice. Run it from a single process
+    (scripts/clip_store.py migrate, or app.py's migrate_clip_layout), never
+    from a request path.
+    """
+    packed = {}
+    for voice_id in sorted(os.listdir(root)):
+        voice_dir = os.path.join(str(root), voice_id)
+        if voice_id.startswith(".") or not os.path.isdir(voice_dir):
+            continue
+        if not any(name.endswith(".wav") for name in os.listdir(voice_dir)):
+            continue
+        with ClipStore(voice_dir) as store:
+            packed[voice_id] = store.import_layout(voice_dir, remove_files=True)
+    return packed
@@ -0,0 +1,130 @@
+"""
+Service configuration, read once from TTS_* environment variables.
+
+Shared by the Modal deployment (app.py) and the plain local server
+(python -m tts_core.server), so both run with the same settings.
+"""
+
+import os
+
+# XTTS v2 as downloaded by TTS("tts_models/multilingual/multi-dataset/xtts_v2")
+MODEL_PATH = os.environ.get(
+    "TTS_MODEL_PATH",
+    os.path.expanduser("~/.local/share/tts/tts_models--multilingual--multi-dataset--xtts_v2"),
+)
+# Pre-converted copy of model.pth that can be memory-mapped at startup
+FAST_CHECKPOINT = f"{MODEL_PATH}/model.safetensors"
+
+# One directory per voice (clips, persisted latents); the Modal volume mount
+VOICES_DIR = os.environ.get("TTS_VOICES_DIR", "/voices")
+
+SAMPLE_RATE = 24000
+
+# Sampling settings shared by the batch and streaming synthesis paths
+INFERENCE_PARAMS = {
+    # Balance between natural sound and preventing hallucination
+    "temperature": 0.5,  # Moderate expressiveness
+    "length_penalty": 1.0,
+    "repetition_penalty": 5.0,  # Still prevent repetition but less strict
+    "top_k": 50,  # Allow more variation
+    "top_p": 0.8,  # More natural sampling
+    "speed": 1.0,
+}
+
+# Arguments to get_conditioning_latents; part of the persisted latents key
+CONDITIONING_PARAMS = {
+    "gpt_cond_len": 6,
+    "gpt_cond_chunk_len": 6,
+    "max_ref_length": 30,
+    "sound_norm_refs": False,
+}
+
+# Seconds of reference audio handed to get_conditioning_latents; clips are
+# picked by quality score to fill this budget
+CONDITIONING_BUDGET_S = float(os.environ.get("TTS_CONDITIONING_BUDGET_S", "30"))
+
+# Synthesized audio cache: in-memory LRU plus an optional tier on the voice
+# volume, capped at TTS_AUDIO_CACHE_DISK_MB with least recently used files
+# evicted first (set TTS_AUDIO_CACHE_DIR="" to disable the disk tier)
+AUDIO_CACHE_MAX_MB = int(os.environ.get("TTS_AUDIO_CACHE_MAX_MB", "256"))
+AUDIO_CACHE_DISK_MB = int(os.environ.get("TTS_AUDIO_CACHE_DISK_MB", "1024"))
+AUDIO_CACHE_DIR = os.environ.get("TTS_AUDIO_CACHE_DIR", f"{VOICES_DIR}/.audio-cache")
+
+# Threads reserved for Opus/MP3 encoding so it never runs on the batcher thread
+ENCODER_THREADS = int(os.environ.get("TTS_ENCODER_THREADS", "2"))
+
+# Micro-batching: concurrent synthesize calls wait up to BATCH_MAX_WAIT_MS
+# for others with the same voice and similar length, then run as one batch
+BATCH_MAX_SIZE = int(os.environ.get("TTS_BATCH_MAX_SIZE", "4"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("TTS_BATCH_MAX_WAIT_MS", "15"))
+
+# Cold start: load the mmap-able checkpoint, serve DEFAULT_VOICE as soon as it
+# is ready while other voices load in the background, and run a warm-up pass
+FAST_START = os.environ.get("TTS_FAST_START", "1") == "1"
+DEFAULT_VOICE = os.environ.get("TTS_DEFAULT_VOICE", "austin")
+WARMUP_TEXT = "Hey, just warming up."
+
+# Device and precision. On CPU the GPT can be int8-quantized and bf16
+# autocast enabled (see scripts/bench_cpu.py)
+DEVICE = os.environ.get("TTS_DEVICE", "auto")
+QUANTIZE = os.environ.get("TTS_QUANTIZE", "none")
+DTYPE = os.environ.get("TTS_DTYPE", "fp32")
+INTRA_OP_THREADS = int(os.environ.get("TTS_INTRA_OP_THREADS", "0"))
+INTER_OP_THREADS = int(os.environ.get("TTS_INTER_OP_THREADS", "0"))
+
+# Extra pronunciation entries merged over tts_core.lexicon (JSON, see
+# tts_core.normalizer.load_lexicon)
+LEXICON_PATH = os.environ.get("TTS_LEXICON_PATH", "")
+
+# Reuse each voice's conditioning-prefix attention state across generations
+# (tts_core.prefix_cache); trims the first decode step for every request
+PREFIX_KV_CACHE = os.environ.get("TTS_PREFIX_KV_CACHE", "1") == "1"
+
+# Voice state cache: up to VOICE_CACHE_DEVICE_LIMIT voices on the GPU, then
+# up to VOICE_CACHE_HOST_LIMIT more as pinned CPU copies (LRU between tiers)
+VOICE_CACHE_DEVICE_LIMIT = int(os.environ.get("TTS_VOICE_CACHE_DEVICE_LIMIT", "8"))
+VOICE_CACHE_HOST_LIMIT = int(os.environ.get("TTS_VOICE_CACHE_HOST_LIMIT", "64"))
+
+# GPT audio tokens per second of speech (one token per 1024 samples at 22.05kHz)
+AUDIO_TOKENS_PER_SECOND = 22050 / 1024
+# Realistic speaking rate used to estimate a text's duration (~150 wpm)
+SPEECH_CHARS_PER_SECOND = float(os.environ.get("TTS_SPEECH_CHARS_PER_SECOND", "14"))
+# Output longer than this multiple of the estimate is a runaway (babble or
+# repeats); it is flagged and trimmed back to the limit
+RUNAWAY_MARGIN = float(os.environ.get("TTS_RUNAWAY_MARGIN", "2.0"))
+# Floor for the runaway limit, so one-word chunks are never clipped
+MIN_GENERATION_SECONDS = 3.0
+
+# Pre-render each voice's filler clips (tts_core.fillers) when it loads, so
+# requests naming a filler splice the clip on instead of generating it
+FILLER_CLIPS = os.environ.get("TTS_FILLER_CLIPS", "1") == "1"
+FILLER_CROSSFADE_MS = float(os.environ.get("TTS_FILLER_CROSSFADE_MS", "20"))
+
+# Largest chunk accepted by the resumable voice upload (tts_core.uploads)
+UPLOAD_CHUNK_MAX_MB = int(os.environ.get("TTS_UPLOAD_CHUNK_MAX_MB", "8"))
+# A running voice job refreshes its heartbeat this often; one not heard from
+# for VOICE_JOB_STALE_S is reported failed (its container went away)
+VOICE_JOB_HEARTBEAT_S = 30.0
+VOICE_JOB_STALE_S = float(os.environ.get("TTS_VOICE_JOB_STALE_S", "180"))
+
+# Optional output post-processing (tts_core.postprocess): trim leading and
+# trailing silence, pad the end up to end_pad_ms instead of a fixed 500 ms,
+# and normalize speech to target_dbfs. Applies to whole and streamed outputs
+POSTPROCESS = os.environ.get("TTS_POSTPROCESS", "0") == "1"
+POSTPROCESS_PARAMS = {
+    "threshold_db": float(os.environ.get("TTS_TRIM_THRESHOLD_DB", "-50")),
+    "margin_ms": float(os.environ.get("TTS_TRIM_MARGIN_MS", "40")),
+    "end_pad_ms": float(os.environ.get("TTS_END_PAD_MS", "250")),
+    "target_dbfs": float(os.environ.get("TTS_LOUDNESS_TARGET_DBFS", "-20")),
+    "max_gain_db": 12.0,
+}
+
+# Upper bound on chunks in one synthesize_many request
+MAX_MANY_CHUNKS = int(os.environ.get("TTS_MAX_MANY_CHUNKS", "64"))
+# Chunks of one synthesize_many request in flight at once. Each request gets
+# its own workers, so a long read-aloud can't hold up other sessions' chunks
+MANY_CONCURRENCY = int(os.environ.get("TTS_MANY_CONCURRENCY", str(BATCH_MAX_SIZE)))
+
+# GPT tokens decoded per streamed frame (~20 tokens is roughly 0.4s of audio)
+STREAM_CHUNK_SIZE = 20
+
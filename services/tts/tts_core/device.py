@@ -0,0 +1,112 @@
+"""
+Device placement, precision and CPU thread settings for XTTS inference.
+
+The GPU pool runs the model as loaded. The CPU fallback pool (and GPU-less
+dev boxes) can quantize the GPT's linear layers to int8 and/or run under
+bf16 autocast, trading a little quality for a large speed-up.
+"""
+
+from contextlib import contextmanager, nullcontext
+
+DTYPES = ("fp32", "bf16")
+QUANTIZE_MODES = ("none", "int8")
+
+
+def resolve_device(name: str = "auto") -> str:
+    """Map "auto" to CUDA when available, otherwise CPU."""
+    import torch
+
+    if name == "auto":
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    if name.startswith("cuda") and not torch.cuda.is_available():
+        raise ValueError(f"Device '{name}' requested but CUDA is not available")
+    return name
+
+
+def configure_threads(intra_op: int = 0, inter_op: int = 0):
+    """Set torch's thread pools; 0 leaves torch's default in place.
+
+    The inter-op pool can only be sized before it is first used, so call
+    this before loading the model.
+    """
+    import torch
+
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            # Already initialised (e.g. a second model in the same process)
+            pass
+
+
+def _conv1d_to_linear(module):
+    """Swap HF GPT-2 Conv1D layers for equivalent nn.Linear ones.
+
+    GPT-2 implements its projections as Conv1D (y = x @ W + b with W stored
+    as (in, out)), which dynamic quantization does not recognise.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
+
+
+def prepare_model(model, device: str, quantize: str = "none"):
+    """Move an XTTS model to `device`, optionally int8-quantizing the GPT."""
+    import torch
+
+    if quantize not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantize mode '{quantize}', expected one of {QUANTIZE_MODES}")
+    if quantize == "int8" and device != "cpu":
+        raise ValueError("int8 dynamic quantization is only supported on CPU")
+
+    model.to(device)
+    model.eval()
+
+    if quantize == "int8":
+        # gpt_inference shares its transformer blocks with model.gpt, so
+        # converting in place covers both the training and decode paths
+        _conv1d_to_linear(model.gpt)
+        torch.ao.quantization.quantize_dynamic(
+            model.gpt, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+
+    return model
+
+
+def autocast(device: str, dtype: str = "fp32"):
+    """Context manager running the enclosed ops in `dtype` on `device`."""
+    import torch
+
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype '{dtype}', expected one of {DTYPES}")
+    if dtype == "fp32":
+        return nullcontext()
+    return torch.autocast(device_type=device.split(":")[0], dtype=torch.bfloat16)
+
+
+@contextmanager
+def inference_mode(device: str, dtype: str = "fp32"):
+    """no_grad plus the configured autocast, for every model call."""
+    import torch
+
+    with torch.no_grad(), autocast(device, dtype):
+        yield
+
+
+def synchronize(device: str):
+    """Wait for queued kernels so timings cover the real work."""
+    import torch
+
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
@@ -0,0 +1,62 @@
+"""
+Compressed output encodings (Ogg/Opus and MP3) via PyAV.
+
+Encoding runs in-process on int16 PCM, so no ffmpeg subprocess or temp file
+is involved. Callers decide which thread it runs on.
+"""
+
+import io
+
+import numpy as np
+
+# Output format -> HTTP media type
+MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "pcm16": "application/octet-stream",
+    "opus": "audio/ogg",
+    "mp3": "audio/mpeg",
+}
+
+# format -> (container, codec, default bitrate in bits/s)
+_CODECS = {
+    "opus": ("ogg", "libopus", 32_000),
+    "mp3": ("mp3", "libmp3lame", 64_000),
+}
+
+
+def is_compressed(fmt: str) -> bool:
+    return fmt in _CODECS
+
+
+def default_bitrate(fmt: str) -> int | None:
+    return _CODECS[fmt][2] if fmt in _CODECS else None
+
+
+def encode_compressed(pcm: np.ndarray, sample_rate: int, fmt: str, bitrate: int | None = None) -> bytes:
+    """Encode mono int16 PCM to Ogg/Opus or MP3."""
+    import av
+
+    if fmt not in _CODECS:
+        raise ValueError(f"Unsupported compressed format '{fmt}'")
+    container_format, codec, default = _CODECS[fmt]
+
+    buf = io.BytesIO()
+    with av.open(buf, mode="w", format=container_format) as container:
+        stream = container.add_stream(codec, rate=sample_rate)
+        stream.bit_rate = bitrate or default
+        stream.layout = "mono"
+
+        frame = av.AudioFrame.from_ndarray(
+            np.ascontiguousarray(pcm, dtype=np.int16).reshape(1, -1),
+            format="s16",
+            layout="mono",
+        )
+        frame.sample_rate = sample_rate
+
+        # PyAV re-frames to the codec's frame size and sample format
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+
+    return buf.getvalue()
@@ -0,0 +1,1140 @@
+"""
+The TTS service core: XTTS model, voice state, caches and synthesis.
+
+Framework-independent, so the same engine runs inside the Modal class
+(app.py) and under a plain uvicorn server (tts_core.server). Hosting code
+passes hooks for persisting changes to the voices directory, which on
+Modal means committing and reloading the volume.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+from .config import (
+    AUDIO_CACHE_DIR,
+    AUDIO_CACHE_DISK_MB,
+    AUDIO_CACHE_MAX_MB,
+    AUDIO_TOKENS_PER_SECOND,
+    BATCH_MAX_SIZE,
+    BATCH_MAX_WAIT_MS,
+    CONDITIONING_BUDGET_S,
+    CONDITIONING_PARAMS,
+    DEFAULT_VOICE,
+    DEVICE,
+    DTYPE,
+    ENCODER_THREADS,
+    FAST_CHECKPOINT,
+    FILLER_CLIPS,
+    FILLER_CROSSFADE_MS,
+    FAST_START,
+    INFERENCE_PARAMS,
+    INTER_OP_THREADS,
+    INTRA_OP_THREADS,
+    MANY_CONCURRENCY,
+    MAX_MANY_CHUNKS,
+    MIN_GENERATION_SECONDS,
+    MODEL_PATH,
+    POSTPROCESS,
+    POSTPROCESS_PARAMS,
+    PREFIX_KV_CACHE,
+    QUANTIZE,
+    RUNAWAY_MARGIN,
+    SAMPLE_RATE,
+    SPEECH_CHARS_PER_SECOND,
+    STREAM_CHUNK_SIZE,
+    UPLOAD_CHUNK_MAX_MB,
+    VOICE_CACHE_DEVICE_LIMIT,
+    VOICE_CACHE_HOST_LIMIT,
+    VOICE_JOB_HEARTBEAT_S,
+    VOICE_JOB_STALE_S,
+    VOICES_DIR,
+    WARMUP_TEXT,
+)
+
+
+def _noop():
+    pass
+
+
+class TTSEngine:
+    def __init__(
+        self,
+        commit_voices: Callable[[], None] = _noop,
+        reload_voices: Callable[[], None] = _noop,
+    ):
+        # Persist writes under VOICES_DIR / pick up writes made elsewhere
+        self._commit_voices = commit_voices
+        self._reload_voices = reload_voices
+
+    def load(self):
+        """Load XTTS model and pre-cache voice embeddings."""
+        import os
+        os.environ["COQUI_TOS_AGREED"] = "1"
+
+        from concurrent.futures import ThreadPoolExecutor
+        from TTS.tts.configs.xtts_config import XttsConfig
+        from TTS.tts.models.xtts import Xtts
+        from .audio_cache import AudioCache
+        from .batching import MicroBatcher
+        from .device import configure_threads, prepare_model, resolve_device
+        from .metrics import Metrics, StageTimer
+        from .single_flight import SingleFlight
+        from .uploads import UploadStore
+        from .voice_cache import VoiceCache
+
+        self.metrics = Metrics()
+        self.metrics.describe("stage_seconds", "Time spent in each synthesis stage")
+        self.metrics.describe("realtime_factor", "Audio seconds produced per second of inference")
+        self.metrics.describe("tokens_generated", "GPT audio tokens generated per request")
+        self.metrics.describe("startup_seconds", "Container startup time per phase")
+        self.metrics.describe("trimmed_audio_seconds", "Silence removed by post-processing per output")
+        self.metrics.describe("token_overrun_ratio", "GPT audio tokens generated over the expected count")
+
+        startup = StageTimer()
+        start = time.perf_counter()
+
+        # XTTS keeps per-generation state on the shared model (the GPT's
+        # cached prefix embedding), so model calls from the batcher, streams,
+        # voice loads and jobs run one at a time (see _inference_mode)
+        self._model_lock = threading.RLock()
+
+        self.device = resolve_device(DEVICE)
+        configure_threads(INTRA_OP_THREADS, INTER_OP_THREADS)
+        print(f"Loading XTTS model on {self.device} (quantize={QUANTIZE}, dtype={DTYPE})...")
+
+        # Load model directly for more control
+        with startup.stage("config"):
+            config = XttsConfig()
+            config.load_json(f"{MODEL_PATH}/config.json")
+            self.model = Xtts.init_from_config(config)
+
+        with startup.stage("checkpoint"):
+            if FAST_START and os.path.exists(FAST_CHECKPOINT):
+                from safetensors.torch import load_file
+
+                # load_checkpoint still builds the tokenizer and inference
+                # GPT; only the state dict comes from the memory-mapped file
+                self.model.get_compatible_checkpoint_state_dict = (
+                    lambda _path: load_file(FAST_CHECKPOINT, device="cpu")
+                )
+            self.model.load_checkpoint(config, checkpoint_dir=MODEL_PATH)
+
+        with startup.stage("to_device"):
+            prepare_model(self.model, self.device, quantize=QUANTIZE)
+
+        self.prefix_cache = None
+        if PREFIX_KV_CACHE:
+            from .prefix_cache import PrefixKVCache
+
+            self.prefix_cache = PrefixKVCache(self.model.gpt)
+
+        self.encoder_pool = ThreadPoolExecutor(
+            max_workers=ENCODER_THREADS, thread_name_prefix="tts-encode"
+        )
+
+        self.audio_cache = AudioCache(
+            max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024,
+            disk_dir=AUDIO_CACHE_DIR or None,
+            disk_max_bytes=AUDIO_CACHE_DISK_MB * 1024 * 1024,
+        )
+
+        # Identical concurrent misses share one generation
+        self.single_flight = SingleFlight()
+
+        # Resumable voice uploads; their conditioning jobs run one at a time
+        # so a large corpus never competes with itself for the GPU
+        self.uploads = UploadStore(
+            VOICES_DIR,
+            commit=self._commit_voices,
+            reload=self._reload_voices,
+            max_chunk_bytes=UPLOAD_CHUNK_MAX_MB * 1024 * 1024,
+        )
+        self._voice_job_lock = threading.Lock()
+
+        self.batcher = MicroBatcher(
+            self._generate,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+        )
+
+        # Pre-cache voice embeddings
+        self.voice_cache = VoiceCache(
+            self.device,
+            device_limit=VOICE_CACHE_DEVICE_LIMIT,
+            host_limit=VOICE_CACHE_HOST_LIMIT,
+        )
+        self._voice_load_lock = threading.Lock()
+
+        with startup.stage("default_voice"):
+            if FAST_START:
+                try:
+                    self._get_voice(DEFAULT_VOICE)
+                except ValueError:
+                    print(f"Default voice '{DEFAULT_VOICE}' not found")
+            else:
+                self._preload_voices()
+
+        if FAST_START:
+            # Remaining voices load behind live traffic
+            threading.Thread(target=self._preload_voices, name="voice-preload", daemon=True).start()
+
+            if DEFAULT_VOICE in self.voice_cache:
+                with startup.stage("warmup"):
+                    self._warmup(DEFAULT_VOICE)
+
+        startup.record("total", time.perf_counter() - start)
+        self.startup_ms = startup.as_ms()
+        for phase, seconds in startup.stages.items():
+            self.metrics.set("startup_seconds", seconds, phase=phase)
+
+        print(f"Model loaded successfully! Startup phases (ms): {self.startup_ms}")
+
+    def _warmup(self, voice_id: str):
+        """One short synthesis so kernels and the allocator are primed."""
+        from .device import synchronize
+
+        voice = self._get_voice(voice_id)
+        with self._inference_mode(voice):
+            self.model.inference(
+                text=WARMUP_TEXT,
+                language="en",
+                gpt_cond_latent=voice["gpt_cond_latent"],
+                speaker_embedding=voice["speaker_embedding"],
+                enable_text_splitting=False,
+                **INFERENCE_PARAMS,
+            )
+        synchronize(self.device)
+
+    @contextmanager
+    def _inference_mode(self, voice: dict | None = None):
+        """The model lock, no_grad and the configured precision for model calls.
+
+        Every model call runs inside this. Passing the voice seeds GPT
+        generation with its cached prefix state.
+        """
+        from .device import inference_mode
+
+        with self._model_lock, inference_mode(self.device, DTYPE):
+            if self.prefix_cache is None or voice is None:
+                yield
+            else:
+                with self.prefix_cache.seeded(voice.get("prefix_kv")):
+                    yield
+
+    def _preload_voices(self):
+        """Pre-compute speaker embeddings for faster inference.
+
+        Most recently updated voices first, and only as many as the voice
+        cache holds; voices past the device tier go straight to the host tier
+        so they never push out ones already serving.
+        """
+        import os
+
+        voices_dir = VOICES_DIR
+        if not os.path.exists(voices_dir):
+            return
+
+        voice_ids = [
+            v for v in os.listdir(voices_dir)
+            # Dot-directories hold service data (e.g. the audio cache), not voices
+            if os.path.isdir(f"{voices_dir}/{v}") and not v.startswith(".")
+        ]
+        voice_ids.sort(key=lambda v: os.path.getmtime(f"{voices_dir}/{v}"), reverse=True)
+
+        for voice_id in voice_ids:
+            if len(self.voice_cache) >= self.voice_cache.capacity:
+                break
+            with self._voice_load_lock:
+                if voice_id in self.voice_cache:
+                    continue
+                try:
+                    voice = self._load_voice(voice_id)
+                except Exception as e:
+                    # One bad voice directory shouldn't stop the rest loading
+                    print(f"  Failed to load voice {voice_id}: {e}")
+                    continue
+                host = len(self.voice_cache) >= VOICE_CACHE_DEVICE_LIMIT
+                self.voice_cache.put(voice_id, voice, host=host)
+                print(f"  Cached {voice_id} ({'host' if host else 'device'})")
+
+    def _voice_clips(self, voice_path: str) -> list[dict]:
+        """Best-scoring clips in the voice's clip store that fit the conditioning budget.
+
+        Read-only: loose WAVs from the old per-file layout are packed by
+        clip_store.migrate_layout (once) or refresh_voice, not here.
+        """
+        from .clip_quality import select_clips
+        from .clip_store import ClipStore
+
+        with ClipStore(voice_path) as store:
+            scored = [
+                {**e, "score": e["quality"]["score"]} for e in store.entries() if "quality" in e
+            ]
+
+        chosen = select_clips(scored, CONDITIONING_BUDGET_S)
+        if not chosen and scored:
+            # Every clip is longer than the budget; fall back to the best one
+            chosen = [max(scored, key=lambda c: c["score"])]
+
+        return chosen
+
+    def _load_or_compute_latents(self, voice_path: str, clips: list[dict]) -> dict:
+        """Load persisted latents, recomputing only when clips or settings changed."""
+        from .clip_store import ClipStore
+        from .latents import compute_latents, latents_key, load_latents, save_latents
+
+        key = latents_key([(c["path"], c["sha256"]) for c in clips], CONDITIONING_PARAMS)
+        latents = load_latents(voice_path, key, device=self.device)
+        if latents is not None:
+            latents["key"] = key
+            return latents
+
+        print(f"  Computing conditioning latents from {len(clips)} clips")
+        with ClipStore(voice_path) as store, self._model_lock:
+            gpt_cond_latent, speaker_embedding = compute_latents(
+                self.model,
+                [(store.samples(c["path"]), store.sample_rate(c["path"])) for c in clips],
+                **CONDITIONING_PARAMS,
+            )
+        latents = {
+            "gpt_cond_latent": gpt_cond_latent,
+            "speaker_embedding": speaker_embedding,
+        }
+
+        save_latents(voice_path, key, latents)
+        latents["key"] = key
+        self._commit_voices()
+        return latents
+
+    def _build_voice(self, voice_path: str, clips: list[dict]) -> dict:
+        """Voice cache entry: conditioning latents plus derived GPT state.
+
+        Everything derived from the latents lives in the same entry, so
+        replacing the entry (create_voice, refresh_voice) invalidates it.
+        """
+        voice = self._load_or_compute_latents(voice_path, clips)
+        if self.prefix_cache is not None:
+            with self._inference_mode():
+                voice["prefix_kv"] = self.prefix_cache.compute(voice["gpt_cond_latent"])
+        if FILLER_CLIPS:
+            voice["fillers"] = self._load_or_render_fillers(voice_path, voice)
+        return voice
+
+    def _load_or_render_fillers(self, voice_path: str, voice: dict) -> dict:
+        """Filler ID -> float32 clip, rendered once per voice version.
+
+        Clips stay on the host (the voice cache only moves tensors); they
+        are only ever copied into output buffers.
+        """
+        from .fillers import FILLERS, fillers_key, load_fillers, save_fillers, trim_clip
+
+        key = fillers_key(voice["key"], INFERENCE_PARAMS)
+        clips = load_fillers(voice_path, key)
+        if clips is not None:
+            return clips
+
+        print(f"  Rendering {len(FILLERS)} filler clips")
+        ids = list(FILLERS)
+        clips = {}
+        for i in range(0, len(ids), BATCH_MAX_SIZE):
+            batch = ids[i:i + BATCH_MAX_SIZE]
+            results = self._generate(voice, [FILLERS[f] for f in batch])
+            for filler_id, result in zip(batch, results):
+                clips[filler_id] = trim_clip(result["wav"], SAMPLE_RATE)
+
+        save_fillers(voice_path, key, clips)
+        self._commit_voices()
+        return clips
+
+    def _get_voice(self, voice_id: str):
+        """Get cached voice embeddings, computing if needed."""
+        from .voice_ids import check_voice_id
+
+        voice = self.voice_cache.get(check_voice_id(voice_id))
+        if voice is not None:
+            return voice
+
+        # One load at a time, so a request and the background preload never
+        # compute the same voice twice
+        with self._voice_load_lock:
+            voice = self.voice_cache.get(voice_id, record=False)
+            if voice is None:
+                voice = self._load_voice(voice_id)
+                self.voice_cache.put(voice_id, voice)
+            return voice
+
+    def _load_voice(self, voice_id: str) -> dict:
+        """Build a voice entry from the volume (persisted latents if current)."""
+        import os
+        from .voice_ids import voice_dir
+
+        voice_path = voice_dir(VOICES_DIR, voice_id)
+        if not os.path.exists(voice_path):
+            raise ValueError(f"Voice '{voice_id}' not found")
+
+        clips = self._voice_clips(voice_path)
+        if not clips:
+            if any(name.endswith(".wav") for name in os.listdir(voice_path)):
+                raise ValueError(
+                    f"Voice '{voice_id}' has only loose clip WAVs; pack them with refresh_voice "
+                    "or app.py's migrate_clip_layout"
+                )
+            raise ValueError(f"Voice '{voice_id}' has no clips")
+
+        print(f"Loading embeddings for voice: {voice_id}")
+        return self._build_voice(voice_path, clips)
+
+    def prefetch_voice(self, voice_id: str) -> dict:
+        """Make a voice device-resident ahead of use (e.g. when a session opens)."""
+        from .voice_ids import check_voice_id
+
+        start = time.perf_counter()
+        self._get_voice(check_voice_id(voice_id))
+        return {
+            "voice_id": voice_id,
+            "status": "ready",
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def create_voice(self, voice_id: str, audio_clips: list[bytes]) -> dict:
+        """Create a voice profile from audio clips.
+
+        Every clip travels in this one call; large corpora should use the
+        resumable upload (start_voice_upload) instead.
+        """
+        import os
+        from .clip_store import ClipStore, read_wav
+        from .voice_ids import voice_dir as resolve_voice_dir
+
+        voice_dir = resolve_voice_dir(VOICES_DIR, voice_id)
+
+        # The clips become the voice's full set. The store hashes each as
+        # its canonical WAV (not the bytes sent), which is what later
+        # uploads dedupe against
+        names = [f"clip_{i}.wav" for i in range(len(audio_clips))]
+        with ClipStore(voice_dir) as store:
+            with store.transaction():
+                for name, clip in zip(names, audio_clips):
+                    samples, sample_rate = read_wav(clip)
+                    store.add(name, samples, sample_rate)
+                store.retain(names)
+            store.compact()
+        # Loose clips from the old per-file layout would otherwise be packed over these
+        for name in os.listdir(voice_dir):
+            if name.endswith(".wav"):
+                os.remove(os.path.join(voice_dir, name))
+        self._commit_voices()
+
+        # Compute embeddings immediately from the same clip selection preload
+        # uses; the new entry replaces the old latents and prefix state
+        self.voice_cache.put(voice_id, self._build_voice(voice_dir, self._voice_clips(voice_dir)))
+
+        # Audio rendered with the old profile must not be served again
+        self.audio_cache.flush_voice(voice_id)
+
+        return {"voice_id": voice_id, "status": "created", "clips": len(names)}
+
+    def refresh_voice(self, voice_id: str) -> dict:
+        """Reload a voice after clips were added directly on the volume.
+
+        Clip WAVs dropped into the voice directory are packed into its store.
+        """
+        import os
+        from .clip_store import ClipStore
+        from .voice_ids import voice_dir as resolve_voice_dir
+
+        voice_dir = resolve_voice_dir(VOICES_DIR, voice_id)
+        self._reload_voices()
+        if not os.path.exists(voice_dir):
+            raise ValueError(f"Voice '{voice_id}' not found")
+
+        with ClipStore(voice_dir) as store:
+            if store.import_layout(voice_dir, remove_files=True):
+                self._commit_voices()
+        clips = self._voice_clips(voice_dir)
+        self.voice_cache.put(voice_id, self._build_voice(voice_dir, clips))
+        self.audio_cache.flush_voice(voice_id)
+
+        return {"voice_id": voice_id, "status": "refreshed", "clips": len(clips)}
+
+    def start_voice_upload(self, voice_id: str, clips: list[dict]) -> dict:
+        """Begin or resume a chunked upload of a voice's full clip set.
+
+        clips is [{"name", "sha256", "size"}]. Returns the upload ID and,
+        per clip the volume doesn't already hold, the bytes received so far
+        (see tts_core.uploads).
+        """
+        return self.uploads.start(voice_id, clips)
+
+    def upload_clip_chunk(self, upload_id: str, sha256: str, offset: int, data: bytes) -> dict:
+        """Store one chunk of a clip at offset."""
+        return self.uploads.put_chunk(upload_id, sha256, offset, data)
+
+    def queue_voice_upload(self, upload_id: str) -> dict:
+        """Record a queued conditioning job for a complete upload; run it with run_voice_job."""
+        import uuid
+
+        voice_id = self.uploads.check_complete(upload_id)
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "voice_id": voice_id,
+            "upload_id": upload_id,
+            "status": "queued",
+            "created": now,
+            "heartbeat": now,
+        }
+        # Also commits the upload's chunks, which are not committed one by one
+        self.uploads.save_job(job)
+        return job
+
+    def finish_voice_upload(self, upload_id: str) -> dict:
+        """Queue assembly and conditioning for a complete upload.
+
+        The job runs on a background thread here; returns at once with the
+        job, poll voice_job for its status.
+        """
+        job = self.queue_voice_upload(upload_id)
+        threading.Thread(
+            target=self.run_voice_job, args=(job,), name="tts-voice-job", daemon=True
+        ).start()
+        return job
+
+    def run_voice_job(self, job: dict):
+        """Pack an upload's clips into the voice's store, then rebuild the voice.
+
+        Jobs run one at a time. While one waits its turn and runs, its
+        heartbeat on the volume is refreshed every VOICE_JOB_HEARTBEAT_S,
+        so voice_job can tell a slow job from one whose container is gone.
+        """
+        voice_id = job["voice_id"]
+        state = dict(job)
+        save_lock = threading.Lock()
+        done = threading.Event()
+
+        def save(**fields):
+            with save_lock:
+                state.update(fields, heartbeat=time.time())
+                self.uploads.save_job(dict(state))
+
+        def heartbeat():
+            while not done.wait(VOICE_JOB_HEARTBEAT_S):
+                save()
+
+        threading.Thread(target=heartbeat, name="tts-voice-job-heartbeat", daemon=True).start()
+        try:
+            with self._voice_job_lock:
+                start = time.perf_counter()
+                save(status="assembling")
+                voice_dir = self.uploads.assemble(job["upload_id"])
+
+                save(status="conditioning")
+                clips = self._voice_clips(voice_dir)
+                if not clips:
+                    raise ValueError(f"Voice '{voice_id}' has no clips")
+                self.voice_cache.put(voice_id, self._build_voice(voice_dir, clips))
+                # Audio rendered with the old profile must not be served again
+                self.audio_cache.flush_voice(voice_id)
+
+                save(status="ready", clips=len(clips), seconds=round(time.perf_counter() - start, 2))
+                self.metrics.observe("stage_seconds", time.perf_counter() - start, stage="voice_job")
+        except Exception as e:
+            print(f"[TTS] Voice job {job['job_id']} for {voice_id} failed: {e}")
+            save(status="failed", error=str(e))
+        finally:
+            done.set()
+
+    def voice_job(self, job_id: str) -> dict:
+        """Status of a conditioning job: queued, assembling, conditioning,
+        ready or failed (with "error").
+
+        An unfinished job whose heartbeat is older than VOICE_JOB_STALE_S
+        is reported failed: its container stopped (scaled down or
+        preempted) and nothing will finish it.
+        """
+        from .uploads import FINAL_JOB_STATUSES
+
+        job = self.uploads.load_job(job_id)
+        if job is None:
+            raise ValueError(f"Job '{job_id}' not found")
+        heartbeat = job.get("heartbeat", job["created"])
+        if job["status"] not in FINAL_JOB_STATUSES and time.time() - heartbeat > VOICE_JOB_STALE_S:
+            return {
+                **job,
+                "status": "failed",
+                "error": "Job stopped responding (its container went away); run the upload again",
+            }
+        return job
+
+    def _estimate_duration(self, text: str, chars_per_second: float = 7.0) -> float:
+        """Estimate expected audio duration based on text length."""
+        # Very conservative: ~7 chars/sec (slower estimate = more room)
+        base_duration = len(text) / chars_per_second
+        return base_duration * 2.5  # 150% buffer to avoid cutting off
+
+    def _token_budget(self, text: str) -> tuple[int, int, int]:
+        """(expected, limit, cap) GPT audio tokens for a text.
+
+        expected is the text spoken at SPEECH_CHARS_PER_SECOND. Output
+        longer than limit (RUNAWAY_MARGIN times that, at least
+        MIN_GENERATION_SECONDS) is a runaway: it is flagged and trimmed back
+        to limit. Generation stops at cap, one token past limit, so a
+        runaway is caught as soon as it starts. cap never exceeds the
+        model's own max_gen_mel_tokens, since max_new_tokens overrides the
+        max_length XTTS passes and the mel position table ends just past it.
+        """
+        import math
+
+        expected = max(math.ceil(len(text) / SPEECH_CHARS_PER_SECOND * AUDIO_TOKENS_PER_SECOND), 1)
+        ceiling = self.model.gpt.max_gen_mel_tokens
+        limit = max(
+            math.ceil(expected * RUNAWAY_MARGIN),
+            math.ceil(MIN_GENERATION_SECONDS * AUDIO_TOKENS_PER_SECOND),
+        )
+        limit = min(limit, ceiling)
+        return expected, limit, min(limit + 1, ceiling)
+
+    def _process_audio(
+        self,
+        wav,
+        sample_rate: int = SAMPLE_RATE,
+        format: str = "wav",
+        bitrate: int | None = None,
+    ) -> tuple[bytes, float]:
+        """Pad (and optionally trim and level) audio, then encode it.
+
+        Returns (audio, ms of audio removed). Without TTS_POSTPROCESS the
+        output is untrimmed with a fixed 500 ms of trailing silence; with it,
+        tts_core.postprocess trims, pads adaptively and normalizes loudness.
+
+        The int16 samples, the zeroed padding and (for wav) the header are
+        written into one preallocated buffer. Opus/MP3 are encoded from that
+        buffer on the encoder pool.
+        """
+        import numpy as np
+        from .audio import render_pcm16, to_pcm16
+        from .encoding import encode_compressed, is_compressed
+
+        removed_ms = 0.0
+        if POSTPROCESS:
+            from .postprocess import Postprocessor
+
+            post = Postprocessor(sample_rate, **POSTPROCESS_PARAMS)
+            body = post.process(wav)
+            tail, silence_samples = post.finish()
+            wav = np.concatenate([body, tail])
+            removed_ms = post.removed_ms
+        else:
+            # No trimming - just add 500ms silence padding
+            silence_samples = int(0.5 * sample_rate)
+        buf = render_pcm16(to_pcm16(wav), sample_rate, silence_samples, wav_header=format == "wav")
+
+        if is_compressed(format):
+            pcm = np.frombuffer(buf, dtype="<i2")
+            return self.encoder_pool.submit(
+                encode_compressed, pcm, sample_rate, format, bitrate
+            ).result(), removed_ms
+
+        return bytes(buf), removed_ms
+
+    def _generate(self, voice: dict, texts: list[str]) -> list[dict]:
+        """Run one padded GPT batch for texts with a resolved voice entry.
+
+        Also the batcher callback: callers resolve the voice on their own
+        thread, so a voice load never stalls the batches queued behind it.
+
+        Returns {"wav", "tokens", "expected", "capped"} per text: tokens is
+        the number of GPT audio tokens generated, expected the estimate for
+        the text, and capped whether output ran past the runaway limit (or
+        the model's ceiling) and was trimmed.
+        """
+        import torch
+        import torch.nn.functional as F
+
+        budgets = [self._token_budget(t) for t in texts]
+
+        if len(texts) == 1:
+            expected, limit, cap = budgets[0]
+            # Use inference() directly with strict parameters
+            with self._inference_mode(voice):
+                out = self.model.inference(
+                    text=texts[0],
+                    language="en",
+                    gpt_cond_latent=voice["gpt_cond_latent"],
+                    speaker_embedding=voice["speaker_embedding"],
+                    enable_text_splitting=False,  # Don't split text internally
+                    max_new_tokens=cap,
+                    **INFERENCE_PARAMS,
+                )
+            wav, tokens = out["wav"], out["gpt_latents"].shape[1]
+            capped = tokens >= cap
+            if capped:
+                wav = wav[: int(limit * SAMPLE_RATE / AUDIO_TOKENS_PER_SECOND)]
+            return [{"wav": wav, "tokens": tokens, "expected": expected, "capped": capped}]
+
+        gpt = self.model.gpt
+        device = voice["gpt_cond_latent"].device
+        params = dict(INFERENCE_PARAMS)
+        speed = params.pop("speed")
+
+        tokens = [
+            torch.IntTensor(self.model.tokenizer.encode(t.strip().lower(), lang="en")).to(device)
+            for t in texts
+        ]
+        max_len = max(t.shape[-1] for t in tokens)
+
+        # Right-pad with the stop-text token; batches are grouped by similar
+        # length so only a few pad positions are ever added
+        padded = torch.stack([
+            F.pad(t, (0, max_len - t.shape[-1]), value=gpt.stop_text_token) for t in tokens
+        ])
+        cond = voice["gpt_cond_latent"].expand(len(texts), -1, -1)
+
+        # gpt.generate feeds [cond | start_text | text | stop_text | start_audio];
+        # mask the pad positions so shorter texts attend to the same context
+        # as when they run alone. The inference GPT has no position embedding
+        # and derives audio positions from the mask width, so only attention
+        # changes. The mask also covers the prefix-cached cond positions.
+        cond_len = cond.shape[1]
+        attention_mask = torch.ones(
+            (len(texts), cond_len + max_len + 3), dtype=torch.long, device=device
+        )
+        for i, t in enumerate(tokens):
+            attention_mask[i, cond_len + 1 + t.shape[-1] : cond_len + 1 + max_len] = 0
+
+        with self._inference_mode(voice):
+            codes = gpt.generate(
+                cond_latents=cond,
+                text_inputs=padded,
+                input_tokens=None,
+                do_sample=True,
+                num_beams=1,
+                output_attentions=False,
+                attention_mask=attention_mask,
+                max_new_tokens=max(cap for _, _, cap in budgets),
+                **params,
+            )
+
+            wavs = []
+            for i, text_tokens in enumerate(tokens):
+                # Sequences that finished early are padded with stop tokens
+                seq = codes[i]
+                stops = (seq == gpt.stop_audio_token).nonzero()
+                if len(stops):
+                    seq = seq[: stops[0, 0]]
+                generated = seq.shape[-1]
+
+                # The batch runs to its longest cap, so each item is held to its own
+                expected, limit, cap = budgets[i]
+                capped = generated >= cap
+                if capped:
+                    seq = seq[:limit]
+                seq = seq.unsqueeze(0)
+                text_tokens = text_tokens.unsqueeze(0)
+
+                expected_output_len = torch.tensor(
+                    [seq.shape[-1] * gpt.code_stride_len], device=device
+                )
+                text_len = torch.tensor([text_tokens.shape[-1]], device=device)
+                latents = gpt(
+                    text_tokens,
+                    text_len,
+                    seq,
+                    expected_output_len,
+                    cond_latents=voice["gpt_cond_latent"],
+                    return_attentions=False,
+                    return_latent=True,
+                )
+                if speed != 1.0:
+                    latents = F.interpolate(
+                        latents.transpose(1, 2), scale_factor=1.0 / speed, mode="linear"
+                    ).transpose(1, 2)
+
+                wav = self.model.hifigan_decoder(latents, g=voice["speaker_embedding"])
+                wavs.append({
+                    "wav": wav.squeeze(),
+                    "tokens": generated,
+                    "expected": expected,
+                    "capped": capped,
+                })
+
+        return wavs
+
+    def _synthesize(
+        self,
+        text: str,
+        voice_id: str,
+        format: str,
+        bitrate: int | None,
+        filler: str | None = None,
+    ) -> dict:
+        """Synthesize and return {"audio", "timings" (ms per stage), "capped",
+        "trimmed_ms"}."""
+        from .encoding import MEDIA_TYPES, default_bitrate
+        from .fillers import FILLERS
+        from .metrics import StageTimer
+
+        if format not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported format '{format}'")
+        if filler is not None and filler not in FILLERS:
+            raise ValueError(f"Unknown filler '{filler}'")
+        bitrate = bitrate or default_bitrate(format)
+
+        timer = StageTimer(self.metrics)
+        start = time.perf_counter()
+
+        with timer.stage("voice_lookup"):
+            voice = self._get_voice(voice_id)
+
+        if filler is not None and "fillers" not in voice:
+            # Clips disabled (TTS_FILLER_CLIPS=0): generate the filler as text
+            text, filler = f"{FILLERS[filler]} {text}", None
+
+        params = {**INFERENCE_PARAMS, "format": format, "bitrate": bitrate}
+        if filler is not None:
+            params["filler"] = filler
+        if POSTPROCESS:
+            params["postprocess"] = POSTPROCESS_PARAMS
+
+        with timer.stage("cache_lookup"):
+            cache_key = self.audio_cache.key(text, voice_id, params, voice["key"])
+            cached = self.audio_cache.get(cache_key, voice_id)
+
+        if cached is not None:
+            self.metrics.inc("audio_cache_lookups_total", result="hit")
+            timer.record("total", time.perf_counter() - start)
+            return {"audio": cached, "timings": timer.as_ms(), "capped": False, "trimmed_ms": 0.0}
+        self.metrics.inc("audio_cache_lookups_total", result="miss")
+
+        # The cache key covers text, voice version, params and encoding, so
+        # it is exactly the set of requests that would produce the same bytes
+        wait_start = time.perf_counter()
+        (audio, capped, trimmed_ms), shared = self.single_flight.do(
+            cache_key,
+            lambda: self._render(text, voice_id, voice, format, bitrate, cache_key, timer, filler),
+        )
+        if shared:
+            timer.record("coalesced_wait", time.perf_counter() - wait_start)
+            self.metrics.inc("coalesced_requests_total")
+
+        timer.record("total", time.perf_counter() - start)
+        return {"audio": audio, "timings": timer.as_ms(), "capped": capped, "trimmed_ms": trimmed_ms}
+
+    def _render(
+        self,
+        text: str,
+        voice_id: str,
+        voice: dict,
+        format: str,
+        bitrate: int,
+        cache_key: str,
+        timer,
+        filler: str | None = None,
+    ) -> tuple[bytes, bool, float]:
+        """Cache-miss path: generate, post-process, encode and cache.
+
+        `voice` is the entry _synthesize resolved on the request thread; it
+        goes to the batcher with the text. Only the body text is generated;
+        a filler's pre-rendered clip is spliced on in front. Returns (audio,
+        capped, trimmed_ms): the encoded audio, whether it ran past its
+        runaway limit, and milliseconds of silence removed by post-processing.
+        """
+        from .metrics import OVERRUN_BUCKETS, RTF_BUCKETS, TOKEN_BUCKETS, BATCH_BUCKETS
+
+        # Concurrent calls are grouped into one GPU batch by the batcher
+        result, stats = self.batcher.infer_with_stats(voice_id, text, voice)
+        timer.record("queue_wait", stats["queue_wait_s"])
+        timer.record("inference", stats["compute_s"])
+
+        wav = result["wav"]
+        audio_seconds = wav.shape[-1] / SAMPLE_RATE
+
+        # Add silence padding and encode
+        with timer.stage("postprocess"):
+            if filler is not None:
+                from .fillers import crossfade
+
+                clip = voice["fillers"][filler]
+                wav = crossfade(clip, wav, int(FILLER_CROSSFADE_MS * SAMPLE_RATE / 1000))
+            audio, trimmed_ms = self._process_audio(wav, format=format, bitrate=bitrate)
+            # A capped output was a runaway; let the next request resample
+            if not result["capped"]:
+                self.audio_cache.put(cache_key, voice_id, audio)
+
+        if result["capped"]:
+            self.metrics.inc("capped_generations_total")
+            print(f"[TTS] Capped runaway generation at {result['tokens']} tokens: {text[:50]!r}")
+
+        self.metrics.observe("batch_size", stats["batch_size"], buckets=BATCH_BUCKETS)
+        self.metrics.observe("tokens_generated", result["tokens"], buckets=TOKEN_BUCKETS)
+        self.metrics.observe(
+            "token_overrun_ratio", result["tokens"] / result["expected"], buckets=OVERRUN_BUCKETS
+        )
+        self.metrics.inc("tokens_generated_total", result["tokens"])
+        self.metrics.inc("audio_seconds_total", audio_seconds)
+        if stats["compute_s"] > 0:
+            self.metrics.observe("realtime_factor", audio_seconds / stats["compute_s"], buckets=RTF_BUCKETS)
+
+        if POSTPROCESS:
+            self.metrics.observe("trimmed_audio_seconds", trimmed_ms / 1000)
+            self.metrics.inc("trimmed_audio_seconds_total", trimmed_ms / 1000)
+
+        return audio, result["capped"], trimmed_ms
+
+    def synthesize(
+        self,
+        text: str,
+        voice_id: str = "austin",
+        format: str = "wav",
+        bitrate: int | None = None,
+        filler: str | None = None,
+    ) -> bytes:
+        """Synthesize audio with strict settings to prevent hallucination.
+
+        format is one of wav, pcm16 (headerless int16), opus (Ogg) or mp3;
+        bitrate (bits/s) applies to the compressed formats. filler names a
+        clip from tts_core.fillers to play before the text.
+        """
+        return self._synthesize(text, voice_id, format, bitrate, filler)["audio"]
+
+    def synthesize_timed(
+        self,
+        text: str,
+        voice_id: str = "austin",
+        format: str = "wav",
+        bitrate: int | None = None,
+        filler: str | None = None,
+    ) -> dict:
+        """synthesize() plus the server-side stage breakdown in milliseconds.
+
+        capped is True when output ran past its runaway limit and was trimmed;
+        trimmed_ms is the silence post-processing removed (0 on cache hits
+        or with TTS_POSTPROCESS off).
+        """
+        return self._synthesize(text, voice_id, format, bitrate, filler)
+
+    def synthesize_many(
+        self,
+        texts: list[str],
+        voice_id: str = "austin",
+        format: str = "wav",
+        bitrate: int | None = None,
+        fillers: list[str | None] | None = None,
+    ):
+        """Synthesize an ordered list of chunks for one voice.
+
+        fillers, if given, holds an optional filler ID per chunk. The voice
+        is resolved once up front, then up to MANY_CONCURRENCY chunks are in
+        flight at once on workers of this request's own, so chunks of similar
+        length share GPU batches (with each other and with other requests)
+        without one long request queueing ahead of everyone else. Yields
+        {"index", "audio", "timings", "capped", "trimmed_ms"} (or {"index",
+        "error"} for a chunk that failed) in index order, each as soon as it
+        and every chunk before it are done.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from .metrics import BATCH_BUCKETS
+
+        if len(texts) > MAX_MANY_CHUNKS:
+            raise ValueError(f"At most {MAX_MANY_CHUNKS} chunks per request")
+        if not all(isinstance(text, str) and text.strip() for text in texts):
+            raise ValueError("texts must be non-empty strings")
+        fillers = fillers or [None] * len(texts)
+        if len(fillers) != len(texts):
+            raise ValueError("fillers must have one entry per text")
+
+        start = time.perf_counter()
+        self._get_voice(voice_id)
+
+        pool = ThreadPoolExecutor(
+            max_workers=max(min(MANY_CONCURRENCY, len(texts)), 1), thread_name_prefix="tts-many"
+        )
+        futures = [
+            pool.submit(self._synthesize, text, voice_id, format, bitrate, filler)
+            for text, filler in zip(texts, fillers)
+        ]
+        try:
+            for index, future in enumerate(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # One bad chunk shouldn't silence the rest of the answer
+                    yield {"index": index, "error": str(e)}
+                    continue
+                yield {"index": index, **result}
+        finally:
+            # Caller went away: drop chunks that haven't started
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        self.metrics.observe("many_chunks", len(texts), buckets=BATCH_BUCKETS + (32, 64))
+        self.metrics.observe("stage_seconds", time.perf_counter() - start, stage="many_total")
+
+    def synthesize_stream(self, text: str, voice_id: str = "austin", filler: str | None = None):
+        """Stream 16-bit mono PCM frames as XTTS decodes them.
+
+        Frames already sent can't be taken back, so a stream is cut off as
+        soon as it runs past the runaway limit.
+        A filler clip goes out before generation starts, minus the tail
+        that is crossfaded into the first decoded frame. With
+        TTS_POSTPROCESS every frame passes through the same trim/level stage
+        as whole outputs.
+        """
+        from .audio import to_pcm16
+        from .fillers import FILLERS, crossfade
+        from .metrics import OVERRUN_BUCKETS
+
+        post = None
+        if POSTPROCESS:
+            from .postprocess import Postprocessor
+
+            post = Postprocessor(SAMPLE_RATE, **POSTPROCESS_PARAMS)
+
+        def frame_pcm(samples) -> bytes:
+            return to_pcm16(samples if post is None else post.process(samples)).tobytes()
+
+        if filler is not None and filler not in FILLERS:
+            raise ValueError(f"Unknown filler '{filler}'")
+
+        start = time.perf_counter()
+        first_byte_ms = None
+        total_bytes = 0
+
+        voice = self._get_voice(voice_id)
+        filler_tail = None
+        if filler is not None and "fillers" not in voice:
+            text = f"{FILLERS[filler]} {text}"
+        elif filler is not None:
+            clip = voice["fillers"][filler]
+            split = max(len(clip) - int(FILLER_CROSSFADE_MS * SAMPLE_RATE / 1000), 0)
+            filler_tail = clip[split:]
+            pcm = frame_pcm(clip[:split])
+            first_byte_ms = (time.perf_counter() - start) * 1000
+            total_bytes += len(pcm)
+            yield pcm
+
+        expected, limit, _ = self._token_budget(text)
+        # The filler clip already sent doesn't count against the body's budget
+        body_start = total_bytes
+        max_bytes = body_start + 2 * int(limit * SAMPLE_RATE / AUDIO_TOKENS_PER_SECOND)
+        capped = False
+
+        chunks = self.model.inference_stream(
+            text=text,
+            language="en",
+            gpt_cond_latent=voice["gpt_cond_latent"],
+            speaker_embedding=voice["speaker_embedding"],
+            stream_chunk_size=STREAM_CHUNK_SIZE,
+            enable_text_splitting=False,
+            # No max_new_tokens: inference_stream already passes max_length
+            # (the model's own ceiling) and the stream generator rejects both.
+            # The budget is enforced below by max_bytes instead
+            **INFERENCE_PARAMS,
+        )
+
+        # The model lock is only held while the generator runs, never across
+        # our own yields (a slow client would stall every other request).
+        # Other generations replace the GPT's cached prefix embedding in
+        # between, so ours is put back before each step.
+        inference = self.model.gpt.gpt_inference
+        prefix_emb = None
+        try:
+            while True:
+                with self._inference_mode(voice):
+                    if prefix_emb is not None:
+                        inference.cached_prefix_emb = prefix_emb
+                    chunk = next(chunks, None)
+                    prefix_emb = inference.cached_prefix_emb
+                if chunk is None:
+                    break
+                if filler_tail is not None:
+                    chunk, filler_tail = crossfade(filler_tail, chunk, len(filler_tail)), None
+                pcm = frame_pcm(chunk)
+                if total_bytes + len(pcm) > max_bytes:
+                    pcm = pcm[: max_bytes - total_bytes]
+                    capped = True
+                if pcm:
+                    if first_byte_ms is None:
+                        first_byte_ms = (time.perf_counter() - start) * 1000
+                    total_bytes += len(pcm)
+                    yield pcm
+                if capped:
+                    self.metrics.inc("capped_generations_total")
+                    break
+        finally:
+            # Also reached when our caller closes us mid-stream (the client
+            # disconnected), so the model stream never outlives the request
+            with self._model_lock:
+                chunks.close()
+
+        body_tokens = (total_bytes - body_start) / 2 / SAMPLE_RATE * AUDIO_TOKENS_PER_SECOND
+        self.metrics.observe("token_overrun_ratio", body_tokens / expected, buckets=OVERRUN_BUCKETS)
+
+        if filler_tail is not None:
+            # Nothing was decoded to fade into
+            tail = frame_pcm(filler_tail)
+            total_bytes += len(tail)
+            yield tail
+
+        # Trailing silence so back-to-back chunks don't run together
+        trimmed_ms = 0.0
+        if post is None:
+            silence = bytes(2 * int(0.5 * SAMPLE_RATE))
+        else:
+            # Held-back silence up to the margin, then pad to the end gap
+            tail, pad_samples = post.finish()
+            silence = to_pcm16(tail).tobytes() + bytes(2 * pad_samples)
+            trimmed_ms = post.removed_ms
+            self.metrics.observe("trimmed_audio_seconds", trimmed_ms / 1000)
+            self.metrics.inc("trimmed_audio_seconds_total", trimmed_ms / 1000)
+        total_bytes += len(silence)
+        yield silence
+
+        total_ms = (time.perf_counter() - start) * 1000
+        audio_ms = total_bytes / 2 / SAMPLE_RATE * 1000
+        self.metrics.observe("stream_first_byte_seconds", (first_byte_ms or total_ms) / 1000)
+        self.metrics.observe("stream_total_seconds", total_ms / 1000)
+        print(
+            f"[TTS] Streamed {audio_ms:.0f}ms of audio: "
+            f"first byte {first_byte_ms or total_ms:.0f}ms, total {total_ms:.0f}ms"
+            + (" (capped)" if capped else "")
+            + (f", trimmed {trimmed_ms:.0f}ms" if post is not None else "")
+        )
+
+    def metrics_text(self) -> str:
+        """Service metrics in Prometheus text format."""
+        import resource
+        import torch
+
+        self.metrics.set("process_max_rss_bytes", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+        if torch.cuda.is_available():
+            self.metrics.set("gpu_memory_allocated_bytes", torch.cuda.memory_allocated())
+            self.metrics.set("gpu_memory_max_allocated_bytes", torch.cuda.max_memory_allocated())
+            self.metrics.set("gpu_memory_reserved_bytes", torch.cuda.memory_reserved())
+
+        cache = self.audio_cache.stats()
+        self.metrics.set("audio_cache_entries", cache["entries"])
+        self.metrics.set("audio_cache_bytes", cache["bytes"])
+        self.metrics.set("voices_loaded", len(self.voice_cache))
+        voices = self.voice_cache.stats()
+        for tier, nbytes in self.voice_cache.nbytes().items():
+            self.metrics.set("voice_cache_bytes", nbytes, tier=tier)
+            self.metrics.set("voice_cache_hits", voices[f"{tier}_hits"], tier=tier)
+            self.metrics.set("voice_cache_hit_rate", voices[f"{tier}_hit_rate"], tier=tier)
+        self.metrics.set("voice_cache_misses", voices["misses"])
+        if self.prefix_cache is not None:
+            self.metrics.set("prefix_kv_seeded_generations", self.prefix_cache.seeded_steps)
+
+        return self.metrics.render()
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "voices": self.voice_cache.keys(),
+            "voice_cache": self.voice_cache.stats(),
+            "startup_ms": self.startup_ms,
+            "batching": self.batcher.stats(),
+            "audio_cache": self.audio_cache.stats(),
+            "single_flight": self.single_flight.stats(),
+        }
@@ -0,0 +1,110 @@
+"""
+Per-voice library of pre-rendered filler clips ("Um,", "So,", ...).
+
+The agent starts most answer chunks with a short filler. Rendering it as
+part of the chunk text costs GPT decode steps on every request, so each
+voice renders the fillers once, the clips are persisted next to its
+latents as fillers.npz, and a request that names a filler ID gets the clip
+spliced onto the synthesized body with a short crossfade.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from .audio import to_float32
+
+FILLERS_FILE = "fillers.npz"
+
+# Filler ID -> text; mirrors FILLERS in apps/agent/src/services/text-chunker.ts
+FILLERS = {
+    "um": "Um,",
+    "uh": "Uh,",
+    "hmm": "Hmm,",
+    "so": "So,",
+    "well": "Well,",
+    "like": "Like,",
+    "yeah": "Yeah,",
+    "i_mean": "I mean,",
+    "you_know": "You know,",
+    "basically": "Basically,",
+}
+
+
+def fillers_key(latents_key: str, settings: dict) -> str:
+    """Hash the voice's latents key, the filler texts and generation settings."""
+    h = hashlib.sha256()
+    h.update(latents_key.encode())
+    h.update(json.dumps(FILLERS, sort_keys=True).encode())
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def load_fillers(voice_dir: str, key: str) -> dict[str, np.ndarray] | None:
+    """Return persisted clips if they were rendered for this exact key."""
+    path = os.path.join(voice_dir, FILLERS_FILE)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path) as f:
+            if str(f["__key__"]) != key:
+                return None
+            clips = {name: f[name] for name in f.files if name != "__key__"}
+    except Exception as e:
+        # A torn or stale-format file is just a cache miss
+        print(f"  Ignoring unreadable {path}: {e}")
+        return None
+
+    return clips if set(clips) == set(FILLERS) else None
+
+
+def save_fillers(voice_dir: str, key: str, clips: dict[str, np.ndarray]):
+    """Atomically write clips so readers never see a partial file."""
+    path = os.path.join(voice_dir, FILLERS_FILE)
+    tmp_path = f"{path}.tmp"
+    # np.savez would append .npz to the temporary name, so hand it a file
+    with open(tmp_path, "wb") as f:
+        np.savez(f, __key__=np.array(key), **clips)
+    os.replace(tmp_path, path)
+
+
+def trim_clip(wav, sample_rate: int, threshold: float = 0.02, keep_ms: float = 30.0) -> np.ndarray:
+    """Drop the silence around a rendered filler, keeping a short tail.
+
+    The filler's trailing pause would otherwise sit between it and the body.
+    """
+    wav = to_float32(wav)
+    loud = np.flatnonzero(np.abs(wav) > threshold)
+    if not len(loud):
+        return wav
+    keep = int(keep_ms * sample_rate / 1000)
+    return wav[max(loud[0] - keep, 0): loud[-1] + keep + 1].copy()
+
+
+@lru_cache(maxsize=8)
+def _fade_in(samples: int) -> np.ndarray:
+    # Equal-power: fade_in**2 + fade_out**2 == 1 across the overlap
+    ramp = np.sin(np.linspace(0.0, np.pi / 2, samples, dtype=np.float32))
+    ramp.setflags(write=False)
+    return ramp
+
+
+def crossfade(head: np.ndarray, body, samples: int) -> np.ndarray:
+    """head then body, overlapping head's last and body's first `samples`."""
+    body = to_float32(body)
+    n = min(samples, len(head), len(body))
+    split = len(head) - n
+
+    out = np.empty(len(head) + len(body) - n, dtype=np.float32)
+    out[:split] = head[:split]
+    if n:
+        fade_in = _fade_in(n)
+        overlap = out[split:len(head)]
+        np.multiply(head[split:], fade_in[::-1], out=overlap)
+        overlap += body[:n] * fade_in
+    out[len(head):] = body[n:]
+    return out
@@ -0,0 +1,104 @@
+"""
+On-volume cache of XTTS speaker conditioning latents.
+
+The tensors live next to a voice's clip store as latents.safetensors,
+tagged with the clips' content hashes and the conditioning settings.
+safetensors files are memory-mapped on load, so a warm voice costs a file
+open instead of a full conditioning pass over the audio.
+"""
+
+import hashlib
+import json
+import os
+
+LATENTS_FILE = "latents.safetensors"
+
+
+def latents_key(clips: list[tuple[str, str]], settings: dict) -> str:
+    """Hash (name, sha256) of each clip (in order) with the conditioning settings.
+
+    The clip hashes come from the clip store index, so no audio is re-read.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    for name, sha256 in clips:
+        h.update(name.encode())
+        h.update(sha256.encode())
+    return h.hexdigest()
+
+
+def compute_latents(
+    model,
+    clips: list[tuple],
+    gpt_cond_len: int = 6,
+    gpt_cond_chunk_len: int = 6,
+    max_ref_length: int = 30,
+    sound_norm_refs: bool = False,
+    load_sr: int = 22050,
+):
+    """XTTS get_conditioning_latents over (int16 samples, sample_rate) clips.
+
+    The model's own method only takes file paths; this runs the same steps
+    (per-clip speaker embedding, GPT latents over the concatenated audio)
+    on samples read straight from the clip store.
+    """
+    import numpy as np
+    import torch
+    import torchaudio
+
+    with torch.inference_mode():
+        audios, speaker_embeddings = [], []
+        for samples, sample_rate in clips:
+            # int16 -> float as torchaudio.load would; the store view is only read
+            samples = samples[: sample_rate * max_ref_length]
+            audio = torch.from_numpy(np.multiply(samples, 1 / 32768, dtype=np.float32)).unsqueeze(0)
+            if sample_rate != load_sr:
+                audio = torchaudio.functional.resample(audio, sample_rate, load_sr)
+            audio = audio[:, : load_sr * max_ref_length].to(model.device)
+            if sound_norm_refs:
+                audio = (audio / torch.abs(audio).max()) * 0.75
+
+            speaker_embeddings.append(model.get_speaker_embedding(audio, load_sr))
+            audios.append(audio)
+
+        gpt_cond_latent = model.get_gpt_cond_latents(
+            torch.cat(audios, dim=-1), load_sr, length=gpt_cond_len, chunk_length=gpt_cond_chunk_len
+        )
+        speaker_embedding = torch.stack(speaker_embeddings).mean(dim=0)
+    return gpt_cond_latent, speaker_embedding
+
+
+def load_latents(voice_dir: str, key: str, device: str = "cpu") -> dict | None:
+    """Return cached latents if they were computed for this exact key."""
+    from safetensors import safe_open
+
+    path = os.path.join(voice_dir, LATENTS_FILE)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with safe_open(path, framework="pt", device=device) as f:
+            if (f.metadata() or {}).get("key") != key:
+                return None
+            return {
+                "gpt_cond_latent": f.get_tensor("gpt_cond_latent"),
+                "speaker_embedding": f.get_tensor("speaker_embedding"),
+            }
+    except Exception as e:
+        # A torn or stale-format file is just a cache miss
+        print(f"  Ignoring unreadable {path}: {e}")
+        return None
+
+
+def save_latents(voice_dir: str, key: str, latents: dict):
+    """Atomically write latents so readers never see a partial file."""
+    from safetensors.torch import save_file
+
+    path = os.path.join(voice_dir, LATENTS_FILE)
+    tmp_path = f"{path}.tmp"
+    tensors = {
+        name: latents[name].detach().cpu().contiguous()
+        for name in ("gpt_cond_latent", "speaker_embedding")
+    }
+    save_file(tensors, tmp_path, metadata={"key": key})
+    os.replace(tmp_path, path)
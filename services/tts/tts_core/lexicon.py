@@ -0,0 +1,63 @@
+"""
+Pronunciation lexicon: written forms XTTS mangles, and what to say instead.
+
+Each entry is (forms, spoken, match_case). Forms are matched as whole words;
+with match_case=False any capitalisation of a form matches, otherwise only
+the forms exactly as written (so "UI" is spelled out but "ui" is left alone).
+A trailing "s" on a form is kept as a plural ("WebSockets" -> "web sockets",
+"APIs" -> "A P I's"), so plurals need no entries of their own.
+"""
+
+LEXICON: list[tuple[tuple[str, ...], str, bool]] = [
+    # Frameworks with .js - match variations
+    (("Next.js", "Nextjs"), "Next JS", False),
+    (("Node.js", "Nodejs"), "Node JS", False),
+    (("React.js", "Reactjs"), "React", False),
+    (("Vue.js", "Vuejs"), "View JS", False),
+    (("Express.js", "Expressjs"), "Express", False),
+    (("Three.js", "Threejs"), "Three JS", False),
+    # Acronyms
+    (("API",), "A P I", False),
+    (("UI",), "U I", True),
+    (("UX",), "U X", True),
+    (("CSS",), "C S S", True),
+    (("HTML",), "H T M L", True),
+    (("AWS",), "A W S", True),
+    (("GCP",), "G C P", True),
+    (("CLI",), "C L I", True),
+    (("SDK",), "S D K", True),
+    (("IDE",), "I D E", True),
+    (("NPM",), "N P M", True),
+    (("URL",), "U R L", True),
+    (("JSON",), "jay-son", False),
+    (("YAML",), "yammel", False),
+    (("OAuth",), "oh-auth", False),
+    (("JWT",), "J W T", True),
+    (("REST",), "rest", True),
+    (("GraphQL",), "graph Q L", False),
+    (("LLM",), "L L M", True),
+    (("GPT",), "G P T", True),
+    (("RAG",), "rag", True),
+    (("SQL",), "sequel", False),
+    (("NoSQL",), "no sequel", False),
+    # Compound words
+    (("TypeScript",), "Type Script", False),
+    (("JavaScript",), "Java Script", False),
+    (("GitHub",), "Git Hub", False),
+    (("GitLab",), "Git Lab", False),
+    (("VS Code", "VSCode"), "V S Code", False),
+    (("PostgreSQL",), "postgres", False),
+    (("MongoDB",), "mongo D B", False),
+    (("Firebase",), "fire base", False),
+    (("Tailwind",), "tailwind", False),
+    (("Kubernetes", "k8s"), "kubernetes", False),
+    (("DevOps",), "dev ops", False),
+    (("WebSocket",), "web socket", False),
+    (("localhost",), "local host", False),
+    (("OpenAI",), "open A I", False),
+    (("Supabase",), "soopa base", False),
+    (("Vercel",), "ver-sell", False),
+    (("Hono",), "hoh-no", False),
+    # Hyphenated words
+    (("go-to",), "go to", False),
+]
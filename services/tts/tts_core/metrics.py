@@ -0,0 +1,136 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Histograms use fixed cumulative buckets, matching Prometheus semantics, so
+render() output can be scraped as-is. StageTimer times the stages of one
+request, feeds the shared histograms and renders a Server-Timing header.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans cache hits (~ms) to long hallucinating generations
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RTF_BUCKETS = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024)
+BATCH_BUCKETS = (1, 2, 4, 8, 16)
+# Generated tokens / expected tokens; above the runaway margin is trimmed
+OVERRUN_BUCKETS = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 3.0, 5.0)
+
+
+def _label_str(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class Metrics:
+    """Registry of counters, gauges and histograms keyed by (name, labels)."""
+
+    def __init__(self, prefix: str = "tts"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+        self._histograms: dict[tuple, Histogram] = {}
+        self._help: dict[str, str] = {}
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    @staticmethod
+    def _key(name: str, labels: dict | None) -> tuple:
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+                seen = set()
+                for (name, labels), value in sorted(series.items()):
+                    full = f"{self.prefix}_{name}"
+                    if name not in seen:
+                        seen.add(name)
+                        if name in self._help:
+                            lines.append(f"# HELP {full} {self._help[name]}")
+                        lines.append(f"# TYPE {full} {kind}")
+                    lines.append(f"{full}{_label_str(dict(labels))} {value:g}")
+
+            seen = set()
+            for (name, labels), hist in sorted(self._histograms.items(), key=lambda kv: kv[0]):
+                full = f"{self.prefix}_{name}"
+                if name not in seen:
+                    seen.add(name)
+                    if name in self._help:
+                        lines.append(f"# HELP {full} {self._help[name]}")
+                    lines.append(f"# TYPE {full} histogram")
+                labels = dict(labels)
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{_label_str({**labels, 'le': f'{bound:g}'})} {cumulative}")
+                lines.append(f"{full}_bucket{_label_str({**labels, 'le': '+Inf'})} {hist.total}")
+                lines.append(f"{full}_sum{_label_str(labels)} {hist.sum:g}")
+                lines.append(f"{full}_count{_label_str(labels)} {hist.total}")
+
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Per-request stage timings, mirrored into the stage_seconds histogram."""
+
+    def __init__(self, metrics: Metrics | None = None):
+        self.metrics = metrics
+        self.stages: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self.metrics is not None:
+            self.metrics.observe("stage_seconds", seconds, stage=name)
+
+    def as_ms(self) -> dict[str, float]:
+        return {name: round(s * 1000, 2) for name, s in self.stages.items()}
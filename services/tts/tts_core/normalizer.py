@@ -0,0 +1,103 @@
+"""
+Single-pass text normalization before synthesis.
+
+Number abbreviations ("1.5k"), the pronunciation lexicon and character
+cleanup (markdown, dashes, quotes, emoji and other non-ASCII) are compiled
+into one regex and applied with a single re.sub, followed by a whitespace
+collapse. Lexicon forms go in as a character trie, so matching cost tracks
+the length of the text rather than the number of entries.
+"""
+
+import json
+import re
+
+from .lexicon import LEXICON
+
+_SCALES = {"k": "thousand", "m": "million", "b": "billion", "t": "trillion"}
+
+_WORD = r"A-Za-z0-9"
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """Regex matching any of `words`, factored by shared prefixes."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        group = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Optional continuation: greedy, so the longest form wins
+            return f"(?:{group})?"
+        return group
+
+    return build(trie)
+
+
+def load_lexicon(path: str) -> list[tuple[tuple[str, ...], str, bool]]:
+    """Read extra entries from JSON: [{"forms": [...], "say": "...", "match_case": false}]."""
+    with open(path) as f:
+        entries = json.load(f)
+    return [
+        (tuple(e["forms"]), e["say"], bool(e.get("match_case", False)))
+        for e in entries
+    ]
+
+
+class Normalizer:
+    def __init__(self, lexicon: list[tuple[tuple[str, ...], str, bool]] = LEXICON):
+        # lowercased form -> (spoken, exact forms when case matters, else None)
+        self._terms: dict[str, tuple[str, set[str] | None]] = {}
+        for forms, spoken, match_case in lexicon:
+            for form in forms:
+                key = form.lower()
+                exact = None
+                if match_case:
+                    # Keep every exact spelling that shares this lowercase form
+                    exact = (self._terms.get(key, (None, None))[1] or set()) | {form}
+                self._terms[key] = (spoken, exact)
+
+        alternatives = [
+            rf"(?P<num>\d+(?:\.\d+)?)\s*(?P<scale>[kmbt])(?![{_WORD}])",
+            r"(?P<dots>\.{2,}|…)",
+            r"(?P<dash>\s*[—–]\s*)",
+            r"(?P<quote>[\"“”‘’])",
+            r"(?P<drop>[*_~`#]+|[^\x00-\x7F]+)",
+        ]
+        if self._terms:
+            trie = _trie_pattern(list(self._terms))
+            alternatives.insert(1, rf"(?<![{_WORD}])(?P<term>(?P<form>{trie})s?)(?![{_WORD}])")
+        self._pattern = re.compile("|".join(alternatives), re.IGNORECASE)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _replace(self, match: re.Match) -> str:
+        kind = match.lastgroup
+        if kind == "scale":
+            return f"{match.group('num')} {_SCALES[match.group('scale').lower()]}"
+        if kind == "term":
+            text = match.group("form")
+            spoken, exact = self._terms[text.lower()]
+            if exact is not None and text not in exact:
+                return match.group("term")
+            if len(match.group("term")) > len(text):
+                # Plural: "web socket" -> "web sockets", but "A P I" -> "A P I's"
+                return spoken + ("'s" if len(spoken.rsplit(None, 1)[-1]) == 1 else "s")
+            return spoken
+        if kind == "dots":
+            return "."
+        if kind == "dash":
+            return ", "
+        if kind == "quote":
+            return "'"
+        return ""
+
+    def normalize(self, text: str) -> str:
+        return " ".join(self._pattern.sub(self._replace, text).split())
@@ -0,0 +1,128 @@
+"""
+Optional output post-processing: silence trim, adaptive end padding and
+loudness normalization.
+
+XTTS often starts a chunk with dead air and ends it with a pause of its
+own, and the service then appends a fixed 500 ms of silence. Postprocessor
+drops leading and trailing silence (keeping a short margin so word onsets
+and releases survive), pads the end only up to a target gap, and applies a
+gain that brings speech to a target level.
+
+The same object handles a whole output (one process() call) and a stream
+(one call per frame): silence at the end of a frame is held back until
+the next frame shows whether it was a pause or the tail. The gain follows
+the running level of the speech seen so far and is ramped across each
+frame, so it never steps.
+
+Silence is found per 10 ms block from mean-square energy, computed for all
+blocks at once with np.add.reduceat. Loudness is the RMS of the non-silent
+blocks, a simple stand-in for LUFS that is adequate for a single voice.
+"""
+
+import numpy as np
+
+from .audio import to_float32
+
+PEAK_LIMIT = 0.98
+
+_EMPTY = np.zeros(0, dtype=np.float32)
+
+
+class Postprocessor:
+    def __init__(
+        self,
+        sample_rate: int,
+        threshold_db: float = -50.0,
+        margin_ms: float = 40.0,
+        end_pad_ms: float = 250.0,
+        target_dbfs: float = -20.0,
+        max_gain_db: float = 12.0,
+        block_ms: float = 10.0,
+    ):
+        self.sample_rate = sample_rate
+        self._threshold = 10 ** (threshold_db / 10)  # mean-square power
+        self._margin = int(margin_ms * sample_rate / 1000)
+        self._end_pad = int(end_pad_ms * sample_rate / 1000)
+        self._target_rms = 10 ** (target_dbfs / 20)
+        self._max_gain = 10 ** (max_gain_db / 20)
+        self._block = max(int(block_ms * sample_rate / 1000), 1)
+
+        self._started = False
+        self._held = _EMPTY  # silence not yet known to be a pause or the tail
+        self._gain = None
+        self._speech_energy = 0.0
+        self._speech_samples = 0
+
+        self.samples_in = 0
+        self.samples_out = 0
+
+    @property
+    def removed_ms(self) -> float:
+        """Audio dropped so far (not counting padding added)."""
+        return (self.samples_in - self.samples_out - len(self._held)) * 1000 / self.sample_rate
+
+    def _target_gain(self) -> float:
+        if not self._speech_samples:
+            return 1.0
+        rms = np.sqrt(self._speech_energy / self._speech_samples)
+        return float(np.clip(self._target_rms / max(rms, 1e-9), 1 / self._max_gain, self._max_gain))
+
+    def _apply_gain(self, out: np.ndarray) -> np.ndarray:
+        gain = self._target_gain()
+        previous = gain if self._gain is None else self._gain
+        self._gain = gain
+        if not len(out):
+            return out
+
+        if previous == gain:
+            out = out * np.float32(gain)
+        else:
+            out = out * np.linspace(previous, gain, len(out), dtype=np.float32)
+        peak = np.abs(out).max()
+        if peak > PEAK_LIMIT:
+            out *= PEAK_LIMIT / peak
+        return out
+
+    def process(self, wav) -> np.ndarray:
+        """Post-process the next piece of audio; returns what can be sent now."""
+        x = to_float32(wav)
+        self.samples_in += len(x)
+        if not len(x):
+            return _EMPTY
+
+        starts = np.arange(0, len(x), self._block)
+        lengths = np.diff(np.append(starts, len(x)))
+        energy = np.add.reduceat(x * x, starts)
+        loud = np.flatnonzero(energy > self._threshold * lengths)
+
+        if not len(loud):
+            held = np.concatenate([self._held, x])
+            # Before speech only the margin right ahead of it is ever kept
+            self._held = held if self._started else held[-self._margin:]
+            return _EMPTY
+
+        self._speech_energy += float(energy[loud].sum())
+        self._speech_samples += int(lengths[loud].sum())
+
+        first = starts[loud[0]]
+        end = starts[loud[-1]] + lengths[loud[-1]]
+        lead = np.concatenate([self._held, x[:first]])
+        if not self._started:
+            lead = lead[-self._margin:] if self._margin else _EMPTY
+            self._started = True
+
+        out = self._apply_gain(np.concatenate([lead, x[first:end]]))
+        self._held = x[end:].copy()
+        self.samples_out += len(out)
+        return out
+
+    def finish(self) -> tuple[np.ndarray, int]:
+        """(remaining audio, zero samples to append) at the end of the output.
+
+        Trailing silence is cut to the margin, then padded up to the end gap.
+        """
+        tail = self._held[: self._margin] if self._started else _EMPTY
+        self._held = _EMPTY
+        tail = self._apply_gain(tail)
+        self.samples_out += len(tail)
+        return tail, max(self._end_pad - len(tail), 0)
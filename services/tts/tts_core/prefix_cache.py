@@ -0,0 +1,81 @@
+"""
+Per-voice cache of the GPT attention state for the conditioning prefix.
+
+XTTS feeds every generation [voice conditioning latents | text | start
+token] and, on the first decode step, runs the transformer over all of it.
+The conditioning part (32 positions) is identical for every request with
+the same voice, and the inference GPT has no positional embedding, so its
+keys and values depend only on the latents. We compute them once per voice
+and start each generation from them, so the first step only processes the
+text.
+
+Seeding is per-thread: wrap model calls in `seeded(prefix_kv)` and any GPT
+generation started inside (inference, inference_stream or gpt.generate)
+skips the prefix. The first step briefly swaps the model's shared
+cached_prefix_emb, so callers must serialize model calls (the engine holds
+its model lock around every one).
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class PrefixKVCache:
+    def __init__(self, gpt):
+        self.gpt = gpt
+        self._local = threading.local()
+        self.seeded_steps = 0
+
+        inference = gpt.gpt_inference
+        original = inference.forward
+        local = self._local
+
+        def forward(input_ids=None, past_key_values=None, attention_mask=None,
+                    position_ids=None, **kwargs):
+            prefix_kv = getattr(local, "prefix_kv", None)
+            if prefix_kv is None or past_key_values is not None or input_ids.shape[1] == 1:
+                return original(input_ids=input_ids, past_key_values=past_key_values,
+                                attention_mask=attention_mask, position_ids=position_ids, **kwargs)
+
+            # First step of a generation: hand the transformer the cached
+            # state for the conditioning positions and only embed the rest
+            cond_len = prefix_kv[0][0].shape[2]
+            batch = input_ids.shape[0]
+            past = tuple((k.expand(batch, -1, -1, -1), v.expand(batch, -1, -1, -1)) for k, v in prefix_kv)
+            full_prefix = inference.cached_prefix_emb
+            inference.cached_prefix_emb = full_prefix[:, cond_len:]
+            try:
+                out = original(
+                    input_ids=input_ids[:, cond_len:],
+                    past_key_values=past,
+                    attention_mask=attention_mask,
+                    position_ids=None if position_ids is None else position_ids[:, cond_len:],
+                    **kwargs,
+                )
+            finally:
+                # Later steps derive positions from the full prefix length
+                inference.cached_prefix_emb = full_prefix
+            self.seeded_steps += 1
+            return out
+
+        inference.forward = forward
+
+    def compute(self, gpt_cond_latent) -> tuple:
+        """Keys/values of every layer for one voice's conditioning latents."""
+        import torch
+
+        with torch.no_grad():
+            out = self.gpt.gpt_inference.transformer(
+                inputs_embeds=gpt_cond_latent, use_cache=True, return_dict=True
+            )
+        return tuple((k.contiguous(), v.contiguous()) for k, v in out.past_key_values)
+
+    @contextmanager
+    def seeded(self, prefix_kv: tuple | None):
+        """Start generations in this thread from `prefix_kv` (None disables)."""
+        previous = getattr(self._local, "prefix_kv", None)
+        self._local.prefix_kv = prefix_kv
+        try:
+            yield
+        finally:
+            self._local.prefix_kv = previous
@@ -0,0 +1,278 @@
+"""
+HTTP API for a TTSEngine, served from the same process as the model.
+
+Modal mounts this app on TTSService via @modal.asgi_app, so a request
+reaches the GPU container in one hop. It also runs on its own for local
+load testing, with no Modal dependency:
+
+    cd services/tts
+    TTS_VOICES_DIR=./voices python -m tts_core.server --port 8000
+
+Routes:
+    POST /tts             {"text", "voice_id", "format", "bitrate", "normalize", "filler"}
+    POST /tts/stream      {"text", "voice_id", "normalize", "filler"} -> chunked audio/pcm
+    POST /tts/many        {"texts", "voice_id", "format", "bitrate", "normalize", "fillers"}
+                          -> NDJSON, one line per chunk in index order
+    POST /voices/prefetch {"voice_id"}
+    GET  /metrics         Prometheus text
+    GET  /health
+
+The API is unauthenticated, so nothing here writes voice data; voice
+uploads go through the TTSService Modal methods (scripts/voice_upload.py).
+"""
+
+import argparse
+import base64
+import json
+import os
+import time
+
+from .config import LEXICON_PATH, SAMPLE_RATE
+
+PCM_HEADERS = {
+    "X-Audio-Format": "pcm_s16le",
+    "X-Sample-Rate": str(SAMPLE_RATE),
+    "X-Channels": "1",
+}
+
+
+def _text_normalizer():
+    """Lexicon and cleanup rules compiled once per process."""
+    from .lexicon import LEXICON
+    from .normalizer import Normalizer, load_lexicon
+
+    lexicon = list(LEXICON)
+    if LEXICON_PATH and os.path.exists(LEXICON_PATH):
+        lexicon += load_lexicon(LEXICON_PATH)
+    return Normalizer(lexicon)
+
+
+def _negotiate_format(accept: str) -> str | None:
+    """Pick a binary format from the Accept header, or None for JSON/base64."""
+    accept = accept.lower()
+    if "audio/wav" in accept or "audio/x-wav" in accept:
+        return "wav"
+    if "audio/ogg" in accept or "audio/opus" in accept:
+        return "opus"
+    if "audio/mpeg" in accept:
+        return "mp3"
+    if "application/octet-stream" in accept or "audio/pcm" in accept or "audio/l16" in accept:
+        return "pcm16"
+    return None
+
+
+def create_app(engine):
+    """FastAPI app whose async handlers call into `engine`.
+
+    Engine calls block (model inference, encoding), so they run on the
+    threadpool; the event loop keeps accepting requests and concurrent
+    cache misses meet in the engine's micro-batcher.
+    """
+    import anyio
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+
+    from .encoding import MEDIA_TYPES
+    from .fillers import FILLERS
+
+    web = FastAPI(title="Digital Mind TTS")
+    normalizer = _text_normalizer()
+    metrics = engine.metrics
+
+    def normalized(body: dict) -> tuple[str, float]:
+        start = time.perf_counter()
+        text = body.get("text", "")
+        if body.get("normalize", True):
+            text = normalizer.normalize(text)
+        return text, time.perf_counter() - start
+
+    @web.post("/tts")
+    async def tts(request: Request):
+        """Synthesize one chunk.
+
+        The body may name a format (wav, pcm16, opus, mp3) and bitrate.
+        Clients that accept audio/* or application/octet-stream get raw bytes
+        back; everyone else gets JSON with base64 audio. Text is normalized
+        for pronunciation unless the body sets "normalize": false. "filler"
+        names a pre-rendered clip (tts_core.fillers) to play before the text.
+        """
+        received = time.perf_counter()
+        body = await request.json()
+        voice_id = body.get("voice_id", "austin")
+        text, normalize_s = normalized(body)
+
+        if not text:
+            return JSONResponse({"error": "No text provided"}, status_code=400)
+
+        accept = request.headers.get("accept", "")
+        negotiated = _negotiate_format(accept)
+        format = body.get("format") or negotiated or "wav"
+        binary = negotiated is not None or "audio/*" in accept
+
+        if format not in MEDIA_TYPES:
+            return JSONResponse({"error": f"Unsupported format '{format}'"}, status_code=400)
+
+        try:
+            result = await run_in_threadpool(
+                engine.synthesize_timed, text, voice_id, format, body.get("bitrate"), body.get("filler")
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        audio_bytes = result["audio"]
+        timings = dict(result["timings"])
+
+        http_s = time.perf_counter() - received
+        metrics.observe("stage_seconds", normalize_s, stage="normalize")
+        metrics.observe("stage_seconds", http_s, stage="http")
+        timings["normalize"] = round(normalize_s * 1000, 2)
+        timings["http"] = round(http_s * 1000, 2)
+
+        server_timing = ", ".join(f"{name};dur={ms}" for name, ms in timings.items())
+        headers = {"Server-Timing": server_timing}
+        if result.get("capped"):
+            # Output ran past its runaway limit and the tail was trimmed
+            headers["X-TTS-Capped"] = "1"
+        # Silence removed by post-processing (TTS_POSTPROCESS)
+        headers["X-TTS-Trimmed-Ms"] = str(round(result.get("trimmed_ms", 0.0), 1))
+
+        if binary:
+            if format == "pcm16":
+                headers.update(PCM_HEADERS)
+            return Response(audio_bytes, media_type=MEDIA_TYPES[format], headers=headers)
+
+        return JSONResponse(
+            {
+                "audio": base64.b64encode(audio_bytes).decode(),
+                "format": format,
+                "timings": timings,
+                "capped": result.get("capped", False),
+                "trimmed_ms": result.get("trimmed_ms", 0.0),
+            },
+            headers=headers,
+        )
+
+    @web.post("/tts/stream")
+    async def tts_stream(request: Request):
+        """Stream raw PCM with chunked transfer encoding."""
+        body = await request.json()
+        voice_id = body.get("voice_id", "austin")
+        text, _ = normalized(body)
+
+        if not text:
+            return JSONResponse({"error": "No text provided"}, status_code=400)
+
+        filler = body.get("filler")
+        if filler is not None and filler not in FILLERS:
+            return JSONResponse({"error": f"Unknown filler '{filler}'"}, status_code=400)
+
+        # The generator is lazy, so pull the first frame before answering:
+        # a bad voice then gets a 400 instead of failing after the 200
+        frames = engine.synthesize_stream(text, voice_id, filler)
+        try:
+            first = await run_in_threadpool(next, frames, None)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        async def pcm():
+            # Each frame is pulled on the threadpool. If the client goes
+            # away, Starlette cancels us between frames (run_in_threadpool
+            # waits for the frame in flight), and closing the engine's
+            # generator stops its model stream
+            try:
+                frame = first
+                while frame is not None:
+                    yield frame
+                    frame = await run_in_threadpool(next, frames, None)
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await run_in_threadpool(frames.close)
+
+        return StreamingResponse(pcm(), media_type="audio/pcm", headers=PCM_HEADERS)
+
+    @web.post("/tts/many")
+    async def tts_many(request: Request):
+        """Synthesize an ordered list of chunks for one voice in one request.
+
+        Streams NDJSON: {"index", "audio" (base64), "format", "timings",
+        "capped", "trimmed_ms"} per chunk, or {"index", "error"}, in index order as each
+        is ready.
+        """
+        body = await request.json()
+        voice_id = body.get("voice_id", "austin")
+        format = body.get("format") or "wav"
+        texts = body.get("texts") or []
+
+        if not texts:
+            return JSONResponse({"error": "No texts provided"}, status_code=400)
+        if not isinstance(texts, list) or not all(isinstance(t, str) and t.strip() for t in texts):
+            return JSONResponse({"error": "texts must be a list of non-empty strings"}, status_code=400)
+        if format not in MEDIA_TYPES:
+            return JSONResponse({"error": f"Unsupported format '{format}'"}, status_code=400)
+
+        normalize_start = time.perf_counter()
+        if body.get("normalize", True):
+            texts = [normalizer.normalize(t) for t in texts]
+        metrics.observe("stage_seconds", time.perf_counter() - normalize_start, stage="normalize")
+
+        try:
+            results = engine.synthesize_many(
+                texts, voice_id, format, body.get("bitrate"), body.get("fillers")
+            )
+            first = await run_in_threadpool(next, results, None)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        def lines():
+            result = first
+            while result is not None:
+                if "audio" in result:
+                    result = {
+                        **result,
+                        "audio": base64.b64encode(result["audio"]).decode(),
+                        "format": format,
+                    }
+                yield json.dumps(result) + "\n"
+                result = next(results, None)
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @web.post("/voices/prefetch")
+    async def prefetch(request: Request):
+        """Load a voice onto the GPU ahead of its first synthesis."""
+        body = await request.json()
+        try:
+            return await run_in_threadpool(engine.prefetch_voice, body.get("voice_id", "austin"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=404)
+
+    @web.get("/metrics")
+    async def metrics_text():
+        """Prometheus scrape target."""
+        text = await run_in_threadpool(engine.metrics_text)
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+    @web.get("/health")
+    async def health():
+        return engine.health()
+
+    return web
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the TTS service locally (no Modal).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    from .engine import TTSEngine
+
+    engine = TTSEngine()
+    engine.load()
+    uvicorn.run(create_app(engine), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
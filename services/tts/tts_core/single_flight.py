@@ -0,0 +1,93 @@
+"""
+Single-flight de-duplication of identical in-progress work.
+
+Identical synthesis requests arriving together (read-aloud clicked twice,
+several tabs asking for the same answer) share one call: the first caller
+for a key runs it, later callers block until it finishes and get the same
+result.
+
+If the leader raises an ordinary exception, every waiter sees that
+exception. If the leader is cancelled (a BaseException such as
+KeyboardInterrupt, CancelledError or the platform's input cancellation),
+the failure says nothing about the work itself. In that case the waiters
+retry, and one of them becomes the new leader.
+"""
+
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Exception | None = None
+        self.cancelled = False
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.leader_failures = 0
+        self.leader_cancellations = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Run fn() once per key at a time; returns (result, shared)."""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    self.leaders += 1
+                    leader = True
+                else:
+                    self.coalesced += 1
+                    leader = False
+
+            if leader:
+                return self._lead(key, call, fn), False
+
+            call.done.wait()
+            if call.cancelled:
+                # Leader went away before finishing; try again ourselves
+                with self._lock:
+                    self.coalesced -= 1
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.leader_failures += 1
+            raise
+        except BaseException:
+            call.cancelled = True
+            with self._lock:
+                self.leader_cancellations += 1
+            raise
+        finally:
+            # Unregister before waking waiters, so a retrying waiter can
+            # never find this finished call again
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "leader_failures": self.leader_failures,
+                "leader_cancellations": self.leader_cancellations,
+            }
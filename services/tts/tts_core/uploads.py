@@ -0,0 +1,327 @@
+"""
+Resumable, deduplicating voice uploads and background conditioning jobs.
+
+A client uploads a voice in three steps:
+
+    start(voice_id, clips)    clips = [{"name", "sha256", "size"}], the full
+                              clip set for the voice. Returns the upload ID
+                              and, for each clip the volume doesn't have yet,
+                              how many bytes of it have already arrived
+    put_chunk(upload_id, sha256, offset, data)
+    assemble(upload_id)       pack the clips into the voice's clip store (run
+                              by the engine as the first step of a
+                              conditioning job)
+
+The upload ID is derived from the voice and clip list, so calling start
+again after an interruption resumes the same upload. Clips whose hash is
+already on the volume, in this voice or any other, are copied server-side
+instead of being sent. Chunks are stored as immutable part files, and job
+state is written next to them, so consecutive calls don't need to reach
+the same container. The volume is reloaded only when a file this container
+needs is missing or may be stale, and chunks are committed together when
+the upload is finished rather than one at a time.
+
+A clip's sha256 is the hash of its canonical WAV (mono 16-bit with a
+44-byte header, as ClipStore.wav_bytes writes it), the same identity the
+clip store indexes, so dedupe and resume agree with what is stored. Clips
+must be sent in that form.
+Volume layout (dot-directories are skipped when listing voices):
+
+    {root}/{voice_id}/clips.db, clips-N.pcm
+    {root}/.uploads/{upload_id}/upload.json
+    {root}/.uploads/{upload_id}/{sha256}.{offset}.part
+    {root}/.jobs/{job_id}.json
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Callable
+
+from .clip_store import INDEX_FILE, ClipStore, read_wav, wav_sha256
+from .voice_ids import check_voice_id
+
+UPLOADS_DIR = ".uploads"
+JOBS_DIR = ".jobs"
+FINAL_JOB_STATUSES = ("ready", "failed")
+
+
+def _write_json_atomic(path: str, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _noop():
+    pass
+
+
+def _is_hex(value: str) -> bool:
+    return bool(value) and all(c in "0123456789abcdef" for c in value)
+
+
+class UploadStore:
+    def __init__(
+        self,
+        root: str,
+        commit: Callable[[], None] = _noop,
+        reload: Callable[[], None] = _noop,
+        max_chunk_bytes: int = 8 << 20,
+    ):
+        self.root = root
+        self._commit = commit
+        self._reload = reload
+        self.max_chunk_bytes = max_chunk_bytes
+        # Jobs saved by this process, whose file here is always current
+        self._local_jobs: set[str] = set()
+
+    # Clip index
+
+    def known_hashes(self) -> dict[str, tuple[str, str]]:
+        """sha256 -> (voice dir, clip name) of a stored clip with that content."""
+        known = {}
+        if not os.path.isdir(self.root):
+            return known
+        for voice_id in os.listdir(self.root):
+            voice_dir = os.path.join(self.root, voice_id)
+            if voice_id.startswith(".") or not os.path.exists(os.path.join(voice_dir, INDEX_FILE)):
+                continue
+            with ClipStore(voice_dir) as store:
+                for sha256, name in store.hashes().items():
+                    known.setdefault(sha256, (voice_dir, name))
+        return known
+
+    # Uploads
+
+    def _upload_dir(self, upload_id: str) -> str:
+        return os.path.join(self.root, UPLOADS_DIR, upload_id)
+
+    def _load_upload(self, upload_id: str) -> dict:
+        if not _is_hex(upload_id):
+            raise ValueError(f"Upload '{upload_id}' not found")
+        path = os.path.join(self._upload_dir(upload_id), "upload.json")
+        upload = _read_json(path)
+        if upload is None:
+            # Started (or last written) from another container
+            self._reload()
+            upload = _read_json(path)
+        if upload is None:
+            raise ValueError(f"Upload '{upload_id}' not found")
+        return upload
+
+    def _parts(self, upload_id: str, sha256: str) -> list[tuple[int, str]]:
+        """(offset, path) of the stored chunks for a clip, by offset."""
+        upload_dir = self._upload_dir(upload_id)
+        if not os.path.isdir(upload_dir):
+            return []
+        parts = []
+        for name in os.listdir(upload_dir):
+            if name.startswith(f"{sha256}.") and name.endswith(".part"):
+                parts.append((int(name.split(".")[1]), os.path.join(upload_dir, name)))
+        return sorted(parts)
+
+    def _received(self, upload_id: str, sha256: str) -> int:
+        """Bytes of a clip that have arrived contiguously from offset 0."""
+        received = 0
+        for offset, path in self._parts(upload_id, sha256):
+            if offset > received:
+                break
+            received = max(received, offset + os.path.getsize(path))
+        return received
+
+    def start(self, voice_id: str, clips: list[dict]) -> dict:
+        """Begin (or resume) uploading the full clip set for a voice."""
+        check_voice_id(voice_id)
+        names = set()
+        for clip in clips:
+            name = clip["name"]
+            if "/" in name or not name.endswith(".wav") or name in names:
+                raise ValueError(f"Invalid or duplicate clip name '{name}'")
+            if len(clip["sha256"]) != 64 or not _is_hex(clip["sha256"]):
+                raise ValueError(f"Clip '{name}' needs a hex sha256")
+            names.add(name)
+
+        h = hashlib.sha256(voice_id.encode())
+        h.update(json.dumps([[c["name"], c["sha256"], c["size"]] for c in clips]).encode())
+        upload_id = h.hexdigest()[:24]
+
+        upload_dir = self._upload_dir(upload_id)
+        upload_path = os.path.join(upload_dir, "upload.json")
+        if not os.path.exists(upload_path):
+            # New here, or resumed after starting on another container
+            self._reload()
+        known = self.known_hashes()
+        if not os.path.exists(upload_path):
+            os.makedirs(upload_dir, exist_ok=True)
+            _write_json_atomic(upload_path, {"voice_id": voice_id, "clips": clips})
+            # Chunks may be sent to other containers, which need to see it
+            self._commit()
+
+        missing = {
+            c["sha256"]: self._received(upload_id, c["sha256"])
+            for c in clips
+            if c["sha256"] not in known
+        }
+        return {
+            "upload_id": upload_id,
+            "missing": missing,
+            "deduplicated": sum(1 for c in clips if c["sha256"] in known),
+            "max_chunk_bytes": self.max_chunk_bytes,
+        }
+
+    def put_chunk(self, upload_id: str, sha256: str, offset: int, data: bytes) -> dict:
+        """Store one chunk of a clip; returns the clip's contiguous bytes received."""
+        upload = self._load_upload(upload_id)
+        clip = next((c for c in upload["clips"] if c["sha256"] == sha256), None)
+        if clip is None:
+            raise ValueError(f"Clip {sha256} is not part of upload '{upload_id}'")
+        if len(data) > self.max_chunk_bytes:
+            raise ValueError(f"Chunk exceeds {self.max_chunk_bytes} bytes")
+        if offset < 0 or offset + len(data) > clip["size"]:
+            raise ValueError(f"Chunk at {offset} runs past the clip's {clip['size']} bytes")
+
+        path = os.path.join(self._upload_dir(upload_id), f"{sha256}.{offset:012d}.part")
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+
+        return {"sha256": sha256, "received": self._received(upload_id, sha256)}
+
+    def check_complete(self, upload_id: str) -> str:
+        """Raise unless every clip is either known or fully received; returns the voice ID.
+
+        The caller commits (via save_job) once the upload is accepted.
+        """
+        upload = self._load_upload(upload_id)
+        incomplete = self._incomplete(upload_id, upload)
+        if incomplete:
+            # Some chunks may have been stored by another container
+            self._reload()
+            incomplete = self._incomplete(upload_id, upload)
+        if incomplete:
+            clip, received = incomplete
+            raise ValueError(
+                f"Clip {clip['name']} is incomplete ({received}/{clip['size']} bytes)"
+            )
+        return upload["voice_id"]
+
+    def _incomplete(self, upload_id: str, upload: dict) -> tuple[dict, int] | None:
+        """The first clip that is neither known nor fully received, with its bytes received."""
+        known = self.known_hashes()
+        for clip in upload["clips"]:
+            if clip["sha256"] in known:
+                continue
+            received = self._received(upload_id, clip["sha256"])
+            if received < clip["size"]:
+                return clip, received
+        return None
+
+    def assemble(self, upload_id: str) -> str:
+        """Make the upload the voice's clip set; returns the voice dir.
+
+        Clips are stitched from their parts (and their hash verified) or
+        copied from a clip already on the volume, and packed into the
+        voice's clip store. Stored clips that aren't part of the upload are
+        removed, as are loose clip files from the old per-file layout.
+        """
+        upload = self._load_upload(upload_id)
+        voice_dir = os.path.join(self.root, check_voice_id(upload["voice_id"]))
+        known = self.known_hashes()
+
+        with ClipStore(voice_dir) as store:
+            current = {e["path"]: e["sha256"] for e in store.entries()}
+            with store.transaction():
+                for clip in upload["clips"]:
+                    name, sha256 = clip["name"], clip["sha256"]
+                    if current.get(name) == sha256:
+                        continue
+
+                    if sha256 in known and known[sha256][0] == voice_dir:
+                        source_name = known[sha256][1]
+                        samples = store.samples(source_name)
+                        sample_rate = store.sample_rate(source_name)
+                    elif sha256 in known:
+                        source_dir, source_name = known[sha256]
+                        with ClipStore(source_dir) as source:
+                            # Copied out before the source store is closed
+                            samples = source.samples(source_name).copy()
+                            sample_rate = source.sample_rate(source_name)
+                    else:
+                        samples, sample_rate = read_wav(self._stitch(upload_id, clip))
+                        if wav_sha256(samples, sample_rate) != sha256:
+                            raise ValueError(
+                                f"Clip {name} is not a canonical mono 16-bit WAV "
+                                "(send ClipStore.wav_bytes, whose hash is the clip's sha256)"
+                            )
+                    store.add(name, samples, sample_rate, sha256=sha256)
+
+                store.retain(c["name"] for c in upload["clips"])
+            store.compact()
+
+        for name in os.listdir(voice_dir):
+            if name.endswith(".wav"):
+                os.remove(os.path.join(voice_dir, name))
+
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+        self._commit()
+        return voice_dir
+
+    def _stitch(self, upload_id: str, clip: dict) -> bytes:
+        """A clip's bytes from its parts, checked against its size and hash."""
+        sha256 = clip["sha256"]
+        h = hashlib.sha256()
+        blocks = []
+        written = 0
+        for offset, part_path in self._parts(upload_id, sha256):
+            if offset + os.path.getsize(part_path) <= written:
+                continue  # fully covered by an earlier chunk
+            with open(part_path, "rb") as part:
+                part.seek(written - offset)
+                block = part.read()
+            blocks.append(block)
+            h.update(block)
+            written += len(block)
+
+        if written != clip["size"] or h.hexdigest() != sha256:
+            # Drop the bad parts so a retry re-sends the clip
+            for _, part_path in self._parts(upload_id, sha256):
+                os.remove(part_path)
+            self._commit()
+            raise ValueError(f"Clip {clip['name']} failed its hash check; upload it again")
+        return b"".join(blocks)
+
+    # Jobs
+
+    def save_job(self, job: dict):
+        jobs_dir = os.path.join(self.root, JOBS_DIR)
+        os.makedirs(jobs_dir, exist_ok=True)
+        _write_json_atomic(os.path.join(jobs_dir, f"{job['job_id']}.json"), job)
+        self._local_jobs.add(job["job_id"])
+        self._commit()
+
+    def load_job(self, job_id: str) -> dict | None:
+        """Latest persisted state of a job (possibly run by another container).
+
+        The volume is reloaded only for a job that isn't here yet, or that
+        another container is still running.
+        """
+        if not _is_hex(job_id):
+            return None
+        path = os.path.join(self.root, JOBS_DIR, f"{job_id}.json")
+        job = _read_json(path)
+        if job is None or (
+            job_id not in self._local_jobs and job.get("status") not in FINAL_JOB_STATUSES
+        ):
+            self._reload()
+            job = _read_json(path)
+        return job
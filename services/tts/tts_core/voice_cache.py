@@ -0,0 +1,170 @@
+"""
+Two-tier cache of per-voice model state (latents, prefix KV).
+
+The device tier holds up to `device_limit` voices ready for inference. The
+least recently used voice past that limit is demoted to the host tier as
+pinned CPU tensors; using it again copies it back, which is far cheaper
+than recomputing or reloading its latents. Voices past `host_limit` are
+dropped and reload from their persisted latents on next use.
+
+Entries are dicts of tensors, nested tuples/lists of tensors (the prefix
+KV) and plain values. Moving a voice builds a new dict, so a request still
+holding the old one keeps working.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def _move(value, device: str, pin: bool = False):
+    import torch
+
+    if isinstance(value, torch.Tensor):
+        if device == "cpu":
+            moved = value.to("cpu")
+            return moved.pin_memory() if pin else moved
+        return value.to(device, non_blocking=True)
+    if isinstance(value, dict):
+        return {k: _move(v, device, pin) for k, v in value.items()}
+    if isinstance(value, (tuple, list)):
+        return type(value)(_move(v, device, pin) for v in value)
+    return value
+
+
+def entry_nbytes(value) -> int:
+    import torch
+
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, dict):
+        return sum(entry_nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(entry_nbytes(v) for v in value)
+    return 0
+
+
+class VoiceCache:
+    def __init__(self, device: str, device_limit: int = 8, host_limit: int = 64):
+        self.device = device
+        self.device_limit = device_limit
+        self.host_limit = host_limit
+        # A host tier only makes sense when the device isn't host memory
+        self._tiered = not device.startswith("cpu")
+        self._pin = device.startswith("cuda")
+
+        self._device: OrderedDict[str, dict] = OrderedDict()
+        self._host: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.device_hits = 0
+        self.host_hits = 0
+        self.misses = 0
+        self.demotions = 0
+        self.evictions = 0
+
+    def __contains__(self, voice_id: str) -> bool:
+        with self._lock:
+            return voice_id in self._device or voice_id in self._host
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._device) + len(self._host)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._device) + list(self._host)
+
+    @property
+    def capacity(self) -> int:
+        return self.device_limit + (self.host_limit if self._tiered else 0)
+
+    def get(self, voice_id: str, record: bool = True) -> dict | None:
+        """Device-resident entry for a voice, promoting it if needed.
+
+        record=False skips the hit/miss counters (for re-checks after a
+        miss that was already counted).
+        """
+        with self._lock:
+            entry = self._device.get(voice_id)
+            if entry is not None:
+                self._device.move_to_end(voice_id)
+                self.device_hits += record
+                return entry
+
+            entry = self._host.pop(voice_id, None)
+            if entry is None:
+                self.misses += record
+                return None
+            self.host_hits += record
+
+        entry = _move(entry, self.device)
+        self.put(voice_id, entry)
+        return entry
+
+    def put(self, voice_id: str, entry: dict, host: bool = False):
+        """Insert (or replace) an entry; host=True parks it in the host tier
+        without displacing anything on the device (e.g. for preloading)."""
+        if host and self._tiered:
+            with self._lock:
+                self._device.pop(voice_id, None)
+                self._host.pop(voice_id, None)
+            self._demote(voice_id, entry)
+            return
+
+        demote = []
+        with self._lock:
+            self._host.pop(voice_id, None)
+            self._device[voice_id] = entry
+            self._device.move_to_end(voice_id)
+            while len(self._device) > self.device_limit:
+                demote.append(self._device.popitem(last=False))
+
+        # Copies happen outside the lock so lookups for other voices don't wait
+        for old_id, old_entry in demote:
+            self._demote(old_id, old_entry)
+
+    def _demote(self, voice_id: str, entry: dict):
+        host_entry = _move(entry, "cpu", pin=self._pin) if self._tiered else None
+        with self._lock:
+            if voice_id in self._device:
+                # Promoted again (or replaced) while we were copying
+                return
+            if host_entry is None:
+                self.evictions += 1
+                return
+            self._host[voice_id] = host_entry
+            self.demotions += 1
+            while len(self._host) > self.host_limit:
+                self._host.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, voice_id: str):
+        """Forget a voice in both tiers."""
+        with self._lock:
+            self._device.pop(voice_id, None)
+            self._host.pop(voice_id, None)
+
+    def nbytes(self) -> dict:
+        with self._lock:
+            device, host = list(self._device.values()), list(self._host.values())
+        return {
+            "device": sum(entry_nbytes(e) for e in device),
+            "host": sum(entry_nbytes(e) for e in host),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.device_hits + self.host_hits + self.misses
+            return {
+                "device_voices": list(self._device),
+                "host_voices": list(self._host),
+                "device_limit": self.device_limit,
+                "host_limit": self.host_limit if self._tiered else 0,
+                "device_hits": self.device_hits,
+                "host_hits": self.host_hits,
+                "misses": self.misses,
+                "device_hit_rate": round(self.device_hits / lookups, 4) if lookups else 0.0,
+                "host_hit_rate": round(self.host_hits / lookups, 4) if lookups else 0.0,
+                "demotions": self.demotions,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,25 @@
+"""
+Voice ID validation.
+
+A voice ID names a directory on the voice volume (and in the disk audio
+cache), and it arrives straight from HTTP requests. Every path built from
+one goes through voice_dir(), so IDs like ".." can never reach outside
+the volume.
+"""
+
+import os
+import re
+
+VOICE_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def check_voice_id(voice_id) -> str:
+    """Return voice_id, or raise ValueError unless it matches [A-Za-z0-9_-]+."""
+    if not isinstance(voice_id, str) or not VOICE_ID_PATTERN.fullmatch(voice_id):
+        raise ValueError(f"Invalid voice ID '{voice_id}'")
+    return voice_id
+
+
+def voice_dir(root: str, voice_id) -> str:
+    """root/voice_id for a validated voice ID."""
+    return os.path.join(root, check_voice_id(voice_id))